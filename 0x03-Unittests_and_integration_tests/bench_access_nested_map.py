@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Micro-benchmark of access_nested_map against compiled accessors
+
+Usage:
+    ./bench_access_nested_map.py [documents]
+"""
+import sys
+import timeit
+from typing import Dict, List
+
+from utils import access_nested_map, compile_path, extract_paths
+
+PATHS = [("name",), ("license", "key"), ("owner", "links", "html")]
+
+
+def make_documents(count: int) -> List[Dict]:
+    """Build repo-like JSON documents"""
+    return [
+        {"name": "repo-{}".format(i),
+         "license": {"key": "mit"},
+         "owner": {"links": {"html": "https://github.com/{}".format(i)}}}
+        for i in range(count)
+    ]
+
+
+def main() -> None:
+    """Time each strategy and print the results"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    documents = make_documents(count)
+    accessors = [compile_path(path) for path in PATHS]
+
+    def walk() -> List:
+        """access_nested_map per document and path"""
+        return [tuple([access_nested_map(document, path) for path in PATHS])
+                for document in documents]
+
+    def compiled() -> List:
+        """Compiled accessors per document and path"""
+        return [tuple([accessor(document) for accessor in accessors])
+                for document in documents]
+
+    def batch() -> List:
+        """extract_paths over every document"""
+        return list(extract_paths(documents, PATHS))
+
+    assert walk() == compiled() == batch()
+    print("{} documents x {} paths".format(count, len(PATHS)))
+    print("{:<20} {:>10}".format("strategy", "ms"))
+    for label, function in (("access_nested_map", walk),
+                            ("compile_path", compiled),
+                            ("extract_paths", batch)):
+        best = min(timeit.repeat(function, number=1, repeat=5))
+        print("{:<20} {:>10.1f}".format(label, best * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Benchmark license queries on GithubOrgClient.public_repos
+
+Compares scanning the repos payload with has_license on every call
+against the license index, on a synthetic payload.
+
+Usage:
+    ./bench_public_repos.py [repos] [queries]
+"""
+import sys
+import time
+from typing import Dict, List
+from unittest.mock import patch
+
+from client import GithubOrgClient
+
+LICENSES = ["apache-2.0", "mit", "bsd-3-clause", "gpl-3.0", "bsl-1.0"]
+
+
+def make_payload(count: int) -> List[Dict]:
+    """Build a payload of count repos, some without a license"""
+    return [
+        {"name": "repo-{}".format(i),
+         "license": ({"key": LICENSES[i % len(LICENSES)]}
+                     if i % 7 else None)}
+        for i in range(count)
+    ]
+
+
+def scan(client: GithubOrgClient, license: str) -> List[str]:
+    """The former public_repos: rescan the payload on every call"""
+    return [
+        repo["name"] for repo in client.repos_payload
+        if client.has_license(repo, license)
+    ]
+
+
+def main() -> None:
+    """Time both strategies and print the results"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    payload = make_payload(count)
+
+    with patch("client.get_json_pages", return_value=[payload]), \
+            patch.object(GithubOrgClient, "_public_repos_url", "repos"):
+        client = GithubOrgClient("bench")
+
+        start = time.perf_counter()
+        for i in range(queries):
+            expected = scan(client, LICENSES[i % len(LICENSES)])
+        scanned = time.perf_counter() - start
+
+        start = time.perf_counter()
+        client.license_index
+        built = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(queries):
+            result = client.public_repos(LICENSES[i % len(LICENSES)])
+        indexed = time.perf_counter() - start
+        assert result == expected
+
+    print("{} repos, {} license queries".format(count, queries))
+    print("{:<24} {:>10}".format("strategy", "ms/query"))
+    print("{:<24} {:>10.3f}".format("scan", scanned * 1000 / queries))
+    print("{:<24} {:>10.3f}".format("index (one-off build)", built * 1000))
+    print("{:<24} {:>10.3f}".format("index", indexed * 1000 / queries))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,25 +4,33 @@
 from typing import (
     List,
     Dict,
+    Iterator,
 )
+from urllib.parse import urlencode
 
 from utils import (
     get_json,
-    access_nested_map,
-    memoize,
+    get_json_pages,
+    compile_path,
+    memoize_ttl,
 )
 
+_license_key = compile_path(("license", "key"))
+
 
 class GithubOrgClient:
     """A Githib org client
     """
     ORG_URL = "https://api.github.com/orgs/{org}"
+    CACHE_TTL = 300
+    PER_PAGE = 100
+    MAX_WORKERS = 4
 
     def __init__(self, org_name: str) -> None:
         """Init method of GithubOrgClient"""
         self._org_name = org_name
 
-    @memoize
+    @memoize_ttl(ttl=CACHE_TTL)
     def org(self) -> Dict:
         """Memoize org"""
         return get_json(self.ORG_URL.format(org=self._org_name))
@@ -32,27 +40,57 @@ class GithubOrgClient:
         """Public repos URL"""
         return self.org["repos_url"]
 
-    @memoize
-    def repos_payload(self) -> Dict:
-        """Memoize repos payload"""
-        return get_json(self._public_repos_url)
+    @memoize_ttl(ttl=CACHE_TTL)
+    def repos_payload(self) -> List[Dict]:
+        """Memoize every repo of the org, across all pages"""
+        return list(self.iter_repos())
 
     def public_repos(self, license: str = None) -> List[str]:
         """Public repos"""
-        json_payload = self.repos_payload
-        public_repos = [
-            repo["name"] for repo in json_payload
-            if license is None or self.has_license(repo, license)
-        ]
+        if license is None:
+            return [repo["name"] for repo in self.repos_payload]
+        return list(self.license_index.get(license, ()))
+
+    @property
+    def license_index(self) -> Dict[str, List[str]]:
+        """Repo names by license key, built once per repos payload.
+        The index is rebuilt when the memoized repos_payload refreshes.
+        """
+        payload = self.repos_payload
+        cached = self.__dict__.get("_license_index")
+        if cached is not None and cached[0] is payload:
+            return cached[1]
+        index = {}
+        for repo in payload:
+            try:
+                key = _license_key(repo)
+                index.setdefault(key, []).append(repo["name"])
+            except (KeyError, TypeError):
+                continue
+        # keep the payload referenced so its identity stays meaningful
+        self._license_index = (payload, index)
+        return index
+
+    def iter_repos(self) -> Iterator[Dict]:
+        """Stream every repo of the org, fetching pages concurrently"""
+        separator = "&" if "?" in self._public_repos_url else "?"
+        url = self._public_repos_url + separator + urlencode(
+            {"per_page": self.PER_PAGE})
+        for page in get_json_pages(url, max_workers=self.MAX_WORKERS):
+            yield from page
 
-        return public_repos
+    def iter_public_repos(self, license: str = None) -> Iterator[str]:
+        """Stream public repo names across all pages"""
+        for repo in self.iter_repos():
+            if license is None or self.has_license(repo, license):
+                yield repo["name"]
 
     @staticmethod
     def has_license(repo: Dict[str, Dict], license_key: str) -> bool:
         """Static: has_license"""
         assert license_key is not None, "license_key cannot be None"
         try:
-            has_license = access_nested_map(repo, ("license", "key")) == license_key
+            has_license = _license_key(repo) == license_key
         except KeyError:
             return False
         return has_license
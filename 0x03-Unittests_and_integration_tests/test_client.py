@@ -1,6 +1,10 @@
 #!/usr/bin/env python3
 """Test cases for client module"""
+import json
+import threading
 import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
 from unittest.mock import patch, Mock
 from parameterized import parameterized, parameterized_class
 from client import GithubOrgClient
@@ -47,8 +51,8 @@ class TestGithubOrgClient(unittest.TestCase):
             # verify the result matches the repos_url from mocked payload
             self.assertEqual(result, known_payload["repos_url"])
 
-    @patch('client.get_json')
-    def test_public_repos(self, mock_get_json):
+    @patch('client.get_json_pages')
+    def test_public_repos(self, mock_get_json_pages):
         """Test that public_repos returns expected list of repos"""
         # mock payload that get_json will return
         mock_repos_payload = [
@@ -57,7 +61,9 @@ class TestGithubOrgClient(unittest.TestCase):
             {"name": "dagger", "license": {"key": "apache-2.0"}}
         ]
 
-        mock_get_json.return_value = mock_repos_payload
+        # served as two pages
+        mock_get_json_pages.return_value = [mock_repos_payload[:2],
+                                            mock_repos_payload[2:]]
 
         # mock the _public_repos_url property
         test_repos_url = "https://api.github.com/orgs/google/repos"
@@ -73,8 +79,37 @@ class TestGithubOrgClient(unittest.TestCase):
             # verify the result matches expected repo names
             self.assertEqual(result, expected_repos)
 
-            # verify get_json was called once with the repos URL
-            mock_get_json.assert_called_once_with(test_repos_url)
+            # verify the pages were fetched once from the repos URL
+            mock_get_json_pages.assert_called_once_with(
+                test_repos_url + "?per_page=100", max_workers=4)
+
+    @patch('client.get_json_pages')
+    def test_public_repos_license_index(self, mock_get_json_pages):
+        """Test that license queries use an index rebuilt on refresh"""
+        mock_get_json_pages.return_value = [[
+            {"name": "dagger", "license": {"key": "apache-2.0"}},
+            {"name": "kratu", "license": {"key": "apache-2.0"}},
+        ], [
+            {"name": "cpp-netlib", "license": {"key": "bsl-1.0"}},
+            {"name": "no-license", "license": None},
+            {"name": "missing"},
+        ]]
+        with patch.object(GithubOrgClient, '_public_repos_url', "url"):
+            client = GithubOrgClient("google")
+            self.assertEqual(client.public_repos("apache-2.0"),
+                             ["dagger", "kratu"])
+            index = client.license_index
+            self.assertIs(client.license_index, index)
+            self.assertEqual(client.public_repos("mit"), [])
+
+            # a refreshed payload rebuilds the index
+            mock_get_json_pages.return_value = [[
+                {"name": "traceur", "license": {"key": "apache-2.0"}},
+            ]]
+            del client.repos_payload
+            self.assertEqual(client.public_repos("apache-2.0"), ["traceur"])
+            self.assertIsNot(client.license_index, index)
+            self.assertEqual(mock_get_json_pages.call_count, 2)
 
     @parameterized.expand([
         ({"license": {"key": "my_license"}}, "my_license", True),
@@ -96,9 +131,9 @@ class TestIntegrationGithubOrgClient(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
         """Set up class fixtures"""
-        def side_effect(url):
-            """Mock side effect function for requests.get"""
-            mock_response = Mock()
+        def side_effect(url, **kwargs):
+            """Mock side effect function for requests.Session.get"""
+            mock_response = Mock(status_code=200, headers={})
             if url == cls.org_payload["repos_url"]:
                 mock_response.json.return_value = cls.repos_payload
             else:
@@ -106,7 +141,8 @@ class TestIntegrationGithubOrgClient(unittest.TestCase):
             return mock_response
 
         # start patcher
-        cls.get_patcher = patch('requests.get', side_effect=side_effect)
+        cls.get_patcher = patch('requests.Session.get',
+                                side_effect=side_effect)
         cls.get_patcher.start()
 
     @classmethod
@@ -115,5 +151,117 @@ class TestIntegrationGithubOrgClient(unittest.TestCase):
         cls.get_patcher.stop()
 
 
+class FakeGithubHandler(BaseHTTPRequestHandler):
+    """Serves an org and its repos, paginated with Link headers"""
+    org_payload = {}
+    repos_payload = []
+    pages_served = []
+
+    def do_GET(self):
+        """Answer the org document or one page of repos"""
+        url = urlparse(self.path)
+        if url.path != "/orgs/google/repos":
+            return self._send(dict(self.org_payload, repos_url=(
+                self._base() + "/orgs/google/repos")), {})
+        query = parse_qs(url.query)
+        per_page = int(query.get("per_page", ["30"])[0])
+        page = int(query.get("page", ["1"])[0])
+        last = max(1, -(-len(self.repos_payload) // per_page))
+        FakeGithubHandler.pages_served.append(page)
+        start = (page - 1) * per_page
+        links = {}
+        if page < last:
+            links["next"] = page + 1
+            links["last"] = last
+        link = ", ".join(
+            '<{}{}?per_page={}&page={}>; rel="{}"'.format(
+                self._base(), url.path, per_page, number, rel)
+            for rel, number in links.items())
+        self._send(self.repos_payload[start:start + per_page],
+                   {"Link": link} if link else {})
+
+    def _base(self):
+        """Root URL of this server"""
+        return "http://{}:{}".format(*self.server.server_address)
+
+    def _send(self, payload, headers):
+        """Write a JSON response"""
+        data = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        """Keep test output quiet"""
+
+
+@parameterized_class(
+    ("org_payload", "repos_payload", "expected_repos", "apache2_repos"),
+    TEST_PAYLOAD
+)
+class TestPaginatedGithubOrgClient(unittest.TestCase):
+    """Streaming repos from a local fake API that paginates the fixtures"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Start the fake API and point the client at it"""
+        FakeGithubHandler.org_payload = cls.org_payload
+        FakeGithubHandler.repos_payload = cls.repos_payload
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGithubHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url_patcher = patch.object(
+            GithubOrgClient, "ORG_URL", "http://127.0.0.1:{}/orgs/{{org}}"
+            .format(cls.server.server_address[1]))
+        cls.url_patcher.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the fake API"""
+        cls.url_patcher.stop()
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        """Reset the served page log"""
+        FakeGithubHandler.pages_served = []
+
+    @parameterized.expand([(1,), (2,), (4,), (100,)])
+    def test_iter_public_repos(self, per_page):
+        """Every page is fetched once and repos stream in order"""
+        client = GithubOrgClient("google")
+        with patch.object(GithubOrgClient, "PER_PAGE", per_page):
+            repos = client.iter_public_repos()
+            self.assertEqual(next(repos), self.expected_repos[0])
+            self.assertEqual([self.expected_repos[0]] + list(repos),
+                             self.expected_repos)
+        pages = -(-len(self.repos_payload) // per_page)
+        self.assertEqual(sorted(FakeGithubHandler.pages_served),
+                         list(range(1, pages + 1)))
+
+    @parameterized.expand([(1,), (2,), (100,)])
+    def test_public_repos(self, per_page):
+        """public_repos and its license index cover every page"""
+        client = GithubOrgClient("google")
+        with patch.object(GithubOrgClient, "PER_PAGE", per_page):
+            self.assertEqual(client.public_repos(), self.expected_repos)
+            self.assertEqual(client.public_repos(license="apache-2.0"),
+                             self.apache2_repos)
+        pages = -(-len(self.repos_payload) // per_page)
+        self.assertEqual(sorted(FakeGithubHandler.pages_served),
+                         list(range(1, pages + 1)))
+
+    def test_iter_public_repos_with_license(self):
+        """License filtering works across pages"""
+        client = GithubOrgClient("google")
+        with patch.object(GithubOrgClient, "PER_PAGE", 2):
+            self.assertEqual(
+                list(client.iter_public_repos(license="apache-2.0")),
+                self.apache2_repos)
+
+
 if __name__ == "__main__":
     unittest.main()
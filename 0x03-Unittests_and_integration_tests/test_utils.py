@@ -1,8 +1,17 @@
 #!/usr/bin/env python3
 """Test cases for utils module"""
+import asyncio
+import gzip
+import json
+import threading
+import time
 import unittest
 from parameterized import parameterized
-from utils import access_nested_map, get_json, memoize
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import MappingProxyType
+from utils import (
+    access_nested_map, compile_path, extract_paths, get_json, memoize,
+    memoize_ttl, HttpClient)
 from unittest.mock import patch, Mock
 import sys
 import os
@@ -32,6 +41,58 @@ class TestAccessNestedMap(unittest.TestCase):
         self.assertRaises(KeyError, access_nested_map, nested_map, path)
 
 
+class TestCompilePath(unittest.TestCase):
+    """Test class for compile_path and extract_paths"""
+
+    @parameterized.expand([
+        ({"a": 1}, ()),
+        ({"a": 1}, ("a",)),
+        ({"a": {"b": 2}}, ("a", "b")),
+        ({"a": {"b": {"c": 3}}}, ("a", "b", "c")),
+        ({"a": {"b": {"c": {"d": 4}}}}, ("a", "b", "c", "d")),
+        (MappingProxyType({"a": {"b": 2}}), ("a", "b")),
+        ({"a": MappingProxyType({"b": {"c": 3}})}, ("a", "b", "c")),
+        ({"a": {"b": {"c": MappingProxyType({"d": 4})}}},
+         ("a", "b", "c", "d")),
+    ])
+    def test_matches_access_nested_map(self, nested_map, path):
+        """Test that compiled accessors return the same values"""
+        self.assertEqual(compile_path(path)(nested_map),
+                         access_nested_map(nested_map, path))
+
+    @parameterized.expand([
+        ({}, ("a",), "a"),
+        ({"a": 1}, ("a", "b"), "b"),
+        ({"a": [1]}, ("a", 0), 0),
+        ({"a": {"b": None}}, ("a", "b", "c"), "c"),
+        ({"a": {"b": {"c": 1}}}, ("a", "b", "c", "d"), "d"),
+        (MappingProxyType({}), ("a",), "a"),
+    ])
+    def test_missing_path_raises_key_error(self, nested_map, path, key):
+        """Test that missing paths raise the same KeyError"""
+        with self.assertRaises(KeyError) as error:
+            compile_path(path)(nested_map)
+        self.assertEqual(error.exception.args, (key,))
+
+    def test_accessors_are_cached(self):
+        """Test that compiling an equal path returns the same accessor"""
+        self.assertIs(compile_path(["x", "y"]), compile_path(("x", "y")))
+
+    def test_extract_paths(self):
+        """Test batch extraction with and without a default"""
+        repos = [
+            {"name": "dagger", "license": {"key": "apache-2.0"}},
+            {"name": "kratu", "license": None},
+        ]
+        paths = [("name",), ("license", "key")]
+        self.assertEqual(list(extract_paths(repos, paths, default=None)),
+                         [("dagger", "apache-2.0"), ("kratu", None)])
+        with self.assertRaises(KeyError):
+            list(extract_paths(repos, paths))
+        self.assertEqual(list(extract_paths(repos[:1], paths)),
+                         [("dagger", "apache-2.0")])
+
+
 class TestGetJson(unittest.TestCase):
     """Test class for get_json function"""
 
@@ -39,12 +100,12 @@ class TestGetJson(unittest.TestCase):
         ("http://example.com", {"payload": True}),
         ("http://holberton.io", {"payload": False}),
     ])
-    @patch('utils.requests.get')
+    @patch('utils.requests.Session.get')
     def test_get_json(self, test_url, test_payload, mock_get):
         """Test that get_json returns expected results"""
 
         # configure the mock to return a response with the test payload
-        mock_response = Mock()
+        mock_response = Mock(status_code=200, headers={})
         mock_response.json.return_value = test_payload
         mock_get.return_value = mock_response
 
@@ -52,11 +113,119 @@ class TestGetJson(unittest.TestCase):
         result = get_json(test_url)
 
         # assert that the mock was called once with the correct URL
-        mock_get.assert_called_once_with(test_url)
+        mock_get.assert_called_once()
+        self.assertEqual(mock_get.call_args[0][0], test_url)
         # assert that the result matches the expected payload
         self.assertEqual(result, test_payload)
 
 
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves one JSON document with an ETag, gzip and 304 support"""
+    body = json.dumps({"login": "google", "repos": list(range(50))})
+    etag = '"v1"'
+    requests_seen = []
+
+    def do_GET(self):
+        """Answer 304 on a matching If-None-Match, else the gzipped body"""
+        StubHandler.requests_seen.append(dict(self.headers))
+        if self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.send_header("ETag", self.etag)
+            self.end_headers()
+            return
+        data = gzip.compress(self.body.encode())
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("ETag", self.etag)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        """Keep test output quiet"""
+
+
+class TestHttpClient(unittest.TestCase):
+    """Test class for HttpClient against a local stub server"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Start the stub server"""
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        cls.url = "http://127.0.0.1:{}/orgs/google".format(
+            cls.server.server_address[1])
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the stub server"""
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        """Reset the recorded requests"""
+        StubHandler.requests_seen = []
+
+    def test_revalidates_with_etag(self):
+        """Test that a 304 answer is served from the response cache"""
+        client = HttpClient(timeout=5)
+        first = client.get_json(self.url)
+        second = client.get_json(self.url)
+
+        self.assertEqual(first, json.loads(StubHandler.body))
+        self.assertEqual(second, first)
+        self.assertEqual(client.revalidated, 1)
+        self.assertNotIn("If-None-Match", StubHandler.requests_seen[0])
+        self.assertEqual(StubHandler.requests_seen[1]["If-None-Match"], '"v1"')
+
+    def test_revalidated_entry_survives_eviction(self):
+        """Test that a 304 is served from the entry it was requested with"""
+        client = HttpClient(timeout=5)
+        client.get_json(self.url)
+        real_send = client._send
+
+        def send_then_evict(url, etag=None):
+            """Drop the cache entry while the request is in flight"""
+            response = real_send(url, etag)
+            client.clear()
+            return response
+
+        with patch.object(client, '_send', side_effect=send_then_evict):
+            payload = client.get_json(self.url)
+        self.assertEqual(payload, json.loads(StubHandler.body))
+        self.assertEqual(client.revalidated, 1)
+        self.assertEqual(len(StubHandler.requests_seen), 2)
+
+    def test_unexpected_304_is_retried_unconditionally(self):
+        """Test that a 304 without a local copy fetches the body"""
+        client = HttpClient(timeout=5)
+        not_modified = Mock(status_code=304, headers={})
+        body = Mock(status_code=200, headers={}, links={})
+        body.json.return_value = {"login": "google"}
+        with patch.object(client.session, 'get',
+                          side_effect=[not_modified, body]) as mock_get:
+            self.assertEqual(client.get_json(self.url), {"login": "google"})
+        self.assertEqual(mock_get.call_count, 2)
+        for call in mock_get.call_args_list:
+            self.assertNotIn("If-None-Match", call[1]["headers"])
+        self.assertEqual(client.revalidated, 0)
+
+    def test_requests_gzip(self):
+        """Test that gzip is requested and transparently decoded"""
+        client = HttpClient(timeout=5)
+        self.assertEqual(client.get_json(self.url)["login"], "google")
+        self.assertIn("gzip", StubHandler.requests_seen[0]["Accept-Encoding"])
+
+    def test_timeout_is_passed(self):
+        """Test that every request carries the configured timeout"""
+        client = HttpClient(timeout=3)
+        with patch.object(client.session, 'get') as mock_get:
+            mock_get.return_value = Mock(status_code=200, headers={})
+            client.get_json(self.url)
+        self.assertEqual(mock_get.call_args[1]["timeout"], 3)
+
+
 class TestMemoize(unittest.TestCase):
     """Test class for memoize decorator caches method results"""
 
@@ -83,5 +252,77 @@ class TestMemoize(unittest.TestCase):
             mock_method.assert_called_once()
 
 
+class TestMemoizeTTL(unittest.TestCase):
+    """Test class for memoize_ttl decorator"""
+
+    @staticmethod
+    def make_class(ttl=None):
+        """Build a class with a counting memoized property"""
+        class TestClass:
+            """Test class to demonstrate memoization"""
+            def __init__(self):
+                self.calls = 0
+
+            @memoize_ttl(ttl=ttl)
+            def a_property(self):
+                self.calls += 1
+                time.sleep(0.01)
+                return self.calls
+
+        return TestClass
+
+    def test_caches_until_ttl_expires(self):
+        """Test that the value is recomputed once the ttl has passed"""
+        test_object = self.make_class(ttl=60)()
+        with patch('utils.time.monotonic', return_value=1000.0) as clock:
+            self.assertEqual(test_object.a_property, 1)
+            self.assertEqual(test_object.a_property, 1)
+            clock.return_value = 1061.0
+            self.assertEqual(test_object.a_property, 2)
+
+    def test_invalidation(self):
+        """Test that deleting the attribute forces a recomputation"""
+        test_object = self.make_class()()
+        self.assertEqual(test_object.a_property, 1)
+        del test_object.a_property
+        self.assertEqual(test_object.a_property, 2)
+
+    def test_single_flight(self):
+        """Test that concurrent threads share one computation"""
+        test_object = self.make_class()()
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(test_object.a_property))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [1] * 8)
+        self.assertEqual(test_object.calls, 1)
+
+    def test_async_method(self):
+        """Test that concurrent awaiters share one coroutine call"""
+        class TestClass:
+            """Test class with an async memoized property"""
+            calls = 0
+
+            @memoize_ttl()
+            async def a_property(self):
+                TestClass.calls += 1
+                await asyncio.sleep(0.01)
+                return 42
+
+        async def run():
+            test_object = TestClass()
+            return await asyncio.gather(
+                test_object.a_property, test_object.a_property)
+
+        self.assertEqual(asyncio.run(run()), [42, 42])
+        self.assertEqual(TestClass.calls, 1)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,20 +1,36 @@
 #!/usr/bin/env python3
 """Generic utilities for github org client.
 """
+import asyncio
+import threading
+import time
 import requests
-from functools import wraps
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, wraps
+from requests.adapters import HTTPAdapter
+from urllib.parse import parse_qs, urlencode, urlparse, urlunparse
 from typing import (
     Mapping,
     Sequence,
     Any,
     Dict,
     Callable,
+    Iterable,
+    Iterator,
+    Optional,
+    Tuple,
 )
 
 __all__ = [
     "access_nested_map",
+    "compile_path",
+    "extract_paths",
+    "HttpClient",
     "get_json",
+    "get_json_pages",
     "memoize",
+    "memoize_ttl",
 ]
 
 
@@ -40,11 +56,238 @@ def access_nested_map(nested_map: Mapping, path: Sequence) -> Any:
     return nested_map
 
 
+def compile_path(path: Sequence) -> Callable[[Mapping], Any]:
+    """Return an accessor equivalent to access_nested_map for one path.
+    Accessors are cached, so compiling the same path again is cheap.
+    Plain ``dict`` levels are indexed directly; anything else falls back
+    to access_nested_map, so results and KeyErrors are the same.
+    Example
+    -------
+    >>> get_license = compile_path(("license", "key"))
+    >>> get_license({"license": {"key": "mit"}})
+    'mit'
+    """
+    return _compile_path(tuple(path))
+
+
+@lru_cache(maxsize=256)
+def _compile_path(path: Tuple) -> Callable[[Mapping], Any]:
+    """Build the accessor for a path, unrolled for short paths"""
+    def slow(nested_map: Mapping) -> Any:
+        """Generic walk, used whenever a level is not a plain dict"""
+        return access_nested_map(nested_map, path)
+
+    if not path:
+        return slow
+    if len(path) == 1:
+        key0, = path
+
+        def accessor(nested_map: Mapping) -> Any:
+            """Accessor for a one-key path"""
+            if type(nested_map) is dict:
+                return nested_map[key0]
+            return slow(nested_map)
+    elif len(path) == 2:
+        key0, key1 = path
+
+        def accessor(nested_map: Mapping) -> Any:
+            """Accessor for a two-key path"""
+            if type(nested_map) is dict:
+                node = nested_map[key0]
+                if type(node) is dict:
+                    return node[key1]
+            return slow(nested_map)
+    elif len(path) == 3:
+        key0, key1, key2 = path
+
+        def accessor(nested_map: Mapping) -> Any:
+            """Accessor for a three-key path"""
+            if type(nested_map) is dict:
+                node = nested_map[key0]
+                if type(node) is dict:
+                    node = node[key1]
+                    if type(node) is dict:
+                        return node[key2]
+            return slow(nested_map)
+    else:
+        def accessor(nested_map: Mapping) -> Any:
+            """Accessor for a longer path"""
+            node = nested_map
+            for key in path:
+                if type(node) is not dict:
+                    return slow(nested_map)
+                node = node[key]
+            return node
+    return accessor
+
+
+_REQUIRED = object()
+
+
+def extract_paths(documents: Iterable[Mapping], paths: Sequence[Sequence],
+                  default: Any = _REQUIRED) -> Iterator[Tuple]:
+    """Extract several paths from every document.
+    Yields one tuple per document with the value at each path. A missing
+    path raises KeyError, or gives ``default`` when one is passed.
+    Example
+    -------
+    >>> repos = [{"name": "a", "license": {"key": "mit"}}, {"name": "b"}]
+    >>> list(extract_paths(repos, [("name",), ("license", "key")], None))
+    [('a', 'mit'), ('b', None)]
+    """
+    accessors = [compile_path(path) for path in paths]
+    if default is _REQUIRED:
+        for document in documents:
+            yield tuple([accessor(document) for accessor in accessors])
+        return
+
+    def get(accessor: Callable, document: Mapping) -> Any:
+        """Value at a path, or the default when it is missing"""
+        try:
+            return accessor(document)
+        except KeyError:
+            return default
+
+    for document in documents:
+        yield tuple([get(accessor, document) for accessor in accessors])
+
+
+class HttpClient:
+    """HTTP client with a pooled session and ETag revalidation.
+    Connections are kept alive and reused across calls. Responses that
+    carry an ETag are cached in memory and revalidated with
+    ``If-None-Match``, so a ``304 Not Modified`` skips the body download.
+    Example
+    -------
+    >>> client = HttpClient(timeout=5)
+    >>> client.get_json("https://api.github.com/orgs/google")
+    """
+
+    def __init__(self, timeout: float = 10.0, pool_size: int = 10,
+                 cache_size: int = 256) -> None:
+        """Init method of HttpClient"""
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Accept-Encoding"] = "gzip, deflate"
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.revalidated = 0
+
+    def get(self, url: str) -> requests.Response:
+        """Send a GET, revalidating a cached ETag if there is one"""
+        with self._lock:
+            cached = self._cache.get(url)
+        return self._send(url, cached[0] if cached else None)
+
+    def _send(self, url: str, etag: Optional[str] = None) -> requests.Response:
+        """Send a GET, conditional on etag when one is given"""
+        headers = {"If-None-Match": etag} if etag else {}
+        return self.session.get(url, headers=headers, timeout=self.timeout)
+
+    def get_json(self, url: str) -> Dict:
+        """Get JSON from remote URL, served from cache on 304"""
+        return self.get_json_and_links(url)[0]
+
+    def get_json_and_links(self, url: str) -> Tuple[Any, Dict]:
+        """Get JSON and the parsed ``Link`` header from remote URL"""
+        # the entry the request was conditional on, even if another
+        # thread evicts or replaces it before the answer arrives
+        with self._lock:
+            cached = self._cache.get(url)
+        response = self._send(url, cached[0] if cached else None)
+        if response.status_code == 304:
+            if cached:
+                with self._lock:
+                    if url in self._cache:
+                        self._cache.move_to_end(url)
+                    self.revalidated += 1
+                return cached[1], cached[2]
+            # nothing to serve the 304 from: ask for the body
+            response = self._send(url)
+        payload = response.json()
+        links = getattr(response, "links", None)
+        links = links if isinstance(links, dict) else {}
+        etag = response.headers.get("ETag")
+        if isinstance(etag, str):
+            with self._lock:
+                self._cache[url] = (etag, payload, links)
+                self._cache.move_to_end(url)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return payload, links
+
+    def get_pages(self, url: str, max_workers: int = 4) -> Iterator[Any]:
+        """Yield the JSON payload of every page of a paginated resource.
+        Follows RFC 5988 ``Link`` headers. When the first page advertises
+        a ``last`` page number, the remaining pages are fetched
+        concurrently with at most ``max_workers`` requests in flight;
+        otherwise ``next`` links are followed one by one. Pages are
+        yielded in order.
+        """
+        payload, links = self.get_json_and_links(url)
+        yield payload
+
+        last = _page_number(links.get("last", {}).get("url"))
+        if last is None:
+            while "next" in links:
+                payload, links = self.get_json_and_links(links["next"]["url"])
+                yield payload
+            return
+
+        page_urls = (_with_page(links["last"]["url"], page)
+                     for page in range(2, last + 1))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # keep a bounded window of requests in flight
+            pending = deque()
+            for page_url in page_urls:
+                pending.append(executor.submit(self.get_json, page_url))
+                if len(pending) >= 2 * max_workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def clear(self) -> None:
+        """Drop every cached response"""
+        with self._lock:
+            self._cache.clear()
+
+
+def _page_number(url: Optional[str]) -> Optional[int]:
+    """Return the ``page`` query parameter of a URL, if any"""
+    if not url:
+        return None
+    pages = parse_qs(urlparse(url).query).get("page")
+    return int(pages[0]) if pages and pages[0].isdigit() else None
+
+
+def _with_page(url: str, page: int) -> str:
+    """Return url with its ``page`` query parameter set to page"""
+    parts = urlparse(url)
+    query = parse_qs(parts.query)
+    query["page"] = [str(page)]
+    return urlunparse(parts._replace(query=urlencode(query, doseq=True)))
+
+
+_client = HttpClient()
+
+
 def get_json(url: str) -> Dict:
     """Get JSON from remote URL.
+    Uses the module's shared HttpClient.
+    """
+    return _client.get_json(url)
+
+
+def get_json_pages(url: str, max_workers: int = 4) -> Iterator[Any]:
+    """Yield every page of a paginated JSON resource.
+    Uses the module's shared HttpClient, see HttpClient.get_pages.
     """
-    response = requests.get(url)
-    return response.json()
+    return _client.get_pages(url, max_workers=max_workers)
 
 
 def memoize(fn: Callable) -> Callable:
@@ -73,3 +316,79 @@ def memoize(fn: Callable) -> Callable:
         return getattr(self, attr_name)
 
     return property(memoized)
+
+
+def memoize_ttl(ttl: Optional[float] = None) -> Callable[[Callable], property]:
+    """Decorator to memoize a method with expiry and single-flight.
+    The cached value of each instance expires ``ttl`` seconds after it
+    was computed (never if ``ttl`` is None). Concurrent threads that miss
+    the cache wait for one computation instead of repeating it. Deleting
+    the attribute invalidates it. Coroutine methods cache the task, so
+    concurrent awaiters share one call and failures are not cached.
+    Example
+    -------
+    class MyClass:
+        @memoize_ttl(ttl=60)
+        def a_method(self):
+            print("a_method called")
+            return 42
+    >>> my_object = MyClass()
+    >>> my_object.a_method
+    a_method called
+    42
+    >>> my_object.a_method
+    42
+    >>> del my_object.a_method
+    >>> my_object.a_method
+    a_method called
+    42
+    """
+    def decorator(fn: Callable) -> property:
+        """Build the memoized property"""
+        attr_name = "_{}".format(fn.__name__)
+        lock_name = "_{}_lock".format(fn.__name__)
+        is_async = asyncio.iscoroutinefunction(fn)
+
+        def cached(self) -> Optional[tuple]:
+            """Return the (value, expires_at) entry if still fresh"""
+            entry = self.__dict__.get(attr_name)
+            if entry is None:
+                return None
+            if entry[1] is not None and time.monotonic() >= entry[1]:
+                return None
+            return entry
+
+        def drop_failed(self, task: asyncio.Future) -> None:
+            """Forget a task that failed so the next access retries"""
+            if task.cancelled() or task.exception() is not None:
+                entry = self.__dict__.get(attr_name)
+                if entry is not None and entry[0] is task:
+                    del self.__dict__[attr_name]
+
+        @wraps(fn)
+        def memoized(self):
+            """"memoized wraps"""
+            entry = cached(self)
+            if entry is not None:
+                return entry[0]
+            lock = self.__dict__.setdefault(lock_name, threading.Lock())
+            with lock:
+                entry = cached(self)
+                if entry is not None:
+                    return entry[0]
+                value = fn(self)
+                if is_async:
+                    value = asyncio.ensure_future(value)
+                    value.add_done_callback(
+                        lambda task: drop_failed(self, task))
+                expires = None if ttl is None else time.monotonic() + ttl
+                self.__dict__[attr_name] = (value, expires)
+                return value
+
+        def invalidate(self) -> None:
+            """Drop the cached value"""
+            self.__dict__.pop(attr_name, None)
+
+        return property(memoized, None, invalidate)
+
+    return decorator
@@ -0,0 +1,92 @@
+"""
+Benchmark insert throughput of random (v4) against time-ordered (v7) UUID keys
+
+Inserts message-like rows into throwaway SQLite databases, one per key
+generator and table layout:
+
+- rowid: the layout Django creates on SQLite, a rowid table plus a
+  unique index on the char(32) primary key
+- clustered: a WITHOUT ROWID table, stored in primary key order like an
+  InnoDB clustered index
+
+Rows are committed in batches of BATCH. Throughput is reported for the whole
+load and for its last tenth, when the index is largest.
+
+Usage:
+    python benchmarks/bench_ids.py [rows]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from chats.ids import uuid7  # noqa: E402
+
+BATCH = 10000
+BODY = 'x' * 80
+LAYOUTS = {
+    'rowid': 'CREATE TABLE message (message_id char(32) NOT NULL PRIMARY KEY, sent_at text, body text)',
+    'clustered': (
+        'CREATE TABLE message (message_id char(32) NOT NULL PRIMARY KEY, sent_at text, body text) '
+        'WITHOUT ROWID'
+    ),
+}
+
+
+def load(generate, layout, count):
+    """
+    Insert `count` rows keyed by `generate`
+
+    Returns (seconds, rows/s over the last tenth of the load, file MB).
+    """
+    path = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+    db = sqlite3.connect(path, isolation_level=None)
+    db.execute('PRAGMA journal_mode=WAL')
+    db.execute('PRAGMA synchronous=NORMAL')
+    db.execute(LAYOUTS[layout])
+
+    total = tail = 0.0
+    tail_rows = 0
+    for done in range(0, count, BATCH):
+        size = min(BATCH, count - done)
+        rows = [(generate().hex, '2026-10-19 10:30:00', BODY) for _ in range(size)]
+        start = time.perf_counter()
+        db.execute('BEGIN')
+        db.executemany('INSERT INTO message VALUES (?, ?, ?)', rows)
+        db.execute('COMMIT')
+        elapsed = time.perf_counter() - start
+        total += elapsed
+        if done + size > count * 9 // 10:
+            tail += elapsed
+            tail_rows += size
+
+    db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    db.close()
+    size = os.path.getsize(path) / 2 ** 20
+    os.remove(path)
+    os.rmdir(os.path.dirname(path))
+    return total, tail_rows / tail, size
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000000
+
+    print(f"{count:,} rows, {BATCH:,} per transaction")
+    print(f"{'layout':<10} {'key':<6} {'total s':>8} {'rows/s':>9} {'last 10% rows/s':>16} {'MB':>7}")
+    for layout in LAYOUTS:
+        for name, generate in (('uuid4', uuid.uuid4), ('uuid7', uuid7)):
+            total, tail, size = load(generate, layout, count)
+            print(
+                f"{layout:<10} {name:<6} {total:>8.1f} {count / total:>9,.0f} "
+                f"{tail:>16,.0f} {size:>7.0f}"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark deep-page latency of page-number against keyset pagination
+
+Builds a throwaway SQLite database, fills one conversation with messages
+and times GET /api/messages/ for page 500 with both paginators.
+
+Usage:
+    python benchmarks/bench_pagination.py [messages] [page]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'messaging_app.settings')
+os.environ['DB_NAME'] = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from chats.models import Conversation, Message, User  # noqa: E402
+from chats.pagination import MessagePagination  # noqa: E402
+from chats.views import MessageViewSet  # noqa: E402
+
+PAGE_SIZE = 20
+
+
+def populate(count):
+    """
+    Create two users sharing one conversation with `count` messages
+    """
+    alice = User.objects.create_user(
+        username='alice', email='alice@example.com', password='x', first_name='Alice', last_name='A'
+    )
+    bob = User.objects.create_user(
+        username='bob', email='bob@example.com', password='x', first_name='Bob', last_name='B'
+    )
+    conversation = Conversation.objects.create()
+    conversation.participants.add(alice, bob)
+
+    # spread sent_at over time like a real history
+    Message._meta.get_field('sent_at').auto_now_add = False
+    start = timezone.now() - timedelta(seconds=count)
+    batch = []
+    for i in range(count):
+        batch.append(Message(
+            sender=alice if i % 2 else bob, conversation=conversation,
+            message_body=f'message {i}', sent_at=start + timedelta(seconds=i)
+        ))
+        if len(batch) == 5000:
+            Message.objects.bulk_create(batch)
+            batch = []
+    Message.objects.bulk_create(batch)
+    Conversation.objects.refresh_activity()
+
+    # let the SQLite planner see the table sizes, as it would after `PRAGMA optimize`
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return alice
+
+
+def best_of(client, url, repeat=7):
+    """
+    Return the fastest of `repeat` requests in milliseconds
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url)
+        timings.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.status_code
+    return min(timings)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    page = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    setup_test_environment()
+    call_command('migrate', verbosity=0)
+    client = APIClient()
+    client.force_authenticate(populate(count))
+
+    # keyset: follow `next` links down to the requested page
+    url = f'/api/messages/?page_size={PAGE_SIZE}'
+    for _ in range(page - 1):
+        url = client.get(url).data['links']['next']
+    keyset_first = best_of(client, f'/api/messages/?page_size={PAGE_SIZE}')
+    keyset_deep = best_of(client, url)
+
+    MessageViewSet.pagination_class = MessagePagination
+    offset_first = best_of(client, f'/api/messages/?page_size={PAGE_SIZE}&page=1')
+    offset_deep = best_of(client, f'/api/messages/?page_size={PAGE_SIZE}&page={page}')
+
+    print(f"{count:,} messages, {PAGE_SIZE} per page")
+    print(f"{'paginator':<26} {'page 1 ms':>10} {f'page {page} ms':>12}")
+    print(f"{'page number (OFFSET)':<26} {offset_first:>10.2f} {offset_deep:>12.2f}")
+    print(f"{'keyset cursor':<26} {keyset_first:>10.2f} {keyset_deep:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
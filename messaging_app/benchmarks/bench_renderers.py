@@ -0,0 +1,104 @@
+"""
+Benchmark DRF's JSONRenderer/JSONParser against FastJSONRenderer/FastJSONParser
+
+Builds a throwaway SQLite database, takes the data of a GET /api/messages/
+page and times rendering it, then parsing the rendered bytes back, with
+DRF and with both CHATS_JSON_BACKEND choices. Checks that the renderers
+return the same bytes.
+
+Usage:
+    python benchmarks/bench_renderers.py [page_size]
+"""
+import os
+import sys
+import tempfile
+import timeit
+from io import BytesIO
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'messaging_app.settings')
+os.environ['DB_NAME'] = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from rest_framework.parsers import JSONParser  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from chats import renderers  # noqa: E402
+from chats.models import Conversation, Message, User  # noqa: E402
+
+
+def populate(count):
+    """
+    Create two users sharing one conversation with `count` messages
+    """
+    alice = User.objects.create_user(
+        username='alice', email='alice@example.com', password='x', first_name='Alice', last_name='A'
+    )
+    bob = User.objects.create_user(
+        username='bob', email='bob@example.com', password='x', first_name='Bob', last_name='B'
+    )
+    conversation = Conversation.objects.create()
+    conversation.participants.add(alice, bob)
+    Message.objects.bulk_create([
+        Message(
+            sender=alice if i % 2 else bob, conversation=conversation,
+            message_body=f'message {i}: ' + 'lorem ipsum dolor sit amet, ' * (i % 8) + 'café ✓'
+        )
+        for i in range(count)
+    ])
+    Conversation.objects.refresh_activity()
+    return alice
+
+
+def best_of(func, number):
+    """
+    Return the fastest run of `func` in milliseconds
+    """
+    return min(timeit.repeat(func, number=number, repeat=7)) / number * 1000
+
+
+def main():
+    page_size = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+
+    setup_test_environment()
+    call_command('migrate', verbosity=0)
+    client = APIClient()
+    client.force_authenticate(populate(page_size))
+    data = client.get(f'/api/messages/?page_size={page_size}').data
+    context = {}
+
+    drf, fast = JSONRenderer(), renderers.FastJSONRenderer()
+    body = drf.render(data, 'application/json', context)
+    number = max(1, 20000 // page_size)
+    render = {'DRF': best_of(lambda: drf.render(data, 'application/json', context), number)}
+    for backend in ('stdlib', 'orjson'):
+        with override_settings(CHATS_JSON_BACKEND=backend):
+            assert fast.render(data, 'application/json', context) == body
+            render[backend] = best_of(lambda: fast.render(data, 'application/json', context), number)
+
+    parse = {'DRF': best_of(lambda: JSONParser().parse(BytesIO(body)), number)}
+    for backend in ('stdlib', 'orjson'):
+        with override_settings(CHATS_JSON_BACKEND=backend):
+            assert renderers.FastJSONParser().parse(BytesIO(body)) == JSONParser().parse(BytesIO(body))
+            parse[backend] = best_of(lambda: renderers.FastJSONParser().parse(BytesIO(body)), number)
+
+    print(f"messages page of {page_size}, {len(body):,} bytes, orjson {renderers.orjson.__version__}")
+    print(f"{'step':<8} {'DRF ms':>8} {'stdlib ms':>10} {'orjson ms':>10} {'speedup':>8}")
+    for step, timings in (('render', render), ('parse', parse)):
+        print(
+            f"{step:<8} {timings['DRF']:>8.3f} {timings['stdlib']:>10.3f} "
+            f"{timings['orjson']:>10.3f} {timings['DRF'] / timings['orjson']:>7.1f}x"
+        )
+
+
+if __name__ == '__main__':
+    main()
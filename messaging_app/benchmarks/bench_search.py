@@ -0,0 +1,100 @@
+"""
+Benchmark message search with icontains against the full-text index
+
+Builds a throwaway SQLite database (migrations create the FTS5 index),
+loads synthetic messages and times the first page of results for a rare
+and a common word with both strategies.
+
+Usage:
+    python benchmarks/bench_search.py [messages]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'messaging_app.settings')
+os.environ['DB_NAME'] = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from chats.models import Conversation, Message, User  # noqa: E402
+from chats.search import search_messages  # noqa: E402
+
+PAGE_SIZE = 20
+VOCABULARY = [f'word{i}' for i in range(20000)]
+
+
+def populate(count):
+    """
+    Insert `count` messages of 12 random words; about 1 in 100,000 says 'zebra'
+    """
+    user = User.objects.create_user(
+        username='alice', email='alice@example.com', password='x', first_name='Alice', last_name='A'
+    )
+    conversation = Conversation.objects.create()
+    conversation.participants.add(user)
+
+    rng = random.Random(42)
+    now = timezone.now().isoformat()
+    sql = (
+        "INSERT INTO chats_message (message_id, sender_id, conversation_id, message_body, sent_at) "
+        "VALUES (%s, %s, %s, %s, %s)"
+    )
+    start = time.perf_counter()
+    for offset in range(0, count, 50000):
+        rows = []
+        for i in range(offset, min(offset + 50000, count)):
+            words = rng.choices(VOCABULARY, k=12)
+            if i % 100000 == 0:
+                words[rng.randrange(12)] = 'zebra'
+            rows.append((uuid.uuid4().hex, user.pk.hex, conversation.pk.hex, ' '.join(words), now))
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(sql, rows)
+    print(f"loaded {count:,} messages in {time.perf_counter() - start:.1f}s")
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def best_of(query, repeat=3):
+    """
+    Return (fastest time in ms, rows) for evaluating a queryset's first page
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = list(query()[:PAGE_SIZE])
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings), len(rows)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+
+    call_command('migrate', verbosity=0)
+    populate(count)
+    messages = Message.objects.all()
+
+    print(f"{'query':<10} {'strategy':<12} {'ms':>10} {'rows':>6}")
+    for word in ('zebra', 'word7'):
+        for label, query in (
+            ('icontains', lambda: messages.filter(message_body__icontains=word).order_by('-sent_at')),
+            ('full-text', lambda: search_messages(messages, word)),
+        ):
+            elapsed, rows = best_of(query)
+            print(f"{word:<10} {label:<12} {elapsed:>10.1f} {rows:>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Benchmark the DRF serializers against the `.values()` row serializers
+
+Builds a throwaway SQLite database with group conversations and times the
+list and retrieve endpoints of messages and conversations with
+CHATS_FAST_SERIALIZERS off and on, checking that both return the same bytes.
+
+Usage:
+    python benchmarks/bench_serializers.py [messages] [conversations]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'messaging_app.settings')
+os.environ['DB_NAME'] = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from chats.models import Conversation, Message, User  # noqa: E402
+
+PARTICIPANTS = 8
+
+
+def populate(count, conversations):
+    """
+    Create group conversations of PARTICIPANTS users sharing `count` messages
+    """
+    users = [
+        User.objects.create_user(
+            username=f'user{i}', email=f'user{i}@example.com', password='x',
+            first_name=f'User{i}', last_name='Bench',
+            phone_number=f'+2547000{i:05d}' if i % 2 else None
+        )
+        for i in range(conversations + PARTICIPANTS)
+    ]
+    groups = []
+    for i in range(conversations):
+        conversation = Conversation.objects.create()
+        members = users[i:i + PARTICIPANTS]
+        conversation.participants.add(*members)
+        groups.append((conversation, members))
+
+    Message._meta.get_field('sent_at').auto_now_add = False
+    start = timezone.now() - timedelta(seconds=count)
+    batch = []
+    for i in range(count):
+        conversation, members = groups[i % conversations]
+        batch.append(Message(
+            sender=members[i % PARTICIPANTS], conversation=conversation,
+            message_body=f'message {i}', sent_at=start + timedelta(seconds=i)
+        ))
+        if len(batch) == 5000:
+            Message.objects.bulk_create(batch)
+            batch = []
+    Message.objects.bulk_create(batch)
+    Conversation.objects.refresh_activity()
+    Conversation.objects.refresh_participant_count()
+
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    # the user taking part in the most conversations
+    return users[PARTICIPANTS - 1], groups[0][0]
+
+
+def best_of(client, url, repeat=15):
+    """
+    Return (fastest of `repeat` requests in milliseconds, response body)
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url)
+        timings.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.status_code
+    return min(timings), response.content
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    conversations = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    setup_test_environment()
+    call_command('migrate', verbosity=0)
+    client = APIClient()
+    user, conversation = populate(count, conversations)
+    client.force_authenticate(user)
+    message = conversation.messages.first()
+
+    urls = [
+        ('messages list, 100', '/api/messages/?page_size=100'),
+        ('message retrieve', f'/api/messages/{message.pk}/'),
+        ('conversations list, 50', '/api/conversations/?page_size=50'),
+        ('conversation retrieve, 100', f'/api/conversations/{conversation.pk}/?messages_limit=100'),
+    ]
+    print(f"{count:,} messages in {conversations} conversations of {PARTICIPANTS}")
+    print(f"{'endpoint':<28} {'DRF ms':>8} {'rows ms':>8} {'speedup':>8}")
+    for name, url in urls:
+        with override_settings(CHATS_FAST_SERIALIZERS=False):
+            slow, slow_body = best_of(client, url)
+        with override_settings(CHATS_FAST_SERIALIZERS=True):
+            fast, fast_body = best_of(client, url)
+        assert slow_body == fast_body, name
+        print(f"{name:<28} {slow:>8.2f} {fast:>8.2f} {slow / fast:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -20,15 +20,11 @@ class UserAdmin(BaseUserAdmin):
 
 @admin.register(Conversation)
 class ConversationAdmin(admin.ModelAdmin):
-    list_display = ('conversation_id', 'participant_count', 'created_at')
+    list_display = ('conversation_id', 'participant_count', 'message_count', 'last_message_at', 'created_at')
     list_filter = ('created_at',)
     search_fields = ('participants__email', 'participants__first_name', 'participants__last_name')
     filter_horizontal = ('participants',)
-    readonly_fields = ('conversation_id', 'created_at')
-    
-    def participant_count(self, obj):
-        return obj.participants.count()
-    participant_count.short_description = 'Participants'
+    readonly_fields = ('conversation_id', 'created_at', 'participant_count', 'message_count', 'last_message_at')
 
 
 @admin.register(Message)
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class ChatsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "chats"
+    
+    def ready(self):
+        """Import signals and register checks when Django starts."""
+        import chats.signals
+        from django.core import checks
+        from chats.renderers import check_json_backend
+        checks.register(check_json_backend)
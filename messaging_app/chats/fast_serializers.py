@@ -0,0 +1,246 @@
+from django.conf import settings
+from rest_framework.relations import PrimaryKeyRelatedField
+from .models import User, Conversation, Message
+from .serializers import (
+    UserSerializer,
+    MessageSerializer,
+    ConversationSerializer,
+    ConversationListSerializer,
+    messages_next_link
+)
+
+
+def is_enabled():
+    return getattr(settings, 'CHATS_FAST_SERIALIZERS', True)
+
+
+def _representer(field):
+    """
+    Return a function that formats a column value the way `field` does
+    """
+    if isinstance(field, PrimaryKeyRelatedField):
+        # .values() already holds the primary key, not the related object
+        to_representation = field.pk_field.to_representation if field.pk_field else None
+    else:
+        to_representation = field.to_representation
+    
+    if to_representation is None:
+        return lambda value: value
+    
+    def represent(value):
+        return None if value is None else to_representation(value)
+    return represent
+
+
+class RowSerializer:
+    """
+    Read-only serializer of `.values()` rows, mirroring a DRF serializer
+    
+    The readable fields of `serializer_class` are resolved once per class
+    into (name, column, formatter) getters, so serializing a row is a single
+    dict comprehension instead of a pass through the field machinery for
+    each object. A field is read from the column named in `columns`, or from
+    its `source`; a `get_<field name>(row)` method takes precedence, like
+    SerializerMethodField. `row_columns` lists what to pass to `.values()`.
+    
+    Output is meant to be byte-identical to `serializer_class` once rendered.
+    """
+    serializer_class = None
+    columns = {}
+    extra_columns = ()
+    
+    def __init__(self, request=None, users=None):
+        self.request = request
+        self.users = users if users is not None else UserCache(request)
+        getters = []
+        for name, column, represent in self.get_fields():
+            method = getattr(self, f'get_{name}', None)
+            if method is not None:
+                getters.append((name, method))
+            else:
+                getters.append((name, lambda row, column=column, represent=represent: represent(row[column])))
+        self.getters = getters
+    
+    @classmethod
+    def get_fields(cls):
+        if '_fields' not in cls.__dict__:
+            cls._fields = [
+                (name, cls.columns.get(name, field.source), _representer(field))
+                for name, field in cls.serializer_class().fields.items()
+                if not field.write_only
+            ]
+        return cls._fields
+    
+    @classmethod
+    def get_row_columns(cls):
+        if '_row_columns' not in cls.__dict__:
+            columns = [
+                column for name, column, _ in cls.get_fields()
+                if not hasattr(cls, f'get_{name}')
+            ]
+            cls._row_columns = tuple(dict.fromkeys(columns + list(cls.extra_columns)))
+        return cls._row_columns
+    
+    @classmethod
+    def row_from(cls, instance):
+        """
+        Return the row of a model instance, e.g. one found by get_object()
+        """
+        return {column: getattr(instance, column) for column in cls.get_row_columns()}
+    
+    def prepare(self, rows):
+        """
+        Hook to fetch what the rows refer to, once for all of them
+        """
+    
+    def to_representation(self, row):
+        return {name: get(row) for name, get in self.getters}
+    
+    def many(self, rows):
+        rows = list(rows)
+        self.prepare(rows)
+        return [self.to_representation(row) for row in rows]
+    
+    def one(self, row):
+        return self.many([row])[0]
+
+
+class UserRowSerializer(RowSerializer):
+    serializer_class = UserSerializer
+    
+    def get_full_name(self, row):
+        return f"{row['first_name']} {row['last_name']}"
+
+
+class UserCache:
+    """
+    Serialized users by primary key, kept on the request
+    
+    Most pages name the same few senders and participants over and over,
+    so each user is fetched and serialized at most once per request.
+    """
+    
+    def __init__(self, request=None):
+        if request is not None:
+            self.users = request.__dict__.setdefault('_chats_users', {})
+        else:
+            self.users = {}
+    
+    def load(self, user_ids):
+        missing = {pk for pk in user_ids if pk not in self.users}
+        if missing:
+            rows = User.objects.filter(pk__in=missing).values(*UserRowSerializer.get_row_columns())
+            serializer = UserRowSerializer(users=self)
+            for row in rows:
+                self.users[row['user_id']] = serializer.to_representation(row)
+    
+    def __getitem__(self, pk):
+        return self.users[pk]
+
+
+class MessageRowSerializer(RowSerializer):
+    serializer_class = MessageSerializer
+    columns = {
+        'conversation': 'conversation_id',
+        'conversation_id': 'conversation_id',
+    }
+    extra_columns = ('sender_id',)
+    
+    def prepare(self, rows):
+        self.users.load({row['sender_id'] for row in rows})
+    
+    def get_sender(self, row):
+        return self.users[row['sender_id']]
+
+
+class ConversationRowMixin:
+    """
+    Participants of conversation rows, fetched from the participants table
+    """
+    extra_columns = ('conversation_id',)
+    
+    def prepare(self, rows):
+        memberships = Conversation.participants.through.objects.filter(
+            conversation_id__in=[row['conversation_id'] for row in rows]
+        ).order_by('conversation_id', 'user_id').values_list('conversation_id', 'user_id')
+        self.participants = {}
+        for conversation_id, user_id in memberships:
+            self.participants.setdefault(conversation_id, []).append(user_id)
+        self.users.load({user_id for user_ids in self.participants.values() for user_id in user_ids})
+    
+    def get_participants(self, row):
+        return [self.users[pk] for pk in self.participants.get(row['conversation_id'], ())]
+
+
+class ConversationListRowSerializer(ConversationRowMixin, RowSerializer):
+    serializer_class = ConversationListSerializer
+    extra_columns = (
+        'conversation_id', 'last_message_id', 'last_message__message_body',
+        'last_message__sent_at', 'last_message__sender__first_name',
+        'last_message__sender__last_name'
+    )
+    
+    def get_latest_message(self, row):
+        if row['last_message_id'] is None:
+            return None
+        return {
+            'message_id': row['last_message_id'],
+            'message_body': row['last_message__message_body'],
+            'sender': f"{row['last_message__sender__first_name']} {row['last_message__sender__last_name']}",
+            'sent_at': row['last_message__sent_at']
+        }
+
+
+class ConversationRowSerializer(ConversationRowMixin, RowSerializer):
+    serializer_class = ConversationSerializer
+    extra_columns = ('conversation_id', 'last_message_id')
+    
+    def prepare(self, rows):
+        super().prepare(rows)
+        limit = ConversationSerializer(context={'request': self.request}).get_messages_limit()
+        serializer = MessageRowSerializer(self.request, self.users)
+        self.recent = {}
+        for row in rows:
+            # one row past the limit: tells whether there are older messages,
+            # and is the latest message when the limit is 0
+            recent = list(
+                Message.objects.filter(conversation_id=row['conversation_id'])
+                .order_by('-sent_at', '-message_id')
+                .values(*MessageRowSerializer.get_row_columns())[:limit + 1]
+            )
+            self.recent[row['conversation_id']] = (recent, serializer.many(recent), limit)
+        # latest_message is Conversation.last_message, as in the list; it is
+        # normally the first recent message, so fetch only the others
+        missing = [
+            row['last_message_id'] for row in rows
+            if row['last_message_id'] is not None and not self.is_first_recent(row)
+        ]
+        self.latest = {}
+        if missing:
+            latest = list(Message.objects.filter(pk__in=missing).values(
+                *MessageRowSerializer.get_row_columns()
+            ))
+            self.latest = {
+                item['message_id']: data for item, data in zip(latest, serializer.many(latest))
+            }
+    
+    def is_first_recent(self, row):
+        recent, _, _ = self.recent[row['conversation_id']]
+        return bool(recent) and recent[0]['message_id'] == row['last_message_id']
+    
+    def get_messages(self, row):
+        _, data, limit = self.recent[row['conversation_id']]
+        return data[:limit]
+    
+    def get_messages_next(self, row):
+        recent, _, limit = self.recent[row['conversation_id']]
+        if len(recent) <= limit:
+            return None
+        return messages_next_link(self.request, row['conversation_id'], recent[limit - 1] if limit else None)
+    
+    def get_latest_message(self, row):
+        if row['last_message_id'] is None:
+            return None
+        if self.is_first_recent(row):
+            return self.recent[row['conversation_id']][1][0]
+        return self.latest[row['last_message_id']]
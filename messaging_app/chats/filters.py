@@ -2,6 +2,7 @@ import django_filters
 from django.db import models
 from django_filters import rest_framework as filters
 from .models import Message, Conversation, User
+from .search import search_messages
 
 
 class MessageFilter(filters.FilterSet):
@@ -23,6 +24,7 @@ class MessageFilter(filters.FilterSet):
     
     # Search in message content
     message_contains = filters.CharFilter(field_name='message_body', lookup_expr='icontains')
+    message_search = filters.CharFilter(method='filter_by_full_text')
     
     class Meta:
         model = Message
@@ -33,6 +35,12 @@ class MessageFilter(filters.FilterSet):
             'sender': ['exact'],
         }
     
+    def filter_by_full_text(self, queryset, name, value):
+        """
+        Filter messages containing every word of the value, using the full-text index
+        """
+        return search_messages(queryset, value)
+    
     def filter_by_sender_name(self, queryset, name, value):
         """
         Filter messages by sender's first name or last name
@@ -85,17 +93,13 @@ class ConversationFilter(filters.FilterSet):
         """
         Filter conversations with minimum number of participants
         """
-        return queryset.annotate(
-            participant_count=models.Count('participants')
-        ).filter(participant_count__gte=value)
+        return queryset.filter(participant_count__gte=value)
     
     def filter_by_max_participants(self, queryset, name, value):
         """
         Filter conversations with maximum number of participants
         """
-        return queryset.annotate(
-            participant_count=models.Count('participants')
-        ).filter(participant_count__lte=value)
+        return queryset.filter(participant_count__lte=value)
 
 
 class UserFilter(filters.FilterSet):
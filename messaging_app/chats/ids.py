@@ -0,0 +1,40 @@
+import os
+import threading
+import time
+import uuid
+
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+
+
+def uuid7():
+    """
+    Return a time-ordered UUID, version 7 (RFC 9562)
+
+    The first 48 bits are the Unix time in milliseconds, so new primary keys
+    land next to each other at the end of the index instead of at random
+    pages. The next 12 bits are a counter, randomly seeded every millisecond
+    and incremented within one, so ids made by this process keep increasing;
+    the last 62 bits are random.
+
+    Returns:
+        uuid.UUID: a version 7 UUID
+    """
+    global _last_ms, _counter
+    ms = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10), 'big')
+    with _lock:
+        if ms > _last_ms:
+            # the top bit stays clear, leaving room to count up
+            _last_ms, _counter = ms, rand >> 69
+        else:
+            # same millisecond, or the clock went back: keep counting
+            _counter += 1
+            if _counter > 0xFFF:
+                _last_ms, _counter = _last_ms + 1, 0
+        ms, counter = _last_ms, _counter
+
+    value = (ms & 0xFFFF_FFFF_FFFF) << 80 | 0x7 << 76 | counter << 64
+    value |= 0b10 << 62 | rand & (1 << 62) - 1
+    return uuid.UUID(int=value)
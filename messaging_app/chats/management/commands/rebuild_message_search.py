@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from chats.search import backend, rebuild_index
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the full-text index used by message search
+    """
+    help = "Rebuild the SQLite FTS5 message index, e.g. after raw changes that bypassed its triggers"
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help="Database alias")
+    
+    def handle(self, *args, **options):
+        using = options['database']
+        if rebuild_index(using):
+            self.stdout.write(self.style.SUCCESS("Rebuilt the message full-text index"))
+        else:
+            self.stdout.write(f"Nothing to rebuild (backend: {backend(using) or 'icontains'})")
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from chats.models import Conversation
+
+
+class Command(BaseCommand):
+    """
+    Recompute the denormalized activity columns of conversations
+    """
+    help = (
+        "Repair last_message_at, last_message, message_count and participant_count "
+        "on conversations whose stored values no longer match their messages and participants"
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Only report drifted conversations, exit with an error if any are found"
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help="Recompute every conversation instead of only the drifted ones"
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="Conversations updated per query (default: 1000)"
+        )
+    
+    def handle(self, *args, **options):
+        if options['all'] and not options['check']:
+            updated = Conversation.objects.refresh_activity()
+            self.stdout.write(self.style.SUCCESS(f"Recomputed {updated} conversation(s)"))
+            return
+        
+        drifted = list(Conversation.objects.drifted().values_list('pk', flat=True))
+        if options['check']:
+            if drifted:
+                raise CommandError(f"{len(drifted)} conversation(s) have drifted activity columns")
+            self.stdout.write(self.style.SUCCESS("All conversations are in sync"))
+            return
+        
+        batch_size = options['batch_size']
+        for start in range(0, len(drifted), batch_size):
+            Conversation.objects.filter(pk__in=drifted[start:start + batch_size]).refresh_activity()
+        self.stdout.write(self.style.SUCCESS(f"Repaired {len(drifted)} conversation(s)"))
@@ -0,0 +1,79 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from .models import Conversation
+
+CACHE_KEY = 'chats:membership:{conversation_id}:{user_id}'
+
+
+def _pk(obj):
+    return getattr(obj, 'pk', obj)
+
+
+def _cache_key(conversation_id, user_id):
+    # one key per pair however the ids are spelled (UUID, hex, upper case)
+    return CACHE_KEY.format(
+        conversation_id=uuid.UUID(str(_pk(conversation_id))),
+        user_id=uuid.UUID(str(_pk(user_id)))
+    )
+
+
+def _cache_ttl():
+    return getattr(settings, 'CHATS_MEMBERSHIP_CACHE_TTL', 0)
+
+
+def is_participant(user, conversation, request=None):
+    """
+    Check whether a user takes part in a conversation
+    
+    Runs an EXISTS query on the participants table, served by its unique
+    (conversation_id, user_id) index, instead of loading every participant.
+    Answers are memoized on the request and, when CHATS_MEMBERSHIP_CACHE_TTL
+    is set, in the cache for that many seconds.
+    
+    Args:
+        user: User instance or user_id
+        conversation: Conversation instance or conversation_id
+        request: Optional request used for memoization
+    
+    Returns:
+        bool: True if the user is a participant
+    """
+    user_id, conversation_id = _pk(user), _pk(conversation)
+    if user_id is None or conversation_id is None:
+        return False
+    
+    memo = None
+    if request is not None:
+        memo = request.__dict__.setdefault('_chats_membership', {})
+        key = (str(conversation_id), str(user_id))
+        if key in memo:
+            return memo[key]
+    
+    ttl = _cache_ttl()
+    cache_key = _cache_key(conversation_id, user_id) if ttl else None
+    member = cache.get(cache_key) if ttl else None
+    if member is None:
+        member = Conversation.participants.through.objects.filter(
+            conversation_id=conversation_id, user_id=user_id
+        ).exists()
+        if ttl:
+            cache.set(cache_key, member, ttl)
+    
+    if memo is not None:
+        memo[key] = member
+    return member
+
+
+def invalidate(conversation_ids, user_ids):
+    """
+    Drop cached answers for every (conversation, user) pair given
+    """
+    if not _cache_ttl():
+        return
+    cache.delete_many([
+        _cache_key(conversation_id, user_id)
+        for conversation_id in conversation_ids
+        for user_id in user_ids
+    ])
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_activity(apps, schema_editor):
+    """
+    Fill the denormalized activity columns of existing conversations
+    """
+    Conversation = apps.get_model('chats', 'Conversation')
+    Message = apps.get_model('chats', 'Message')
+    Membership = Conversation.participants.through
+
+    def count(queryset):
+        counted = queryset.order_by().annotate(
+            total=models.Func(models.Value(1), function='COUNT')
+        ).values('total')
+        return Coalesce(models.Subquery(counted, output_field=models.IntegerField()), 0)
+
+    messages = Message.objects.filter(conversation=models.OuterRef('pk'))
+    latest = messages.order_by('-sent_at', '-message_id')
+    Conversation.objects.update(
+        message_count=count(messages),
+        participant_count=count(Membership.objects.filter(conversation=models.OuterRef('pk'))),
+        last_message_at=models.Subquery(latest.values('sent_at')[:1]),
+        last_message_id=models.Subquery(latest.values('message_id')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='chats.message'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='message_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='participant_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['-last_message_at'], name='chats_conv_last_msg_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', '-sent_at'], name='chats_msg_conv_sent_idx'),
+        ),
+        migrations.RunPython(backfill_activity, migrations.RunPython.noop),
+    ]
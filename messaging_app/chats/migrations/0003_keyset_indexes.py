@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0002_conversation_activity'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['-created_at', '-conversation_id'], name='chats_conv_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['-sent_at', '-message_id'], name='chats_msg_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,129 @@
+import chats.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+FTS_TABLE = 'chats_message_fts'
+MYSQL_INDEX = 'chats_msg_body_ft'
+KEY_TABLE = 'chats_message_fts_key'
+
+# Contentless FTS5 index keyed by an explicit INTEGER PRIMARY KEY per
+# message, kept in sync by triggers. The implicit rowid of chats_message
+# is not used as the key because VACUUM may renumber it.
+SQLITE_CREATE = [
+    f"""
+    CREATE TABLE {KEY_TABLE} (
+        docid integer NOT NULL PRIMARY KEY AUTOINCREMENT,
+        message_id char(32) NOT NULL UNIQUE
+    )
+    """,
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        message_body, content='', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER chats_message_fts_insert AFTER INSERT ON chats_message BEGIN
+        INSERT INTO {KEY_TABLE}(message_id) VALUES (new.message_id);
+        INSERT INTO {FTS_TABLE}(rowid, message_body) VALUES (last_insert_rowid(), new.message_body);
+    END
+    """,
+    f"""
+    CREATE TRIGGER chats_message_fts_delete AFTER DELETE ON chats_message BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, message_body)
+        SELECT 'delete', docid, old.message_body FROM {KEY_TABLE} WHERE message_id = old.message_id;
+        DELETE FROM {KEY_TABLE} WHERE message_id = old.message_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER chats_message_fts_update AFTER UPDATE OF message_id, message_body ON chats_message
+    BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, message_body)
+        SELECT 'delete', docid, old.message_body FROM {KEY_TABLE} WHERE message_id = old.message_id;
+        UPDATE {KEY_TABLE} SET message_id = new.message_id WHERE message_id = old.message_id;
+        INSERT INTO {FTS_TABLE}(rowid, message_body)
+        SELECT docid, new.message_body FROM {KEY_TABLE} WHERE message_id = new.message_id;
+    END
+    """,
+    f"INSERT INTO {KEY_TABLE}(message_id) SELECT message_id FROM chats_message",
+    f"""
+    INSERT INTO {FTS_TABLE}(rowid, message_body)
+    SELECT k.docid, m.message_body FROM {KEY_TABLE} k JOIN chats_message m ON m.message_id = k.message_id
+    """,
+]
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS chats_message_fts_insert",
+    "DROP TRIGGER IF EXISTS chats_message_fts_delete",
+    "DROP TRIGGER IF EXISTS chats_message_fts_update",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+    f"DROP TABLE IF EXISTS {KEY_TABLE}",
+]
+
+
+def sqlite_has_fts5(cursor):
+    cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+    if cursor.fetchone()[0]:
+        return True
+    try:
+        cursor.execute("CREATE VIRTUAL TABLE temp.chats_fts5_probe USING fts5(x)")
+        cursor.execute("DROP TABLE temp.chats_fts5_probe")
+        return True
+    except Exception:
+        return False
+
+
+def create_fulltext_index(apps, schema_editor):
+    """
+    Create the full-text index for the database in use; other vendors keep
+    the icontains fallback in chats.search
+    """
+    vendor = schema_editor.connection.vendor
+    with schema_editor.connection.cursor() as cursor:
+        if vendor == 'sqlite' and sqlite_has_fts5(cursor):
+            for statement in SQLITE_CREATE:
+                cursor.execute(statement)
+        elif vendor == 'mysql':
+            cursor.execute(f"CREATE FULLTEXT INDEX {MYSQL_INDEX} ON chats_message (message_body)")
+
+
+def drop_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    with schema_editor.connection.cursor() as cursor:
+        if vendor == 'sqlite':
+            for statement in SQLITE_DROP:
+                cursor.execute(statement)
+        elif vendor == 'mysql':
+            cursor.execute(f"DROP INDEX {MYSQL_INDEX} ON chats_message")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0003_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MessageSearchKey',
+            fields=[
+                ('docid', models.AutoField(primary_key=True, serialize=False)),
+            ],
+            options={
+                'db_table': 'chats_message_fts_key',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='MessageSearchIndex',
+            fields=[
+                ('key', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='index', serialize=False, to='chats.messagesearchkey')),
+                ('message_body', chats.models.FullTextField()),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'chats_message_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
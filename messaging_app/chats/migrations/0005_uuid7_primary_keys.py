@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-19 11:23
+
+import chats.ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0004_message_fulltext'),
+    ]
+
+    # The default is applied in Python, so only the model state changes.
+    # Altering the primary keys for real would rebuild the tables on SQLite
+    # and drop the search triggers on chats_message. Existing rows keep
+    # their version 4 ids, which appear in URLs, tokens and cursors; old
+    # and new ids live side by side and nothing depends on the version.
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='conversation',
+                    name='conversation_id',
+                    field=models.UUIDField(db_index=True, default=chats.ids.uuid7, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='message',
+                    name='message_id',
+                    field=models.UUIDField(db_index=True, default=chats.ids.uuid7, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='user',
+                    name='user_id',
+                    field=models.UUIDField(db_index=True, default=chats.ids.uuid7, editable=False, primary_key=True, serialize=False),
+                ),
+            ],
+        ),
+    ]
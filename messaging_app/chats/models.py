@@ -1,5 +1,6 @@
 from django.db import models
-import uuid
+from django.db.models import Lookup
+from .ids import uuid7
 from django.contrib.auth.models import AbstractUser
 
 
@@ -16,7 +17,7 @@ class User(AbstractUser):
     # override the default id field with UUID
     user_id = models.UUIDField(
         primary_key=True, 
-        default=uuid.uuid4, 
+        default=uuid7, 
         editable=False,
         db_index=True
     )
@@ -59,13 +60,101 @@ class User(AbstractUser):
     #     return self.password
 
 
+class ConversationQuerySet(models.QuerySet):
+    """
+    QuerySet with helpers for conversation list pages
+    """
+    
+    def with_latest_message(self):
+        """
+        Join each conversation to its latest message and that message's sender
+        
+        Reads the denormalized last_message kept current by record_message,
+        so a whole page of conversations is fetched in a single query.
+        """
+        return self.select_related('last_message__sender')
+    
+    def with_actual_activity(self):
+        """
+        Annotate each conversation with activity computed from the source tables
+        
+        The actual_* annotations are what the denormalized columns should hold.
+        """
+        return self.annotate(**{
+            f'actual_{name}': expression
+            for name, expression in _activity_expressions().items()
+        })
+    
+    def drifted(self):
+        """
+        Return the conversations whose denormalized columns are out of date
+        """
+        in_sync = models.Q()
+        for name in _activity_expressions():
+            actual = f'actual_{name}'
+            in_sync &= (
+                models.Q(**{name: models.F(actual)}) |
+                models.Q(**{f'{name}__isnull': True, f'{actual}__isnull': True})
+            )
+        return self.with_actual_activity().alias(
+            in_sync=models.Case(
+                models.When(in_sync, then=models.Value(True)),
+                default=models.Value(False),
+            )
+        ).filter(in_sync=False)
+    
+    def refresh_activity(self):
+        """
+        Recompute every denormalized activity column from the source tables
+        
+        Returns:
+            int: Number of conversations updated
+        """
+        return self.update(**_activity_expressions())
+    
+    def refresh_participant_count(self):
+        """
+        Recompute participant_count from the participants table
+        """
+        return self.update(participant_count=_activity_expressions()['participant_count'])
+
+
+def _activity_expressions():
+    """
+    Expressions computing each denormalized activity column of a conversation
+    """
+    messages = Message.objects.filter(conversation=models.OuterRef('pk'))
+    latest = messages.order_by('-sent_at', '-message_id')
+    members = Conversation.participants.through.objects.filter(
+        conversation=models.OuterRef('pk')
+    )
+    return {
+        'message_count': _count_subquery(messages),
+        'participant_count': _count_subquery(members),
+        'last_message_at': models.Subquery(latest.values('sent_at')[:1]),
+        'last_message_id': models.Subquery(latest.values('message_id')[:1]),
+    }
+
+
+def _count_subquery(queryset):
+    """
+    COUNT(*) of a correlated queryset as an expression, 0 when it is empty
+    """
+    counted = queryset.order_by().annotate(
+        total=models.Func(models.Value(1), function='COUNT')
+    ).values('total')
+    return models.functions.Coalesce(
+        models.Subquery(counted, output_field=models.IntegerField()), 0
+    )
+
+
 class Conversation(models.Model):
     """
     Conversation model that tracks which users are involved in a conversation
     """
     conversation_id = models.UUIDField(
         primary_key=True,
-        default=uuid.uuid4,
+        default=uuid7,
         editable=False,
         db_index=True
     )
@@ -79,11 +168,31 @@ class Conversation(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
     
+    # denormalized activity, maintained on every message and participant change;
+    # `manage.py repair_conversation_activity` recomputes them from the source tables
+    last_message_at = models.DateTimeField(null=True, blank=True, editable=False)
+    last_message = models.ForeignKey(
+        'Message',
+        on_delete=models.SET_NULL,
+        related_name='+',
+        null=True,
+        blank=True,
+        editable=False
+    )
+    message_count = models.PositiveIntegerField(default=0, editable=False)
+    participant_count = models.PositiveIntegerField(default=0, editable=False)
+    
+    objects = ConversationQuerySet.as_manager()
+    
     class Meta:
         db_table = 'chats_conversation'
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['created_at']),
+            # inbox ordering by recent activity
+            models.Index(fields=['-last_message_at'], name='chats_conv_last_msg_idx'),
+            # keyset pagination order
+            models.Index(fields=['-created_at', '-conversation_id'], name='chats_conv_keyset_idx'),
         ]
     
     def __str__(self):
@@ -92,12 +201,31 @@ class Conversation(models.Model):
             participant_names += f" and {self.participants.count() - 3} others"
         return f"Conversation: {participant_names}"
     
-    @property
-    def participant_count(self):
-        return self.participants.count()
-    
     def get_latest_message(self):
-        return self.messages.first()  # assuming messages are ordered by sent_at desc
+        return self.messages.order_by('-sent_at', '-message_id').first()
+    
+    def record_message(self, message):
+        """
+        Update the activity columns for a newly created message
+        
+        The update happens in the database, so concurrent senders never lose
+        a count, and last_message only moves forward in time.
+        """
+        is_newer = (
+            models.Q(last_message_at__isnull=True) |
+            models.Q(last_message_at__lte=message.sent_at)
+        )
+        Conversation.objects.filter(pk=self.pk).update(
+            message_count=models.F('message_count') + 1,
+            last_message_at=models.Case(
+                models.When(is_newer, then=models.Value(message.sent_at)),
+                default=models.F('last_message_at'),
+            ),
+            last_message_id=models.Case(
+                models.When(is_newer, then=models.Value(message.pk, output_field=models.UUIDField())),
+                default=models.F('last_message_id'),
+            ),
+        )
 
 
 class Message(models.Model):
@@ -106,7 +234,7 @@ class Message(models.Model):
     """
     message_id = models.UUIDField(
         primary_key=True,
-        default=uuid.uuid4,
+        default=uuid7,
         editable=False,
         db_index=True
     )
@@ -137,8 +265,77 @@ class Message(models.Model):
             models.Index(fields=['sent_at']),
             models.Index(fields=['sender']),
             models.Index(fields=['conversation']),
+            # latest message per conversation
+            models.Index(fields=['conversation', '-sent_at'], name='chats_msg_conv_sent_idx'),
+            # keyset pagination order
+            models.Index(fields=['-sent_at', '-message_id'], name='chats_msg_keyset_idx'),
         ]
     
     def __str__(self):
         preview = self.message_body[:50] + "..." if len(self.message_body) > 50 else self.message_body
         return f"{self.sender.full_name}: {preview}"
+
+
+class FullTextField(models.TextField):
+    """
+    Column of a SQLite FTS5 table, supports the `match` lookup
+    """
+
+
+@FullTextField.register_lookup
+class Match(Lookup):
+    """
+    `column MATCH query`, the query in FTS5 syntax
+    """
+    lookup_name = 'match'
+    
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+class MessageSearchKey(models.Model):
+    """
+    Integer key of a message in the SQLite full-text index
+    
+    Message ids are UUIDs, so the index cannot use them as its rowid, and
+    the implicit rowid of chats_message may change on VACUUM. docid is an
+    INTEGER PRIMARY KEY, which VACUUM keeps. Rows are maintained by triggers
+    on chats_message (migration 0004), never through the ORM.
+    """
+    docid = models.AutoField(primary_key=True)
+    message = models.OneToOneField(
+        Message,
+        on_delete=models.DO_NOTHING,
+        db_column='message_id',
+        db_constraint=False,
+        related_name='search_key'
+    )
+    
+    class Meta:
+        managed = False
+        db_table = 'chats_message_fts_key'
+
+
+class MessageSearchIndex(models.Model):
+    """
+    Row of the contentless FTS5 index over message bodies, keyed by docid
+    
+    message_body only supports the `match` lookup; its value is not stored.
+    rank is the bm25 score of the current match, lower meaning better.
+    """
+    key = models.OneToOneField(
+        MessageSearchKey,
+        primary_key=True,
+        on_delete=models.DO_NOTHING,
+        db_column='rowid',
+        db_constraint=False,
+        related_name='index'
+    )
+    message_body = FullTextField()
+    rank = models.FloatField()
+    
+    class Meta:
+        managed = False
+        db_table = 'chats_message_fts'
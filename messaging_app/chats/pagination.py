@@ -1,5 +1,16 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+import json
+from collections import namedtuple
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination, _positive_int
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+Cursor = namedtuple('Cursor', ['ordering', 'values', 'reverse'])
 
 
 class MessagePagination(PageNumberPagination):
@@ -65,4 +76,241 @@ class StandardResultsSetPagination(PageNumberPagination):
                 'page_size': self.get_page_size(self.request),
             },
             'results': data
-        })
\ No newline at end of file
+        })
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination that seeks on a unique ordering instead of using OFFSET
+    
+    Each page is fetched with a WHERE clause on the last row of the previous
+    page, so deep pages cost the same as the first one. Cursors are opaque
+    strings. The total count is only computed when `?count=true` is passed.
+    
+    `orderings` lists the supported orderings, each ending with a unique
+    tie-breaker; the first one is the default. The `?ordering=` parameter of
+    OrderingFilter may select another one or reverse it. Only the leading
+    field may be nullable; NULLs sort last in descending order.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    ordering_query_param = 'ordering'
+    orderings = ()
+    invalid_cursor_message = 'Invalid cursor'
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+        self.ordering = self.get_ordering(request)
+        cursor = self.decode_cursor(request)
+        
+        self.count = None
+        if request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes'):
+            self.count = queryset.count()
+        
+        reverse = cursor is not None and cursor.reverse
+        ordering = _reversed(self.ordering) if reverse else self.ordering
+        nullable = [self._field(name).null for name in ordering]
+        queryset = queryset.order_by(*[
+            _order_by(name, null) for name, null in zip(ordering, nullable)
+        ])
+        if cursor is not None:
+            queryset = queryset.filter(_after(ordering, cursor.values, nullable))
+        
+        # one extra row tells whether there is another page in this direction
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.page = rows
+        return rows
+    
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                return _positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size
+                )
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+    
+    def get_ordering(self, request):
+        """
+        Return the ordering requested through `?ordering=`, or the default
+        """
+        requested = request.query_params.get(self.ordering_query_param, '').split(',')[0].strip()
+        for ordering in self.orderings:
+            if requested == ordering[0]:
+                return ordering
+            if requested and requested == _reversed(ordering)[0]:
+                return _reversed(ordering)
+        return self.orderings[0]
+    
+    def decode_cursor(self, request):
+        """
+        Return the Cursor passed in the request, or None on the first page
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            if data['o'] != self.ordering[0] or len(data['v']) != len(self.ordering):
+                raise ValueError(data['o'])
+            values = [
+                None if value is None else self._field(name).to_python(value)
+                for name, value in zip(self.ordering, data['v'])
+            ]
+            return Cursor(self.ordering, values, bool(data['r']))
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError,
+                binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+    
+    def encode_cursor(self, row, reverse):
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param,
+            self.cursor_for(row, reverse)
+        )
+    
+    def cursor_for(self, row, reverse=False):
+        """
+        Return the opaque cursor of the page that starts right after `row`
+        
+        Uses the ordering of the current request, or the default ordering
+        when called outside of paginate_queryset(). `row` may be a model
+        instance or a `.values()` dict.
+        """
+        ordering = getattr(self, 'ordering', None) or self.orderings[0]
+        values = []
+        for name in ordering:
+            name = name.lstrip('-')
+            if isinstance(row, dict):
+                value = row[name]
+            else:
+                value = getattr(row, row._meta.get_field(name).attname)
+            # same text as Field.value_to_string()
+            values.append(None if value is None else _to_string(value))
+        data = json.dumps({'o': ordering[0], 'v': values, 'r': int(reverse)})
+        return base64.urlsafe_b64encode(data.encode()).decode('ascii')
+    
+    def _field(self, name):
+        return self.model._meta.get_field(name.lstrip('-'))
+    
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+    
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+    
+    def get_paginated_response(self, data):
+        return Response({
+            'links': {
+                'next': self.get_next_link(),
+                'previous': self.get_previous_link()
+            },
+            'count': self.count,
+            'page_size': self.page_size,
+            'results': data
+        })
+    
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'links': {
+                    'type': 'object',
+                    'properties': {
+                        'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                        'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                    },
+                },
+                'count': {'type': 'integer', 'nullable': True},
+                'page_size': {'type': 'integer'},
+                'results': schema,
+            },
+        }
+
+
+class MessageCursorPagination(KeysetPagination):
+    """
+    Keyset pagination for messages, newest first, with 20 items per page
+    """
+    page_size = 20
+    max_page_size = 100
+    orderings = (
+        ('-sent_at', '-message_id'),
+    )
+
+
+class ConversationCursorPagination(KeysetPagination):
+    """
+    Keyset pagination for conversations, newest first, with 10 items per page
+    """
+    page_size = 10
+    max_page_size = 50
+    orderings = (
+        ('-created_at', '-conversation_id'),
+        ('-last_message_at', '-conversation_id'),
+    )
+
+
+def _to_string(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+def _reversed(ordering):
+    return tuple(name[1:] if name.startswith('-') else f'-{name}' for name in ordering)
+
+
+def _order_by(name, nullable):
+    if not nullable:
+        # plain ORDER BY, so the database can read it from an index
+        return name
+    if name.startswith('-'):
+        return F(name[1:]).desc(nulls_last=True)
+    return F(name).asc(nulls_first=True)
+
+
+def _after(ordering, values, nullable):
+    """
+    Q matching the rows that sort strictly after `values` in `ordering`
+    """
+    after = Q(pk__in=[])
+    same = Q()
+    for name, value, null in zip(ordering, values, nullable):
+        field = name.lstrip('-')
+        descending = name.startswith('-')
+        if value is None:
+            # NULLs sort last when descending and first when ascending
+            beyond = Q(pk__in=[]) if descending else Q(**{f'{field}__isnull': False})
+        else:
+            beyond = Q(**{f'{field}__{"lt" if descending else "gt"}': value})
+            if descending and null:
+                beyond |= Q(**{f'{field}__isnull': True})
+        after |= same & beyond
+        same &= Q(**{f'{field}__isnull': True}) if value is None else Q(**{field: value})
+    
+    # a plain range on the leading field lets the database seek in its index
+    name, value, null = ordering[0], values[0], nullable[0]
+    if value is not None and not null:
+        field = name.lstrip('-')
+        after &= Q(**{f'{field}__{"lte" if name.startswith("-") else "gte"}': value})
+    return after
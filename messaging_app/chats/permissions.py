@@ -1,4 +1,5 @@
 from rest_framework import permissions
+from .membership import is_participant
 from .models import Conversation, Message
 
 
@@ -18,10 +19,10 @@ class IsParticipantOfConversation(permissions.BasePermission):
         Check if user is a participant of the conversation or message's conversation
         """
         if isinstance(obj, Conversation):
-            return request.user in obj.participants.all()
+            return is_participant(request.user, obj, request)
         
         elif isinstance(obj, Message):
-            return request.user in obj.conversation.participants.all()
+            return is_participant(request.user, obj.conversation_id, request)
         
         return False
 
@@ -45,18 +46,18 @@ class IsOwnerOrParticipant(permissions.BasePermission):
         """
         if isinstance(obj, Message):
             # For messages, check if user is participant in conversation
-            is_participant = request.user in obj.conversation.participants.all()
+            participant = is_participant(request.user, obj.conversation_id, request)
             
             # For safe methods (GET, HEAD, OPTIONS), allow if participant
             if request.method in permissions.SAFE_METHODS:
-                return is_participant
+                return participant
             
             # For unsafe methods (POST, PUT, PATCH, DELETE), allow if owner or participant
-            return is_participant and (obj.sender == request.user or request.method == 'POST')
+            return participant and (obj.sender_id == request.user.pk or request.method == 'POST')
         
         elif isinstance(obj, Conversation):
             # For conversations, user must be a participant
-            return request.user in obj.participants.all()
+            return is_participant(request.user, obj, request)
         
         return False
 
@@ -80,9 +81,9 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
         # Read permissions for safe methods
         if request.method in permissions.SAFE_METHODS:
             if isinstance(obj, Message):
-                return request.user in obj.conversation.participants.all()
+                return is_participant(request.user, obj.conversation_id, request)
             elif isinstance(obj, Conversation):
-                return request.user in obj.participants.all()
+                return is_participant(request.user, obj, request)
         
         # Write permissions only for owner
         if isinstance(obj, Message):
@@ -114,9 +115,9 @@ class IsAuthenticatedAndParticipant(permissions.BasePermission):
         Check object-level permissions
         """
         if isinstance(obj, Conversation):
-            return request.user in obj.participants.all()
+            return is_participant(request.user, obj, request)
         
         elif isinstance(obj, Message):
-            return request.user in obj.conversation.participants.all()
+            return is_participant(request.user, obj.conversation_id, request)
         
         return False
\ No newline at end of file
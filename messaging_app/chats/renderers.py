@@ -0,0 +1,133 @@
+import codecs
+import datetime
+import io
+import uuid
+
+from django.conf import settings
+from django.core import checks
+from rest_framework.compat import LONG_SEPARATORS, SHORT_SEPARATORS
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# common leaf types has_float() skips without further checks
+_SCALARS = frozenset((str, int, bool, type(None), uuid.UUID, datetime.datetime))
+
+
+def has_float(data):
+    """
+    Whether a float appears anywhere in lists, tuples and dicts of `data`
+    """
+    stack = [(data,)]
+    while stack:
+        for item in stack.pop():
+            if type(item) in _SCALARS:
+                continue
+            if isinstance(item, float):
+                return True
+            if isinstance(item, dict):
+                stack.append(item.values())
+            elif isinstance(item, (list, tuple)):
+                stack.append(item)
+    return False
+
+
+def check_json_backend(app_configs=None, **kwargs):
+    """
+    System check: warn when CHATS_JSON_BACKEND asks for a missing orjson
+    """
+    if orjson is None and getattr(settings, 'CHATS_JSON_BACKEND', 'orjson') == 'orjson':
+        return [checks.Warning(
+            "CHATS_JSON_BACKEND is 'orjson' but orjson cannot be imported; "
+            "API responses are rendered with the slower stdlib encoder.",
+            hint="Install orjson (see requirements.txt) or set CHATS_JSON_BACKEND=stdlib.",
+            id='chats.W001',
+        )]
+    return []
+
+
+def use_orjson():
+    """
+    Whether orjson is installed and selected by CHATS_JSON_BACKEND
+    """
+    return orjson is not None and getattr(settings, 'CHATS_JSON_BACKEND', 'orjson') == 'orjson'
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON renderer backed by orjson, or by a reused stdlib encoder
+    
+    Produces the same bytes as DRF's JSONRenderer: compact UTF-8 output,
+    'Z' for UTC datetimes and escaped U+2028/U+2029. orjson encodes UUIDs
+    and datetimes natively and hands other types (Decimal, lazy strings,
+    timedelta...) to DRF's JSONEncoder. Payloads orjson refuses, such as
+    integers over 64 bits, payloads holding floats, and non-default
+    UNICODE_JSON/COMPACT_JSON go through the stdlib encoder, which is built
+    once instead of per response. orjson writes floats in another notation
+    (1e16 for 1e+16) and non-finite ones as null where strict mode raises.
+    Indented output (browsable API, `; indent=`) is left to JSONRenderer.
+    """
+    orjson_options = orjson.OPT_UTC_Z if orjson else 0
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        
+        if use_orjson() and self.compact and not self.ensure_ascii and not has_float(data):
+            try:
+                ret = orjson.dumps(data, default=self.default, option=self.orjson_options)
+            except orjson.JSONEncodeError:
+                pass
+            else:
+                if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+                    ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+                return ret
+        
+        ret = self.get_encoder().encode(data)
+        # same escaping as JSONRenderer, keeps the output a JavaScript subset
+        ret = ret.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+        return ret.encode()
+    
+    def default(self, obj):
+        value = self.get_encoder().default(obj)
+        if has_float(value):
+            # e.g. Decimal -> float, leave the formatting to the encoder
+            raise TypeError(f'{type(obj).__name__} encodes to a float')
+        return value
+    
+    def get_encoder(self):
+        cls = type(self)
+        if '_encoder' not in cls.__dict__:
+            cls._encoder = self.encoder_class(
+                ensure_ascii=self.ensure_ascii, allow_nan=not self.strict,
+                separators=SHORT_SEPARATORS if self.compact else LONG_SEPARATORS
+            )
+        return cls._encoder
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSON parser backed by orjson when it is selected
+    
+    Bodies that are not UTF-8, or that orjson rejects, are parsed again by
+    JSONParser, so accepted input and error messages stay the same.
+    """
+    renderer_class = FastJSONRenderer
+    
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if not use_orjson() or not self.strict or codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+        
+        body = stream.read()
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return super().parse(io.BytesIO(body), media_type, parser_context)
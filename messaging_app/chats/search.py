@@ -0,0 +1,204 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, F, FloatField, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Message, MessageSearchIndex, MessageSearchKey
+
+FTS_TABLE = MessageSearchIndex._meta.db_table
+KEY_TABLE = MessageSearchKey._meta.db_table
+MYSQL_INDEX = 'chats_msg_body_ft'
+
+# bring the key table in line with chats_message, then reindex every body
+SQLITE_REBUILD = [
+    f"DELETE FROM {KEY_TABLE} WHERE message_id NOT IN (SELECT message_id FROM chats_message)",
+    f"""
+    INSERT INTO {KEY_TABLE}(message_id) SELECT message_id FROM chats_message
+    WHERE message_id NOT IN (SELECT message_id FROM {KEY_TABLE})
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')",
+    f"""
+    INSERT INTO {FTS_TABLE}(rowid, message_body)
+    SELECT k.docid, m.message_body FROM {KEY_TABLE} k JOIN chats_message m ON m.message_id = k.message_id
+    """,
+]
+
+_TERM = re.compile(r'\w+', re.UNICODE)
+
+# (alias, database name) -> backend, see backend()
+_backends = {}
+
+# (alias, database name) -> (min token size, stopwords), see mysql_tokens()
+_mysql_tokens = {}
+
+
+def backend(using='default'):
+    """
+    Return the full-text backend available on a database connection
+    
+    The answer is cached per alias and database name; reset_backends()
+    clears it after migrations.
+    
+    Returns:
+        str: 'fts5' (SQLite), 'mysql' (InnoDB FULLTEXT) or None when the
+        database has no full-text index and searches fall back to icontains
+    """
+    connection = connections[using]
+    key = (using, connection.settings_dict['NAME'])
+    if key not in _backends:
+        _backends[key] = _detect_backend(connection)
+    return _backends[key]
+
+
+def _detect_backend(connection):
+    if connection.vendor == 'mysql':
+        return 'mysql'
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE]
+            )
+            if cursor.fetchone():
+                return 'fts5'
+    return None
+
+
+def reset_backends():
+    """
+    Forget the cached backends, e.g. after migrations created or dropped an index
+    """
+    _backends.clear()
+    _mysql_tokens.clear()
+
+
+def mysql_tokens(using='default'):
+    """
+    Return which words an InnoDB FULLTEXT index leaves out
+    
+    Words shorter than innodb_ft_min_token_size and stopwords are not
+    indexed, so a boolean `+word` for one of them matches no row. Cached
+    like backend().
+    
+    Returns:
+        tuple: (minimum token size, frozenset of lowercase stopwords)
+    """
+    connection = connections[using]
+    key = (using, connection.settings_dict['NAME'])
+    if key not in _mysql_tokens:
+        _mysql_tokens[key] = _read_mysql_tokens(connection)
+    return _mysql_tokens[key]
+
+
+def _read_mysql_tokens(connection):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT @@innodb_ft_min_token_size, @@innodb_ft_enable_stopword, "
+            "@@innodb_ft_server_stopword_table"
+        )
+        min_size, enabled, table = cursor.fetchone()
+        if not enabled:
+            return min_size, frozenset()
+        if table:
+            # 'db_name/table_name', a table with a single `value` column
+            table = '.'.join(connection.ops.quote_name(part) for part in table.split('/'))
+        else:
+            table = 'INFORMATION_SCHEMA.INNODB_FT_DEFAULT_STOPWORD'
+        cursor.execute(f"SELECT value FROM {table}")
+        return min_size, frozenset(row[0].lower() for row in cursor.fetchall())
+
+
+def split_indexed(words, min_size, stopwords):
+    """
+    Separate the words a FULLTEXT index contains from those it leaves out
+    
+    Returns:
+        tuple: (indexed words, words that have to be matched otherwise)
+    """
+    indexed, other = [], []
+    for word in words:
+        if len(word) < min_size or word.lower() in stopwords:
+            other.append(word)
+        else:
+            indexed.append(word)
+    return indexed, other
+
+
+def rebuild_index(using='default'):
+    """
+    Rebuild the SQLite FTS5 index from chats_message
+    
+    Triggers keep the index in step with chats_message; rebuild it after
+    changes that bypassed them. InnoDB maintains FULLTEXT indexes itself,
+    so this is a no-op on MySQL.
+    
+    Returns:
+        bool: True if an index was rebuilt
+    """
+    if backend(using) != 'fts5':
+        return False
+    with connections[using].cursor() as cursor:
+        for statement in SQLITE_REBUILD:
+            cursor.execute(statement)
+    return True
+
+
+def terms(query):
+    """
+    Split a user query into the words it searches for
+    """
+    return _TERM.findall(query or '')
+
+
+def search_messages(queryset, query):
+    """
+    Filter a Message queryset to the messages matching every word of `query`
+    
+    Matching uses the database's full-text index. The queryset is annotated
+    with `rank`, higher meaning more relevant, and ordered by it with the
+    newest messages first among equals.
+    
+    Args:
+        queryset: Message queryset, e.g. scoped to the user's conversations
+        query (str): Words to search for; operators are not interpreted
+    
+    Returns:
+        QuerySet: Matching messages, best first
+    """
+    words = terms(query)
+    if not words:
+        return queryset.none()
+    
+    table = connections[queryset.db].ops.quote_name(Message._meta.db_table)
+    kind = backend(queryset.db)
+    if kind == 'fts5':
+        # each word as a quoted string, implicitly ANDed
+        match = ' '.join('"{}"'.format(word.replace('"', '""')) for word in words)
+        # joins the index through the key table, so it is scanned once;
+        # its rank (bm25) is lower for better matches
+        queryset = queryset.filter(search_key__index__message_body__match=match).annotate(
+            rank=-F('search_key__index__rank')
+        )
+    elif kind == 'mysql':
+        # requiring a word the index left out would match nothing, so only
+        # indexed words go into the boolean query and the rest are checked
+        # on the rows it returns
+        indexed, other = split_indexed(words, *mysql_tokens(queryset.db))
+        column = f'{table}.message_body'
+        if indexed:
+            match = ' '.join(f'+{word}' for word in indexed)
+            queryset = queryset.filter(RawSQL(
+                f'MATCH ({column}) AGAINST (%s IN BOOLEAN MODE)', (match,),
+                output_field=BooleanField()
+            ))
+        for word in other:
+            queryset = queryset.filter(message_body__icontains=word)
+        queryset = queryset.annotate(rank=RawSQL(
+            f'MATCH ({column}) AGAINST (%s IN NATURAL LANGUAGE MODE)', (' '.join(words),),
+            output_field=FloatField()
+        ))
+    else:
+        for word in words:
+            queryset = queryset.filter(message_body__icontains=word)
+        queryset = queryset.annotate(rank=Value(0.0, output_field=FloatField()))
+    return queryset.order_by('-rank', '-sent_at', '-message_id')
@@ -1,5 +1,24 @@
+from django.db import transaction
+from django.urls import reverse
 from rest_framework import serializers
+from rest_framework.utils.urls import replace_query_param
+from .membership import is_participant
 from .models import User, Conversation, Message
+from .pagination import MessageCursorPagination
+
+
+def messages_next_link(request, conversation_pk, last_message):
+    """
+    Link to the nested messages of a conversation, from the page that
+    follows `last_message` (a Message or a row), or from the start if None
+    """
+    url = reverse('conversation-messages-list', kwargs={'conversation_pk': conversation_pk})
+    if request is not None:
+        url = request.build_absolute_uri(url)
+    if last_message is None:
+        return url
+    paginator = MessageCursorPagination()
+    return replace_query_param(url, paginator.cursor_query_param, paginator.cursor_for(last_message))
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -57,20 +76,33 @@ class MessageSerializer(serializers.ModelSerializer):
                 validated_data['sender'] = User.objects.get(user_id=sender_id)
             except User.DoesNotExist:
                 raise serializers.ValidationError("Invalid sender_id")
-        return super().create(validated_data)
+        with transaction.atomic():
+            message = super().create(validated_data)
+            message.conversation.record_message(message)
+        return message
 
 
 class ConversationSerializer(serializers.ModelSerializer):
     """
     Serializer for Conversation model with nested messages
+    
+    Only the latest `messages_limit` messages are embedded, newest first.
+    `messages_next` links to the nested messages endpoint for older ones,
+    so the payload size does not grow with the age of the conversation.
+    Clients may ask for fewer or more with `?messages_limit=`, up to
+    `max_messages_limit`.
     """
+    messages_limit = 20
+    max_messages_limit = 100
+    
     participants = UserSerializer(many=True, read_only=True)
     participant_ids = serializers.ListField(
         child=serializers.UUIDField(),
         write_only=True,
         required=False
     )
-    messages = MessageSerializer(many=True, read_only=True)
+    messages = serializers.SerializerMethodField()
+    messages_next = serializers.SerializerMethodField()
     participant_count = serializers.ReadOnlyField()
     latest_message = serializers.SerializerMethodField()
     
@@ -78,18 +110,61 @@ class ConversationSerializer(serializers.ModelSerializer):
         model = Conversation
         fields = [
             'conversation_id', 'participants', 'participant_ids', 
-            'messages', 'created_at', 'participant_count', 'latest_message'
+            'messages', 'messages_next', 'created_at', 'participant_count', 'message_count',
+            'last_message_at', 'latest_message'
         ]
         read_only_fields = ['conversation_id', 'created_at']
     
+    def get_messages_limit(self):
+        request = self.context.get('request')
+        try:
+            limit = int(request.query_params['messages_limit'])
+        except (AttributeError, KeyError, ValueError):
+            return self.messages_limit
+        return max(0, min(limit, self.max_messages_limit))
+    
+    def get_recent_messages(self, obj):
+        """
+        Return (latest messages, whether older ones exist), fetched once per object
+        """
+        if not hasattr(obj, '_recent_messages'):
+            limit = self.get_messages_limit()
+            recent = list(
+                obj.messages.select_related('sender')
+                .order_by('-sent_at', '-message_id')[:limit + 1]
+            )
+            obj._recent_messages = (recent[:limit], len(recent) > limit)
+        return obj._recent_messages
+    
+    def get_messages(self, obj):
+        """
+        Get the latest messages in the conversation
+        """
+        messages, _ = self.get_recent_messages(obj)
+        return MessageSerializer(messages, many=True, context=self.context).data
+    
+    def get_messages_next(self, obj):
+        """
+        Link to the page of nested messages that follows the embedded ones
+        """
+        messages, has_more = self.get_recent_messages(obj)
+        if not has_more:
+            return None
+        return messages_next_link(
+            self.context.get('request'), obj.pk, messages[-1] if messages else None
+        )
+    
     def get_latest_message(self, obj):
         """
         Get the latest message in the conversation
         """
-        latest_message = obj.get_latest_message()
-        if latest_message:
-            return MessageSerializer(latest_message).data
-        return None
+        if obj.last_message_id is None:
+            return None
+        # the same source as the conversation list, usually already fetched
+        messages, _ = self.get_recent_messages(obj)
+        if messages and messages[0].pk == obj.last_message_id:
+            return MessageSerializer(messages[0]).data
+        return MessageSerializer(obj.last_message).data
     
     def create(self, validated_data):
         participant_ids = validated_data.pop('participant_ids', [])
@@ -104,7 +179,7 @@ class ConversationSerializer(serializers.ModelSerializer):
         
         # add current user as participant if not already included
         current_user = self.context['request'].user
-        if current_user not in conversation.participants.all():
+        if not is_participant(current_user, conversation):
             conversation.participants.add(current_user)
         
         return conversation
@@ -122,7 +197,7 @@ class ConversationListSerializer(serializers.ModelSerializer):
         model = Conversation
         fields = [
             'conversation_id', 'participants', 'created_at', 
-            'participant_count', 'latest_message'
+            'participant_count', 'message_count', 'last_message_at', 'latest_message'
         ]
         read_only_fields = ['conversation_id', 'created_at']
     
@@ -130,7 +205,8 @@ class ConversationListSerializer(serializers.ModelSerializer):
         """
         Get the latest message in the conversation
         """
-        latest_message = obj.get_latest_message()
+        # joined by Conversation.objects.with_latest_message()
+        latest_message = obj.last_message
         if latest_message:
             return {
                 'message_id': latest_message.message_id,
@@ -165,4 +241,7 @@ class MessageCreateSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         # automatically set sender to current user
         validated_data['sender'] = self.context['request'].user
-        return super().create(validated_data)
\ No newline at end of file
+        with transaction.atomic():
+            message = super().create(validated_data)
+            message.conversation.record_message(message)
+        return message
\ No newline at end of file
@@ -0,0 +1,39 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_migrate
+from django.dispatch import receiver
+from . import membership, search
+from .models import Conversation
+
+
+@receiver(m2m_changed, sender=Conversation.participants.through)
+def update_participant_count(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Keep Conversation.participant_count and the membership cache in step
+    with the participants table, whichever side of the relation was changed.
+    """
+    if action == 'pre_clear':
+        # clear() does not say which rows it touched
+        related = instance.conversations if reverse else instance.participants
+        instance._cleared_ids = list(related.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    
+    if action == 'post_clear':
+        pk_set = instance.__dict__.pop('_cleared_ids', [])
+    if reverse:
+        conversation_ids, user_ids = pk_set, [instance.pk]
+    else:
+        conversation_ids, user_ids = [instance.pk], pk_set
+    Conversation.objects.filter(pk__in=conversation_ids).refresh_participant_count()
+    # a reader that fills the cache before the commit would store the old answer
+    conversation_ids, user_ids = list(conversation_ids), list(user_ids)
+    transaction.on_commit(lambda: membership.invalidate(conversation_ids, user_ids))
+
+
+@receiver(post_migrate)
+def reset_search_backends(sender, **kwargs):
+    """
+    Migrations may have created or dropped the full-text index
+    """
+    search.reset_backends()
@@ -1,3 +1,661 @@
-from django.test import TestCase
+import json
+import time
+import uuid
+from unittest import mock
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from . import membership, renderers, search
+from .ids import uuid7
+from .membership import is_participant
+from .models import User, Conversation, Message
+
+
+def make_user(name):
+    return User.objects.create_user(
+        username=name, email=f'{name}@example.com', password='pass1234',
+        first_name=name.title(), last_name='Tester'
+    )
+
+
+class ChatsAPITestCase(APITestCase):
+    """
+    Base test case with two users sharing conversations
+    """
+
+    def setUp(self):
+        self.alice = make_user('alice')
+        self.bob = make_user('bob')
+        self.client.force_authenticate(self.alice)
+
+    def make_conversation(self, messages=0, users=None):
+        conversation = Conversation.objects.create()
+        conversation.participants.add(*(users or [self.alice, self.bob]))
+        for i in range(messages):
+            sender = self.alice if i % 2 else self.bob
+            message = Message.objects.create(
+                sender=sender, conversation=conversation, message_body=f'message {i}'
+            )
+            conversation.record_message(message)
+        return conversation
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+
+class ConversationListTests(ChatsAPITestCase):
+
+    def test_latest_message_matches_model(self):
+        conversation = self.make_conversation(messages=3)
+        self.make_conversation()
+
+        response = self.client.get('/api/conversations/')
+        results = {item['conversation_id']: item for item in response.data['results']}
+
+        latest = conversation.get_latest_message()
+        self.assertEqual(results[str(conversation.conversation_id)]['latest_message'], {
+            'message_id': latest.message_id,
+            'message_body': latest.message_body,
+            'sender': latest.sender.full_name,
+            'sent_at': latest.sent_at,
+        })
+        self.assertEqual(
+            [item['latest_message'] for item in results.values()].count(None), 1
+        )
+
+    def test_list_and_detail_agree_on_latest_message(self):
+        conversation = self.make_conversation(messages=2)
+        recorded = conversation.get_latest_message()
+        # not recorded, e.g. written by a bulk import before a repair
+        Message.objects.create(sender=self.bob, conversation=conversation, message_body='late')
+
+        for enabled in (False, True):
+            with override_settings(CHATS_FAST_SERIALIZERS=enabled):
+                listed = self.client.get('/api/conversations/').data['results'][0]
+                detail = self.client.get(f'/api/conversations/{conversation.pk}/').data
+            self.assertEqual(str(listed['latest_message']['message_id']), str(recorded.pk))
+            self.assertEqual(str(detail['latest_message']['message_id']), str(recorded.pk))
+            self.assertEqual(detail['latest_message']['message_body'], 'message 1')
+
+    def test_list_query_count_is_constant(self):
+        for _ in range(2):
+            self.make_conversation(messages=2)
+        small, _ = self.count_queries('/api/conversations/')
+
+        for _ in range(6):
+            self.make_conversation(messages=4)
+        large, response = self.count_queries('/api/conversations/')
+
+        self.assertEqual(len(response.data['results']), 8)
+        self.assertEqual(small, large)
+
+
+class ConversationActivityTests(ChatsAPITestCase):
+
+    def assertInSync(self, conversation):
+        conversation.refresh_from_db()
+        actual = Conversation.objects.with_actual_activity().get(pk=conversation.pk)
+        self.assertEqual(conversation.message_count, actual.actual_message_count)
+        self.assertEqual(conversation.participant_count, actual.actual_participant_count)
+        self.assertEqual(conversation.last_message_id, actual.actual_last_message_id)
+        self.assertEqual(conversation.last_message_at, actual.actual_last_message_at)
+        self.assertFalse(Conversation.objects.drifted().exists())
+
+    def test_message_create_and_delete_maintain_columns(self):
+        conversation = self.make_conversation(messages=2)
+        for body in ('hello', 'again'):
+            response = self.client.post('/api/messages/', {
+                'conversation': str(conversation.conversation_id), 'message_body': body
+            })
+            self.assertEqual(response.status_code, 201)
+        self.assertInSync(conversation)
+        self.assertEqual(conversation.message_count, 4)
+        self.assertEqual(conversation.last_message.message_body, 'again')
+
+        response = self.client.delete(f'/api/messages/{conversation.last_message_id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertInSync(conversation)
+        self.assertEqual(conversation.message_count, 3)
+
+    def test_participant_changes_maintain_count(self):
+        carol = make_user('carol')
+        conversation = self.make_conversation()
+        self.assertInSync(conversation)
+        self.assertEqual(conversation.participant_count, 2)
+
+        self.client.post(
+            f'/api/conversations/{conversation.pk}/add_participant/', {'user_id': str(carol.pk)}
+        )
+        self.assertInSync(conversation)
+        self.assertEqual(conversation.participant_count, 3)
+
+        carol.conversations.clear()
+        self.assertInSync(conversation)
+        self.bob.conversations.remove(conversation)
+        self.assertInSync(conversation)
+        self.assertEqual(conversation.participant_count, 1)
+
+    def test_repair_command(self):
+        conversation = self.make_conversation(messages=3)
+        empty = self.make_conversation()
+        Conversation.objects.update(message_count=0, participant_count=0, last_message=None)
+        self.assertEqual(Conversation.objects.drifted().count(), 2)
+
+        with self.assertRaises(CommandError):
+            call_command('repair_conversation_activity', '--check', stdout=StringIO())
+        call_command('repair_conversation_activity', stdout=StringIO())
+        self.assertInSync(conversation)
+        self.assertInSync(empty)
+        call_command('repair_conversation_activity', '--check', stdout=StringIO())
+
+
+class KeysetPaginationTests(ChatsAPITestCase):
+
+    def walk(self, url, link='next'):
+        ids, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            page = [item[self.id_field] for item in response.data['results']]
+            ids.extend(page if link == 'next' else reversed(page))
+            url = response.data['links'][link]
+            pages += 1
+        return ids, pages, response
+
+    def test_messages_walk_forward_and_back(self):
+        self.id_field = 'message_id'
+        conversation = self.make_conversation(messages=23)
+        # ties on sent_at are broken by message_id
+        Message.objects.filter(message_body__in=['message 3', 'message 4', 'message 5']).update(
+            sent_at=conversation.messages.get(message_body='message 3').sent_at
+        )
+        expected = [
+            str(pk) for pk in
+            Message.objects.order_by('-sent_at', '-message_id').values_list('message_id', flat=True)
+        ]
+
+        ids, pages, last = self.walk('/api/messages/?page_size=5')
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 5)
+        self.assertIsNone(last.data['count'])
+
+        response = self.client.get('/api/messages/?page_size=5&ordering=sent_at')
+        ids, _, _ = self.walk(response.data['links']['next'])
+        self.assertEqual(ids, list(reversed(expected))[5:])
+
+        # walk back from the last page using previous links
+        ids, _, _ = self.walk(last.wsgi_request.get_full_path(), link='previous')
+        self.assertEqual(list(reversed(ids)), expected)
+
+    def test_count_is_optional(self):
+        self.make_conversation(messages=3)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/messages/')
+        self.assertIsNone(response.data['count'])
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+        response = self.client.get('/api/messages/?count=true')
+        self.assertEqual(response.data['count'], 3)
+
+    def test_invalid_cursor(self):
+        for cursor in ('garbage', 'eyJvIjogIngifQ=='):
+            response = self.client.get(f'/api/messages/?cursor={cursor}')
+            self.assertEqual(response.status_code, 404)
+
+    def test_conversations_by_activity_with_empty_ones_last(self):
+        self.id_field = 'conversation_id'
+        active = [self.make_conversation(messages=1) for _ in range(4)]
+        empty = [self.make_conversation() for _ in range(3)]
+        expected = [str(c.pk) for c in reversed(active)] + sorted(
+            (str(c.pk) for c in empty), reverse=True
+        )
+
+        ids, _, _ = self.walk('/api/conversations/?ordering=-last_message_at&page_size=2')
+        self.assertEqual(ids, expected)
+        ids, _, _ = self.walk('/api/conversations/?ordering=last_message_at&page_size=2')
+        self.assertEqual(ids, list(reversed(expected)))
+
+
+class MembershipTests(ChatsAPITestCase):
+
+    def test_exists_query_is_memoized_per_request(self):
+        conversation = self.make_conversation()
+        outsider = make_user('carol')
+        request = RequestFactory().get('/')
+        with self.assertNumQueries(2):
+            self.assertTrue(is_participant(self.alice, conversation, request))
+            self.assertFalse(is_participant(outsider, conversation.pk, request))
+            self.assertTrue(is_participant(self.alice.pk, conversation.pk, request))
+        with self.assertNumQueries(1):
+            self.assertTrue(is_participant(self.alice, conversation))
+
+    @override_settings(CHATS_MEMBERSHIP_CACHE_TTL=60)
+    def test_cache_is_invalidated_on_participant_changes(self):
+        cache.clear()
+        conversation = self.make_conversation()
+        carol = make_user('carol')
+        self.assertFalse(is_participant(carol, conversation))
+        with self.assertNumQueries(0):
+            self.assertFalse(is_participant(carol, conversation))
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.client.post(
+                f'/api/conversations/{conversation.pk}/add_participant/', {'user_id': str(carol.pk)}
+            )
+            # the cache is only invalidated once the change is committed
+            self.assertFalse(is_participant(carol, conversation))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(callbacks), 1)
+        self.assertTrue(is_participant(carol, conversation))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                f'/api/conversations/{conversation.pk}/remove_participant/', {'user_id': str(carol.pk)}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(is_participant(carol, conversation))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            carol.conversations.add(conversation)
+        self.assertTrue(is_participant(carol, conversation))
+        with self.captureOnCommitCallbacks(execute=True):
+            conversation.participants.clear()
+        self.assertFalse(is_participant(carol, conversation))
+        self.assertFalse(is_participant(self.alice, conversation))
+
+    @override_settings(CHATS_MEMBERSHIP_CACHE_TTL=60)
+    def test_cache_key_ignores_how_ids_are_spelled(self):
+        cache.clear()
+        conversation = self.make_conversation()
+        carol = make_user('carol')
+        conversation.participants.add(carol)
+        spellings = [
+            (carol, conversation),
+            (carol.pk.hex, conversation.pk.hex.upper()),
+            (str(carol.pk).upper(), str(conversation.pk)),
+        ]
+        for user, conversation_id in spellings:
+            self.assertTrue(is_participant(user, conversation_id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                f'/api/conversations/{conversation.pk}/remove_participant/',
+                {'user_id': carol.pk.hex.upper()}
+            )
+        self.assertEqual(response.status_code, 200)
+        # every spelling reads the one entry the removal invalidated
+        with self.assertNumQueries(1):
+            for user, conversation_id in spellings:
+                self.assertFalse(is_participant(user, conversation_id))
+
+        membership.invalidate([conversation.pk.hex], [str(carol.pk).upper()])
+        with self.assertNumQueries(1):
+            self.assertFalse(is_participant(carol.pk.hex, conversation))
+
+    def test_non_participant_is_forbidden(self):
+        conversation = self.make_conversation(messages=1, users=[self.bob])
+        response = self.client.post('/api/messages/', {
+            'conversation': str(conversation.pk), 'message_body': 'hi'
+        })
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get(f'/api/conversations/{conversation.pk}/')
+        self.assertEqual(response.status_code, 404)
+
+
+class BoundedNestedMessagesTests(ChatsAPITestCase):
+
+    def test_retrieve_embeds_latest_messages_and_cursor(self):
+        conversation = self.make_conversation(messages=27)
+        expected = [
+            str(pk) for pk in
+            conversation.messages.order_by('-sent_at', '-message_id').values_list('message_id', flat=True)
+        ]
+
+        response = self.client.get(f'/api/conversations/{conversation.pk}/')
+        embedded = [message['message_id'] for message in response.data['messages']]
+        self.assertEqual(embedded, expected[:20])
+        self.assertEqual(response.data['latest_message']['message_id'], expected[0])
+
+        older = self.client.get(response.data['messages_next'])
+        self.assertEqual(
+            [message['message_id'] for message in older.data['results']], expected[20:]
+        )
+
+        response = self.client.get(f'/api/conversations/{conversation.pk}/?messages_limit=30')
+        self.assertEqual(len(response.data['messages']), 27)
+        self.assertIsNone(response.data['messages_next'])
+
+    def test_retrieve_cost_does_not_grow_with_history(self):
+        conversation = self.make_conversation(messages=25)
+        small, response = self.count_queries(f'/api/conversations/{conversation.pk}/')
+        small_size = len(response.content)
+        for i in range(40):
+            message = Message.objects.create(
+                sender=self.alice, conversation=conversation, message_body=f'message {i}'
+            )
+            conversation.record_message(message)
+        large, response = self.count_queries(f'/api/conversations/{conversation.pk}/')
+        self.assertEqual(small, large)
+        self.assertEqual(len(response.data['messages']), 20)
+        self.assertLess(abs(len(response.content) - small_size), 100)
+
+    def test_nested_messages_are_scoped_to_conversation(self):
+        conversation = self.make_conversation(messages=3)
+        self.make_conversation(messages=4)
+        response = self.client.get(f'/api/conversations/{conversation.pk}/messages/')
+        self.assertEqual(len(response.data['results']), 3)
+        response = self.client.get('/api/conversations/not-a-uuid/messages/')
+        self.assertEqual(response.status_code, 404)
+
+
+class ByConversationTests(ChatsAPITestCase):
+
+    def test_by_conversation_is_paginated(self):
+        conversation = self.make_conversation(messages=25)
+        self.make_conversation(messages=2)
+        url = f'/api/messages/by_conversation/?conversation_id={conversation.pk}'
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 20)
+        response = self.client.get(response.data['links']['next'])
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['links']['next'])
+
+    def test_export_streams_ndjson_oldest_first(self):
+        conversation = self.make_conversation(messages=7)
+        response = self.client.get(f'/api/messages/export/?conversation_id={conversation.pk}')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        expected = conversation.messages.order_by('sent_at', 'message_id')
+        self.assertEqual(
+            [row['message_id'] for row in rows], [str(message.pk) for message in expected]
+        )
+        self.assertEqual(rows[0]['sender']['email'], 'bob@example.com')
+
+    def test_errors(self):
+        conversation = self.make_conversation(users=[self.bob])
+        for action in ('by_conversation', 'export'):
+            response = self.client.get(f'/api/messages/{action}/')
+            self.assertEqual(response.status_code, 400)
+            response = self.client.get(f'/api/messages/{action}/?conversation_id={conversation.pk}')
+            self.assertEqual(response.status_code, 403)
+            response = self.client.get(f'/api/messages/{action}/?conversation_id=nope')
+            self.assertEqual(response.status_code, 404)
+
+
+class FullTextSearchTests(ChatsAPITestCase):
+
+    def send(self, conversation, body):
+        response = self.client.post('/api/messages/', {
+            'conversation': str(conversation.pk), 'message_body': body
+        })
+        self.assertEqual(response.status_code, 201)
+        return response.data['message_id']
+
+    def search(self, query, **params):
+        response = self.client.get('/api/messages/search/', {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [item['message_id'] for item in response.data['results']]
+
+    def test_index_follows_create_update_and_delete(self):
+        self.assertEqual(search.backend(), 'fts5')
+        conversation = self.make_conversation()
+        first = self.send(conversation, 'Lunch at the café on Friday?')
+        second = self.send(conversation, 'Friday works, friday lunch it is. Friday!')
+        self.send(conversation, 'Unrelated note')
+
+        self.assertEqual(self.search('friday'), [second, first])
+        self.assertEqual(self.search('cafe lunch'), [first])
+        # query syntax is not interpreted
+        self.assertEqual(self.search('"friday*" -(lunch'), [second, first])
+
+        Message.objects.filter(pk=first).update(message_body='Dinner instead')
+        self.assertEqual(self.search('lunch'), [second])
+        self.assertEqual(self.search('dinner'), [first])
+
+        self.client.delete(f'/api/messages/{second}/')
+        self.assertEqual(self.search('friday'), [])
+
+    def test_search_is_scoped_to_users_conversations(self):
+        mine = self.make_conversation()
+        theirs = self.make_conversation(users=[self.bob])
+        other = self.make_conversation()
+        expected = self.send(mine, 'secret plans')
+        self.send(other, 'other plans')
+        Message.objects.create(sender=self.bob, conversation=theirs, message_body='secret plans')
+
+        self.assertEqual(self.search('secret'), [expected])
+        self.assertEqual(len(self.search('plans', conversation_id=str(mine.pk))), 1)
+        response = self.client.get('/api/messages/', {'message_search': 'plans'})
+        self.assertEqual(len(response.data['results']), 2)
+        response = self.client.get('/api/messages/search/')
+        self.assertEqual(response.status_code, 400)
+
+    def test_index_survives_renumbered_rowids(self):
+        conversation = self.make_conversation()
+        first = self.send(conversation, 'alpha bravo')
+        second = self.send(conversation, 'bravo charlie')
+        # what VACUUM may do to a table without an INTEGER PRIMARY KEY
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE chats_message SET rowid = -rowid')
+        self.assertEqual(self.search('alpha'), [first])
+        self.assertEqual(sorted(self.search('bravo')), sorted([first, second]))
+
+    def test_rebuild_restores_missing_entries(self):
+        conversation = self.make_conversation()
+        first = self.send(conversation, 'delta echo')
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {search.KEY_TABLE}')
+        self.assertEqual(self.search('delta'), [])
+        call_command('rebuild_message_search', stdout=StringIO())
+        self.assertEqual(self.search('delta'), [first])
+
+    def test_backend_is_looked_up_once(self):
+        search.reset_backends()
+        with CaptureQueriesContext(connection) as queries:
+            search.backend()
+            search.backend()
+        self.assertEqual(len(queries), 1)
+
+    def test_mysql_requires_only_indexed_words(self):
+        self.assertEqual(
+            search.split_indexed(['The', 'cat', 'is', 'up', 'there'], 3, frozenset({'the'})),
+            (['cat', 'there'], ['The', 'is', 'up'])
+        )
+        with mock.patch.object(search, 'backend', return_value='mysql'), \
+                mock.patch.object(search, 'mysql_tokens', return_value=(3, frozenset({'the'}))):
+            queryset = search.search_messages(Message.objects.all(), 'the cat is up')
+            sql, params = queryset.query.sql_with_params()
+        self.assertIn('+cat', params)
+        self.assertNotIn('+the', params)
+        self.assertIn('IN BOOLEAN MODE', sql)
+        self.assertEqual([p for p in params if str(p).startswith('%')], ['%the%', '%is%', '%up%'])
+        
+        # nothing indexed: no boolean MATCH, which would exclude every row
+        with mock.patch.object(search, 'backend', return_value='mysql'), \
+                mock.patch.object(search, 'mysql_tokens', return_value=(3, frozenset())):
+            sql, params = search.search_messages(Message.objects.all(), 'a b').query.sql_with_params()
+        self.assertNotIn('IN BOOLEAN MODE', sql)
+
+
+class FastSerializerParityTests(ChatsAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        carol = make_user('carol')
+        carol.phone_number = '+254700000000'
+        carol.save()
+        self.busy = self.make_conversation(messages=25, users=[self.alice, self.bob, carol])
+        message = Message.objects.create(
+            sender=carol, conversation=self.busy, message_body='héllo "quoted" ✓'
+        )
+        self.busy.record_message(message)
+        self.quiet = self.make_conversation()
+        self.make_conversation(messages=2, users=[self.bob, carol])
+
+    def get_both(self, url):
+        responses = []
+        for enabled in (False, True):
+            with override_settings(CHATS_FAST_SERIALIZERS=enabled):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            responses.append(response.content)
+        return responses
+
+    def test_output_is_byte_identical(self):
+        message = self.busy.messages.order_by('sent_at').first()
+        urls = [
+            '/api/messages/',
+            '/api/messages/?page_size=7&count=true',
+            '/api/messages/?ordering=sent_at',
+            f'/api/messages/{message.pk}/',
+            f'/api/conversations/{self.busy.pk}/messages/',
+            '/api/conversations/',
+            '/api/conversations/?ordering=-last_message_at',
+            f'/api/conversations/{self.busy.pk}/',
+            f'/api/conversations/{self.busy.pk}/?messages_limit=0',
+            f'/api/conversations/{self.busy.pk}/?messages_limit=100',
+            f'/api/conversations/{self.quiet.pk}/',
+        ]
+        for url in urls:
+            slow, fast = self.get_both(url)
+            self.assertEqual(fast, slow, url)
+
+        # follow the cursors of both paths
+        slow, fast = self.get_both('/api/messages/?page_size=10')
+        next_url = json.loads(fast)['links']['next']
+        self.assertEqual(next_url, json.loads(slow)['links']['next'])
+        slow, fast = self.get_both(next_url)
+        self.assertEqual(fast, slow)
+
+    def test_senders_are_fetched_once_per_page(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/messages/?page_size=30')
+        self.assertEqual(len(response.data['results']), 26)
+        user_queries = [
+            query for query in queries.captured_queries
+            if ' FROM "chats_user" WHERE ' in query['sql']
+        ]
+        self.assertEqual(len(user_queries), 1)
+
+
+class FastJSONTests(ChatsAPITestCase):
+    payload = {
+        'id': uuid.UUID('0192b3a4-5c6d-7e8f-9a0b-1c2d3e4f5a6b'),
+        'utc': datetime(2026, 10, 19, 10, 30, 5, 123456, tzinfo=timezone.utc),
+        'offset': datetime(2026, 10, 19, 10, 30, tzinfo=timezone(timedelta(hours=3))),
+        'naive': datetime(2026, 10, 19, 10, 30),
+        'day': date(2026, 10, 19),
+        'amount': Decimal('12.50'),
+        'elapsed': timedelta(minutes=2),
+        'text': 'café ✓ \u2028 "quoted"',
+        'nested': [{'big': 2 ** 70}, (1, 2.5, None, True)],
+        # notations orjson writes differently from the stdlib encoder
+        'floats': [1e16, 1e-07, 1e-05, 123456789012345680.0, -0.0],
+    }
+
+    def test_renderer_matches_json_renderer(self):
+        expected = JSONRenderer().render(self.payload)
+        for backend in ('orjson', 'stdlib'):
+            with override_settings(CHATS_JSON_BACKEND=backend):
+                self.assertEqual(renderers.FastJSONRenderer().render(self.payload), expected)
+                # orjson refuses the 70-bit integer, the stdlib encoder takes over
+                small = dict(self.payload, nested=[])
+                self.assertEqual(renderers.FastJSONRenderer().render(small), JSONRenderer().render(small))
+        indented = renderers.FastJSONRenderer().render(self.payload, 'application/json; indent=4')
+        self.assertEqual(indented, JSONRenderer().render(self.payload, 'application/json; indent=4'))
+
+    def test_non_finite_floats(self):
+        class LenientRenderer(renderers.FastJSONRenderer):
+            strict = False
+        
+        class LenientJSONRenderer(JSONRenderer):
+            strict = False
+        
+        for value in (float('nan'), float('inf'), -float('inf')):
+            data = {'id': uuid.uuid4(), 'value': [value]}
+            for backend in ('orjson', 'stdlib'):
+                with override_settings(CHATS_JSON_BACKEND=backend):
+                    with self.assertRaises(ValueError):
+                        JSONRenderer().render(data)
+                    with self.assertRaises(ValueError):
+                        renderers.FastJSONRenderer().render(data)
+                    self.assertEqual(LenientRenderer().render(data), LenientJSONRenderer().render(data))
+    
+    def test_missing_orjson_is_reported(self):
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertEqual([w.id for w in renderers.check_json_backend()], ['chats.W001'])
+            with override_settings(CHATS_JSON_BACKEND='stdlib'):
+                self.assertEqual(renderers.check_json_backend(), [])
+        self.assertEqual(renderers.check_json_backend(), [])
+    
+    def test_parser_matches_json_parser(self):
+        body = '{"message_body": "caf\u00e9 ✓", "n": [1, 2.5, null]}'.encode()
+        parsed = renderers.FastJSONParser().parse(BytesIO(body))
+        self.assertEqual(parsed, JSONParser().parse(BytesIO(body)))
+        for invalid in (b'{"a": ', b'{"a": NaN}'):
+            with self.assertRaises(ParseError) as fast:
+                renderers.FastJSONParser().parse(BytesIO(invalid))
+            with self.assertRaises(ParseError) as stdlib:
+                JSONParser().parse(BytesIO(invalid))
+            self.assertEqual(str(fast.exception), str(stdlib.exception))
+
+    def test_api_responses_are_unchanged(self):
+        conversation = self.make_conversation(messages=5)
+        response = self.client.post(
+            '/api/messages/', {'conversation': str(conversation.pk), 'message_body': 'héllo'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        for url in ('/api/messages/', '/api/conversations/', f'/api/conversations/{conversation.pk}/'):
+            with override_settings(CHATS_JSON_BACKEND='stdlib'):
+                stdlib = self.client.get(url).content
+            self.assertEqual(self.client.get(url).content, stdlib, url)
+
+
+class UUID7Tests(ChatsAPITestCase):
+
+    def test_uuid7_layout(self):
+        before = time.time_ns() // 1_000_000
+        value = uuid7()
+        after = time.time_ns() // 1_000_000
+        self.assertEqual(value.version, 7)
+        self.assertEqual(value.variant, uuid.RFC_4122)
+        self.assertTrue(before <= value.int >> 80 <= after)
+
+    def test_uuid7_increases_within_a_millisecond_and_backwards_clock(self):
+        # the generator's own clock is restored afterwards
+        with mock.patch.multiple('chats.ids', _last_ms=0, _counter=0):
+            with mock.patch('chats.ids.time.time_ns', return_value=1_800_000_000_000 * 1_000_000):
+                ids = [uuid7() for _ in range(5000)]
+            with mock.patch('chats.ids.time.time_ns', return_value=1_700_000_000_000 * 1_000_000):
+                ids.append(uuid7())
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(set(ids)), len(ids))
+
+    def test_new_rows_get_time_ordered_ids(self):
+        conversation = self.make_conversation(messages=3)
+        self.assertEqual(self.alice.pk.version, 7)
+        self.assertEqual(conversation.pk.version, 7)
+        ids = list(conversation.messages.order_by('sent_at').values_list('message_id', flat=True))
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual({message_id.version for message_id in ids}, {7})
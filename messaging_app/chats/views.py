@@ -1,16 +1,26 @@
 # from django.shortcuts import render
 
 # create your views here.
+import json
+import uuid
+from django.core.exceptions import ValidationError
+from django.http import StreamingHttpResponse
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Prefetch, Q
 from django_filters.rest_framework import DjangoFilterBackend
+from . import fast_serializers
+from .membership import is_participant
 from .models import User, Conversation, Message
 from .permissions import IsParticipantOfConversation, IsOwnerOrParticipant, IsAuthenticatedAndParticipant
 from .filters import MessageFilter, ConversationFilter
-from .pagination import MessagePagination, ConversationPagination
+from .pagination import MessagePagination, MessageCursorPagination, ConversationCursorPagination
+from .search import search_messages
 from .serializers import (
     UserSerializer, 
     ConversationSerializer, 
@@ -28,17 +38,25 @@ class ConversationViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_class = ConversationFilter
     search_fields = ['participants__first_name', 'participants__last_name', 'participants__email']
-    ordering_fields = ['created_at']
+    ordering_fields = ['created_at', 'last_message_at']
     ordering = ['-created_at']
-    pagination_class = ConversationPagination
+    pagination_class = ConversationCursorPagination
     
     def get_queryset(self):
         """
         Return conversations where the current user is a participant
         """
-        return Conversation.objects.filter(
-            participants=self.request.user
-        ).prefetch_related('participants', 'messages__sender')
+        queryset = Conversation.objects.filter(participants=self.request.user)
+        if self.action == 'list':
+            # latest message is joined in, not looked up per row
+            queryset = queryset.with_latest_message()
+        if self.action in ('list', 'retrieve') and fast_serializers.is_enabled():
+            # the row serializers read participants themselves
+            return queryset
+        # ConversationSerializer fetches only the latest messages itself
+        return queryset.prefetch_related(
+            Prefetch('participants', queryset=User.objects.order_by('user_id'))
+        )
     
     def get_serializer_class(self):
         """
@@ -50,6 +68,26 @@ class ConversationViewSet(viewsets.ModelViewSet):
             return ConversationSerializer
         return ConversationSerializer
     
+    def list(self, request, *args, **kwargs):
+        """
+        List the user's conversations, serialized from `.values()` rows
+        """
+        if not fast_serializers.is_enabled():
+            return super().list(request, *args, **kwargs)
+        serializer = fast_serializers.ConversationListRowSerializer(request)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset.values(*serializer.get_row_columns()))
+        return self.get_paginated_response(serializer.many(page))
+    
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Return a conversation with its latest messages
+        """
+        if not fast_serializers.is_enabled():
+            return super().retrieve(request, *args, **kwargs)
+        serializer = fast_serializers.ConversationRowSerializer(request)
+        return Response(serializer.one(serializer.row_from(self.get_object())))
+    
     def create(self, request, *args, **kwargs):
         """
         Create a new conversation
@@ -105,7 +143,7 @@ class ConversationViewSet(viewsets.ModelViewSet):
         
         try:
             user = User.objects.get(user_id=user_id)
-            if user in conversation.participants.all():
+            if is_participant(user, conversation):
                 conversation.participants.remove(user)
                 return Response(
                     {'message': f'User {user.full_name} removed from conversation'}, 
@@ -133,16 +171,25 @@ class MessageViewSet(viewsets.ModelViewSet):
     search_fields = ['message_body', 'sender__first_name', 'sender__last_name', 'sender__email']
     ordering_fields = ['sent_at']
     ordering = ['-sent_at']
-    pagination_class = MessagePagination
+    pagination_class = MessageCursorPagination
+    export_chunk_size = 2000
     
     def get_queryset(self):
         """
         Return messages from conversations where the current user is a participant
         """
         user_conversations = Conversation.objects.filter(participants=self.request.user)
-        return Message.objects.filter(
+        queryset = Message.objects.filter(
             conversation__in=user_conversations
         ).select_related('sender', 'conversation')
+        if 'conversation_pk' in self.kwargs:
+            # nested under /conversations/{conversation_pk}/messages/
+            try:
+                conversation_id = uuid.UUID(self.kwargs['conversation_pk'])
+            except ValueError:
+                raise NotFound('Conversation not found')
+            queryset = queryset.filter(conversation_id=conversation_id)
+        return queryset
     
     def get_serializer_class(self):
         """
@@ -152,6 +199,26 @@ class MessageViewSet(viewsets.ModelViewSet):
             return MessageCreateSerializer
         return MessageSerializer
     
+    def list(self, request, *args, **kwargs):
+        """
+        List messages, serialized from `.values()` rows
+        """
+        if not fast_serializers.is_enabled():
+            return super().list(request, *args, **kwargs)
+        serializer = fast_serializers.MessageRowSerializer(request)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset.values(*serializer.get_row_columns()))
+        return self.get_paginated_response(serializer.many(page))
+    
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Return a single message
+        """
+        if not fast_serializers.is_enabled():
+            return super().retrieve(request, *args, **kwargs)
+        serializer = fast_serializers.MessageRowSerializer(request)
+        return Response(serializer.one(serializer.row_from(self.get_object())))
+    
     def create(self, request, *args, **kwargs):
         """
         Send a message to an existing conversation
@@ -161,7 +228,7 @@ class MessageViewSet(viewsets.ModelViewSet):
         if conversation_id:
             try:
                 conversation = Conversation.objects.get(conversation_id=conversation_id)
-                if request.user not in conversation.participants.all():
+                if not is_participant(request.user, conversation, request):
                     return Response(
                         {'error': 'You are not a participant in this conversation'}, 
                         status=status.HTTP_403_FORBIDDEN
@@ -180,32 +247,101 @@ class MessageViewSet(viewsets.ModelViewSet):
         response_serializer = MessageSerializer(message, context={'request': request})
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
     
-    @action(detail=False, methods=['get'])
-    def by_conversation(self, request):
+    def perform_destroy(self, instance):
+        """
+        Delete a message and recompute its conversation's activity columns
+        """
+        with transaction.atomic():
+            instance.delete()
+            Conversation.objects.filter(pk=instance.conversation_id).refresh_activity()
+    
+    def get_member_conversation(self, request):
         """
-        Get all messages for a specific conversation
+        Return (conversation, None) for the `conversation_id` query parameter,
+        or (None, error response) if it is missing, unknown or not the user's
         """
         conversation_id = request.query_params.get('conversation_id')
         if not conversation_id:
-            return Response(
+            return None, Response(
                 {'error': 'conversation_id parameter is required'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
         
         try:
             conversation = Conversation.objects.get(conversation_id=conversation_id)
-            if request.user not in conversation.participants.all():
-                return Response(
-                    {'error': 'You are not a participant in this conversation'}, 
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            
-            messages = self.get_queryset().filter(conversation=conversation)
-            serializer = MessageSerializer(messages, many=True, context={'request': request})
-            return Response(serializer.data)
-            
-        except Conversation.DoesNotExist:
-            return Response(
+        except (Conversation.DoesNotExist, ValidationError):
+            return None, Response(
                 {'error': 'Conversation not found'}, 
                 status=status.HTTP_404_NOT_FOUND
             )
+        if not is_participant(request.user, conversation, request):
+            return None, Response(
+                {'error': 'You are not a participant in this conversation'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return conversation, None
+    
+    @action(detail=False, methods=['get'])
+    def by_conversation(self, request):
+        """
+        Get the messages of a specific conversation, one cursor page at a time
+        """
+        conversation, error = self.get_member_conversation(request)
+        if error:
+            return error
+        
+        messages = self.get_queryset().filter(conversation=conversation)
+        page = self.paginate_queryset(messages)
+        serializer = MessageSerializer(page, many=True, context={'request': request})
+        return self.get_paginated_response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream every message of a conversation as NDJSON, oldest first
+        
+        Rows are read with a server-side iterator and written one line at a
+        time, so memory use does not depend on the size of the conversation.
+        """
+        conversation, error = self.get_member_conversation(request)
+        if error:
+            return error
+        
+        messages = self.get_queryset().filter(
+            conversation=conversation
+        ).order_by('sent_at', 'message_id')
+        context = {'request': request}
+        
+        def lines():
+            for message in messages.iterator(chunk_size=self.export_chunk_size):
+                data = MessageSerializer(message, context=context).data
+                yield json.dumps(data, cls=JSONEncoder) + '\n'
+        
+        response = StreamingHttpResponse(lines(), content_type='application/x-ndjson')
+        response['Content-Disposition'] = (
+            f'attachment; filename="conversation-{conversation.conversation_id}.ndjson"'
+        )
+        return response
+    
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Full-text search over the messages of the user's conversations
+        
+        Results are ordered by relevance, so they are paginated by page number
+        rather than by cursor. Filters such as `conversation_id` still apply.
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(
+                {'error': 'q parameter is required'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        messages = search_messages(self.filter_queryset(self.get_queryset()), query)
+        paginator = MessagePagination()
+        page = paginator.paginate_queryset(messages, request, view=self)
+        data = MessageSerializer(page, many=True, context={'request': request}).data
+        for item, message in zip(data, page):
+            item['rank'] = message.rank
+        return paginator.get_paginated_response(data)
@@ -149,12 +149,30 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'chats.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'chats.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20
 }
 
 AUTH_USER_MODEL = 'chats.User'
 
+# Seconds a conversation membership check may be served from the cache (0 disables it)
+CHATS_MEMBERSHIP_CACHE_TTL = int(os.getenv('CHATS_MEMBERSHIP_CACHE_TTL', '0'))
+
+# Serialize list and retrieve responses of chats from .values() rows instead of DRF serializers
+CHATS_FAST_SERIALIZERS = os.getenv('CHATS_FAST_SERIALIZERS', 'True').lower() in ('true', '1', 'yes')
+
+# JSON library of chats.renderers: 'orjson' when installed, or 'stdlib'
+CHATS_JSON_BACKEND = os.getenv('CHATS_JSON_BACKEND', 'orjson')
+
 # JWT Settings
 from datetime import timedelta
 
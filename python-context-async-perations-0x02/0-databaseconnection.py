@@ -3,22 +3,34 @@ Custom class-based context manager for database connections
 """
 
 import sqlite3
+from collections import namedtuple
+
+from connection_pool import get_pool
+
+# rows fetched per round trip by execute_query and iter_query
+DEFAULT_ARRAYSIZE = 500
 
 
 class DatabaseConnection:
     """
     A custom context manager class to handle database connections
     automatiaclly opens and closes database connections
+
+    With pooled=True the connection is checked out of a shared pool on
+    enter and returned to it on exit instead of being opened and closed
     """
     
-    def __init__(self, db_path):
+    def __init__(self, db_path, pooled=False, pool=None):
         """
         Initialize the DatabaseConnection with database path
         
         Args:
             db_path (str): Path to the SQLite database file
+            pooled (bool): Reuse connections from the shared pool for db_path
+            pool (ConnectionPool, optional): Explicit pool to use, implies pooled
         """
         self.db_path = db_path
+        self.pool = pool or (get_pool(db_path) if pooled else None)
         self.connection = None
     
     def __enter__(self):
@@ -29,8 +41,11 @@ class DatabaseConnection:
             sqlite3.Connection: The database connection object
         """
         try:
-            self.connection = sqlite3.connect(self.db_path)
-            print(f"Connected to database: {self.db_path}")
+            if self.pool:
+                self.connection = self.pool.acquire()
+            else:
+                self.connection = sqlite3.connect(self.db_path)
+                print(f"Connected to database: {self.db_path}")
             return self
         except sqlite3.Error as e:
             print(f"Error connecting to database: {e}")
@@ -46,6 +61,16 @@ class DatabaseConnection:
             traceback: Exception traceback (if any)
         """
         if self.connection:
+            if self.pool:
+                # commit or discard, then hand the connection back for reuse
+                try:
+                    if exc_type is None:
+                        self.connection.commit()
+                finally:
+                    self.pool.release(self.connection)
+                    self.connection = None
+                return False
+
             if exc_type is None:
                 # no exception occurred, commit any pending transaction
                 self.connection.commit()
@@ -63,27 +88,67 @@ class DatabaseConnection:
         return False
     
 
-    def execute_query(self, query):
+    def execute_query(self, query, params=()):
         """
         Execute a query and return results as a generator
         
         Args:
             query (str): SQL query to execute
+            params (tuple or dict, optional): Parameters bound to the query
             
         Yields:
             tuple: Each row from the query result
         """
+        return self.iter_query(query, params)
+
+    def iter_query(self, query, params=(), arraysize=DEFAULT_ARRAYSIZE,
+                   row_factory='tuple', chunks=False):
+        """
+        Execute a query and stream its results in fetchmany() chunks
+        
+        Args:
+            query (str): SQL query to execute
+            params (tuple or dict, optional): Parameters bound to the query
+            arraysize (int): Number of rows fetched per round trip
+            row_factory (str): 'tuple', 'record' (a namedtuple per row) or 'dict'
+            chunks (bool): Yield whole lists of rows instead of single rows
+            
+        Yields:
+            Each row, or each list of rows when chunks is True
+        """
+        if row_factory not in ('tuple', 'record', 'dict'):
+            raise ValueError(f"Unknown row factory: {row_factory}")
+
         cursor = self.connection.cursor()
+        cursor.arraysize = arraysize
         try:
-            cursor.execute(query)
+            cursor.execute(query, params)
+            make_row = self._row_maker(cursor, row_factory)
             while True:
-                row = cursor.fetchone()
-                if row is None:
+                batch = cursor.fetchmany()
+                if not batch:
                     break
-                yield row
+                if make_row is not None:
+                    batch = list(map(make_row, batch))
+                if chunks:
+                    yield batch
+                else:
+                    yield from batch
         finally:
             cursor.close()
 
+    @staticmethod
+    def _row_maker(cursor, row_factory):
+        """
+        Return a callable converting a tuple row, or None to keep tuples
+        """
+        if row_factory == 'tuple' or cursor.description is None:
+            return None
+        columns = [column[0] for column in cursor.description]
+        if row_factory == 'record':
+            return namedtuple('Record', columns, rename=True)._make
+        return lambda row: dict(zip(columns, row))
+
 # # Example usage of the DatabaseConnection context manager
 # def main():
 #     db_path = 'users.db'
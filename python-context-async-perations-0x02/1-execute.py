@@ -3,6 +3,7 @@ Query Context Manager
 """
 
 import sqlite3
+import sys
 
 
 class ExecuteQuery:
@@ -88,6 +89,183 @@ class ExecuteQuery:
         return False
 
 
+class QueryStream:
+    """
+    Lazy iterator over a cursor that fetches rows in bounded chunks
+
+    Only valid inside the StreamingExecuteQuery context that created it.
+    """
+
+    def __init__(self, cursor, arraysize, max_rows=None, max_chunk_bytes=None):
+        """
+        Initialize the QueryStream
+
+        Args:
+            cursor (sqlite3.Cursor): Cursor the query was executed on
+            arraysize (int): Maximum rows fetched per round trip
+            max_rows (int, optional): Stop after this many rows
+            max_chunk_bytes (int, optional): Approximate cap on the memory
+                held by one fetched chunk
+        """
+        self.cursor = cursor
+        self.arraysize = arraysize
+        self.max_rows = max_rows
+        self.max_chunk_bytes = max_chunk_bytes
+        self.rows_read = 0
+        self.closed = False
+        self._buffer = iter(())
+        self._exhausted = False
+        self._probed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.closed:
+            raise RuntimeError("Query stream used outside its ExecuteQuery context")
+        if self.max_rows is not None and self.rows_read >= self.max_rows:
+            raise StopIteration
+        row = next(self._buffer, None)
+        if row is None:
+            chunk = self._fetch()
+            if not chunk:
+                raise StopIteration
+            self._buffer = iter(chunk)
+            row = next(self._buffer)
+        self.rows_read += 1
+        return row
+
+    def chunks(self):
+        """
+        Yield the remaining rows as lists of at most arraysize rows
+        """
+        buffered = list(self._buffer)
+        if buffered:
+            yield self._take(buffered)
+        while True:
+            if self.closed:
+                raise RuntimeError("Query stream used outside its ExecuteQuery context")
+            chunk = self._fetch()
+            if not chunk:
+                return
+            yield self._take(chunk)
+
+    def _take(self, rows):
+        """
+        Trim rows to the row limit and account for them
+        """
+        if self.max_rows is not None:
+            rows = rows[:self.max_rows - self.rows_read]
+        self.rows_read += len(rows)
+        self._buffer = iter(())
+        return rows
+
+    def _fetch(self):
+        """
+        Fetch the next chunk, sized to the row limit and memory cap
+        """
+        if self._exhausted:
+            return []
+        size = self.arraysize
+        if self.max_rows is not None:
+            size = min(size, self.max_rows - self.rows_read)
+        if size <= 0:
+            return []
+        chunk = []
+        if self.max_chunk_bytes and not self._probed:
+            # size the first chunk from one row, so it is under the cap too
+            self._probed = True
+            chunk = self.cursor.fetchmany(1)
+            if not chunk:
+                self._exhausted = True
+                return chunk
+            self._fit(chunk)
+            size = min(size, self.arraysize)
+        if size > len(chunk):
+            chunk += self.cursor.fetchmany(size - len(chunk))
+        if len(chunk) < size:
+            self._exhausted = True
+        if chunk and self.max_chunk_bytes:
+            self._fit(chunk)
+        return chunk
+
+    def _fit(self, rows):
+        """
+        Shrink later fetches so a chunk of rows like these stays under the memory cap
+        """
+        row_bytes = max(1, sum(map(_row_size, rows)) // len(rows))
+        self.arraysize = max(1, min(self.arraysize, self.max_chunk_bytes // row_bytes))
+
+
+def _row_size(row):
+    """
+    Approximate memory used by a row tuple and its values
+    """
+    return sys.getsizeof(row) + sum(map(sys.getsizeof, row))
+
+
+class StreamingExecuteQuery(ExecuteQuery):
+    """
+    ExecuteQuery variant that returns a lazy, chunked iterator instead of
+    materializing the whole result set with fetchall()
+
+    Rows are fetched on demand, so large results are processed in
+    constant memory. The iterator is closed when the context exits.
+    """
+
+    def __init__(self, db_path, query, params=None, arraysize=500,
+                 max_rows=None, max_chunk_bytes=None):
+        """
+        Initialize the StreamingExecuteQuery context manager
+
+        Args:
+            db_path (str): Path to the SQLite database file
+            query (str): SQL query to execute
+            params (tuple, optional): Parameters for the query
+            arraysize (int): Maximum rows fetched per round trip
+            max_rows (int, optional): Stop after this many rows
+            max_chunk_bytes (int, optional): Approximate cap on the memory
+                held by one fetched chunk
+        """
+        super().__init__(db_path, query, params)
+        self.arraysize = arraysize
+        self.max_rows = max_rows
+        self.max_chunk_bytes = max_chunk_bytes
+        self.stream = None
+
+    def __enter__(self):
+        """
+        Enter the context manager - establish connection and execute query
+        Returns:
+            QueryStream: Lazy iterator over the query results
+        """
+        try:
+            self.connection = sqlite3.connect(self.db_path)
+            print(f"Connected to database: {self.db_path}")
+
+            self.cursor = self.connection.cursor()
+            self.cursor.execute(self.query, self.params)
+
+            self.stream = QueryStream(
+                self.cursor, self.arraysize, self.max_rows, self.max_chunk_bytes
+            )
+            print("Query executed successfully. Streaming results.")
+            return self.stream
+
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+            self.__exit__(type(e), e, e.__traceback__)
+            raise
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        Exit the context manager - close the stream, then clean up resources
+        """
+        if self.stream:
+            self.stream.closed = True
+        return super().__exit__(exc_type, exc_value, traceback)
+
+
 def main():
     """
     Main function to demonstrate the ExecuteQuery context manager
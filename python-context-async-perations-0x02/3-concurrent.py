@@ -5,6 +5,9 @@ Concurrent Asynchronous Database Queries
 import asyncio
 import aiosqlite
 
+from query_executor import ConcurrentQueryExecutor, OffloadPipeline
+from shared_scan import SharedScanBatcher
+
 
 async def async_fetch_users():
     """
@@ -70,6 +73,79 @@ async def fetch_concurrently():
     return all_users, older_users
 
 
+async def fetch_concurrently_shared_scan(db_path='users.db'):
+    """
+    Same queries as fetch_concurrently, served by a single query on users
+
+    Returns:
+        tuple: Results from both queries (all_users, older_users)
+    """
+    async with ConcurrentQueryExecutor(db_path) as executor:
+        batcher = SharedScanBatcher(executor)
+        return await asyncio.gather(
+            batcher.fetch("SELECT * FROM users"),
+            batcher.fetch("SELECT * FROM users WHERE age > ?", (40,)),
+        )
+
+
+def summarize_ages(rows):
+    """
+    CPU-bound post-processing of a batch of user rows, run in a worker
+
+    Args:
+        rows (list): Single-column (age,) rows
+
+    Returns:
+        dict: Row count and the minimum, maximum and total age of the batch
+    """
+    ages = [row[0] for row in rows]
+    return {
+        'count': len(ages),
+        'min_age': min(ages),
+        'max_age': max(ages),
+        'total_age': sum(ages),
+    }
+
+
+def merge_summaries(total, summary):
+    """
+    Combine the summaries of two batches of the same query
+
+    Returns:
+        dict: Summary of both batches together
+    """
+    return {
+        'count': total['count'] + summary['count'],
+        'min_age': min(total['min_age'], summary['min_age']),
+        'max_age': max(total['max_age'], summary['max_age']),
+        'total_age': total['total_age'] + summary['total_age'],
+    }
+
+
+async def summarize_concurrently(db_path='users.db', batch_size=1000):
+    """
+    Run both queries concurrently and summarize their rows in worker threads
+    so the event loop stays free to issue queries
+
+    Args:
+        db_path (str): Path to the SQLite database file
+        batch_size (int): Rows summarized per worker call
+
+    Returns:
+        dict: Combined summary per query index; queries without rows are left out
+    """
+    queries = ["SELECT age FROM users", ("SELECT age FROM users WHERE age > ?", (40,))]
+    summaries = {}
+    async with ConcurrentQueryExecutor(db_path) as executor:
+        with OffloadPipeline(summarize_ages) as pipeline:
+            batches = executor.stream_processed(queries, pipeline, batch_size=batch_size)
+            async for index, summary in batches:
+                if index in summaries:
+                    summary = merge_summaries(summaries[index], summary)
+                summaries[index] = summary
+    return summaries
+
+
 def main():
     """
     Main function to run the concurrent fetch operation
@@ -0,0 +1,69 @@
+"""
+Benchmark ConcurrentQueryExecutor throughput at different concurrency levels
+
+Usage:
+    python bench_concurrency.py [queries] [rows]
+"""
+
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from query_executor import ConcurrentQueryExecutor
+
+
+def create_database(path, rows):
+    """
+    Create a users table with the given number of rows
+    """
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "name TEXT NOT NULL, email TEXT NOT NULL, age REAL NOT NULL)"
+    )
+    connection.executemany(
+        "INSERT INTO users (name, email, age) VALUES (?, ?, ?)",
+        ((f"user{i}", f"user{i}@example.com", 18 + i % 60) for i in range(rows)),
+    )
+    connection.commit()
+    connection.close()
+
+
+async def measure(path, queries, concurrency):
+    """
+    Return queries per second for one concurrency level
+    """
+    async with ConcurrentQueryExecutor(path, concurrency=concurrency) as executor:
+        # open the pooled connections before timing
+        await executor.run(["SELECT 1"] * concurrency)
+        start = time.perf_counter()
+        results = await executor.run(queries)
+        elapsed = time.perf_counter() - start
+    assert not any(result.error for result in results)
+    return len(queries) / elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'users.db')
+        create_database(path, rows)
+        queries = [
+            ("SELECT COUNT(*), AVG(age) FROM users WHERE age > ? AND email LIKE ?",
+             (i % 60, f"%{i % 10}%"))
+            for i in range(count)
+        ]
+
+        print(f"{'concurrency':>11} {'queries/s':>12}")
+        for concurrency in (1, 2, 4, 8, 16):
+            rate = asyncio.run(measure(path, queries, concurrency))
+            print(f"{concurrency:>11} {rate:>12,.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark rows/sec of the fetchone loop against fetchmany streaming
+in DatabaseConnection
+
+Usage:
+    python bench_fetch.py [rows]
+"""
+
+import importlib
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+DatabaseConnection = importlib.import_module('0-databaseconnection').DatabaseConnection
+
+QUERY = "SELECT * FROM users WHERE age > ?"
+
+
+def create_database(path, rows):
+    """
+    Create a users table with the given number of rows
+    """
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "name TEXT NOT NULL, email TEXT NOT NULL, age REAL NOT NULL)"
+    )
+    connection.executemany(
+        "INSERT INTO users (name, email, age) VALUES (?, ?, ?)",
+        ((f"user{i}", f"user{i}@example.com", 18 + i % 60) for i in range(rows)),
+    )
+    connection.commit()
+    connection.close()
+
+
+def fetchone_loop(connection):
+    """
+    The original execute_query strategy: one fetchone() call per row
+    """
+    cursor = connection.cursor()
+    cursor.execute(QUERY, (0,))
+    count = 0
+    while True:
+        row = cursor.fetchone()
+        if row is None:
+            break
+        count += 1
+    cursor.close()
+    return count
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'users.db')
+        create_database(path, rows)
+
+        with DatabaseConnection(path, pooled=True) as db:
+            scenarios = [
+                ("fetchone loop", lambda: fetchone_loop(db.connection)),
+            ]
+            for arraysize in (100, 500, 2000):
+                scenarios.append((
+                    f"fetchmany({arraysize}) rows",
+                    lambda n=arraysize: sum(1 for _ in db.iter_query(QUERY, (0,), arraysize=n)),
+                ))
+            scenarios += [
+                ("fetchmany(500) chunks", lambda: sum(
+                    len(chunk) for chunk in db.iter_query(QUERY, (0,), chunks=True))),
+                ("fetchmany(500) records", lambda: sum(
+                    1 for _ in db.iter_query(QUERY, (0,), row_factory='record'))),
+                ("fetchmany(500) dicts", lambda: sum(
+                    1 for _ in db.iter_query(QUERY, (0,), row_factory='dict'))),
+            ]
+
+            for label, func in scenarios:
+                start = time.perf_counter()
+                count = func()
+                elapsed = time.perf_counter() - start
+                print(f"{label:<26} {count / elapsed:>14,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+Shared pool of long-lived SQLite connections for the context managers
+"""
+
+import asyncio
+import queue
+import sqlite3
+import threading
+from contextlib import asynccontextmanager
+
+
+class ConnectionPool:
+    """
+    A thread-safe pool of reusable connections to one SQLite database
+
+    Connections are opened lazily up to ``size``. Every connection is
+    reset when it is returned, so state from one checkout never leaks
+    into the next.
+    """
+
+    def __init__(self, db_path, size=5, timeout=5.0):
+        """
+        Initialize the ConnectionPool
+
+        Args:
+            db_path (str): Path to the SQLite database file
+            size (int): Maximum number of open connections
+            timeout (float): Seconds to wait for a free connection
+        """
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._open = 0
+        self._lock = threading.Lock()
+        self.metrics = {
+            'created': 0,
+            'checkouts': 0,
+            'reuses': 0,
+            'waits': 0,
+            'rollbacks': 0,
+            'discarded': 0,
+        }
+
+    def _count(self, name):
+        with self._lock:
+            self.metrics[name] += 1
+
+    def acquire(self):
+        """
+        Check a connection out of the pool
+
+        Returns:
+            sqlite3.Connection: An open connection
+
+        Raises:
+            TimeoutError: If no connection is returned within the timeout
+        """
+        try:
+            connection = self._idle.get_nowait()
+            self._count('reuses')
+        except queue.Empty:
+            connection = None
+            with self._lock:
+                if self._open < self.size:
+                    self._open += 1
+                    self.metrics['created'] += 1
+                    create = True
+                else:
+                    create = False
+            if create:
+                try:
+                    connection = sqlite3.connect(self.db_path, check_same_thread=False)
+                except sqlite3.Error:
+                    with self._lock:
+                        self._open -= 1
+                    raise
+            else:
+                self._count('waits')
+                try:
+                    connection = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise TimeoutError(
+                        f"No connection to {self.db_path} available after {self.timeout}s"
+                    )
+                self._count('reuses')
+
+        self._count('checkouts')
+        return connection
+
+    def release(self, connection):
+        """
+        Reset a connection and return it to the pool
+
+        Uncommitted work is rolled back and per-connection settings are
+        restored to their defaults. Broken connections are discarded.
+
+        Args:
+            connection (sqlite3.Connection): Connection obtained from acquire()
+        """
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+                self._count('rollbacks')
+            connection.row_factory = None
+            connection.text_factory = str
+            self._idle.put_nowait(connection)
+        except (sqlite3.Error, queue.Full):
+            self._discard(connection)
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._open -= 1
+            self.metrics['discarded'] += 1
+
+    def close(self):
+        """
+        Close every idle connection
+        """
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            connection.close()
+            with self._lock:
+                self._open -= 1
+
+    def stats(self):
+        """
+        Return the pool metrics
+
+        Returns:
+            dict: Counters plus the number of open and idle connections
+        """
+        with self._lock:
+            return dict(self.metrics, open=self._open, idle=self._idle.qsize())
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path, size=5):
+    """
+    Return the shared pool for a database, creating it on first use
+
+    Args:
+        db_path (str): Path to the SQLite database file
+        size (int): Pool size, only used when the pool is created
+
+    Returns:
+        ConnectionPool: The pool shared by every caller in the process
+    """
+    with _pools_lock:
+        pool = _pools.get(db_path)
+        if pool is None:
+            pool = ConnectionPool(db_path, size=size)
+            _pools[db_path] = pool
+        return pool
+
+
+class AsyncConnectionPool:
+    """
+    A pool of reusable aiosqlite connections to one SQLite database
+
+    Must be used from a single event loop. Connections are opened lazily
+    up to ``size`` and rolled back when they are returned.
+    """
+
+    def __init__(self, db_path, size=5):
+        """
+        Initialize the AsyncConnectionPool
+
+        Args:
+            db_path (str): Path to the SQLite database file
+            size (int): Maximum number of open connections
+        """
+        self.db_path = db_path
+        self.size = size
+        self._idle = []
+        self._connections = []
+        self._semaphore = None
+        self.metrics = {'created': 0, 'checkouts': 0, 'reuses': 0, 'waits': 0}
+
+    async def acquire(self):
+        """
+        Check a connection out of the pool, waiting for one if needed
+
+        Returns:
+            aiosqlite.Connection: An open connection
+        """
+        import aiosqlite
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.size)
+        if self._semaphore.locked():
+            self.metrics['waits'] += 1
+        await self._semaphore.acquire()
+        try:
+            if self._idle:
+                connection = self._idle.pop()
+                self.metrics['reuses'] += 1
+            else:
+                connection = await aiosqlite.connect(self.db_path)
+                self._connections.append(connection)
+                self.metrics['created'] += 1
+        except BaseException:
+            self._semaphore.release()
+            raise
+        self.metrics['checkouts'] += 1
+        return connection
+
+    async def release(self, connection):
+        """
+        Roll back uncommitted work and return a connection to the pool
+
+        Args:
+            connection (aiosqlite.Connection): Connection obtained from acquire()
+        """
+        try:
+            if connection.in_transaction:
+                await connection.rollback()
+            self._idle.append(connection)
+        except (ValueError, sqlite3.Error):
+            self._connections.remove(connection)
+        finally:
+            self._semaphore.release()
+
+    @asynccontextmanager
+    async def connection(self):
+        """
+        Async context manager that checks a connection out and returns it
+        """
+        connection = await self.acquire()
+        try:
+            yield connection
+        finally:
+            await self.release(connection)
+
+    async def close(self):
+        """
+        Close every connection owned by the pool
+        """
+        connections, self._connections, self._idle = self._connections, [], []
+        for connection in connections:
+            await connection.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+        return False
@@ -0,0 +1,274 @@
+"""
+Concurrent asynchronous query executor with bounded parallelism
+"""
+
+import asyncio
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from connection_pool import AsyncConnectionPool
+
+# outcome of one query; rows is None and error is set when it failed
+QueryResult = namedtuple('QueryResult', ['index', 'query', 'rows', 'error', 'elapsed'])
+
+
+def _normalize(query):
+    """
+    Accept either a SQL string or a (sql, params) pair
+    """
+    if isinstance(query, str):
+        return query, ()
+    sql, params = query
+    return sql, params or ()
+
+
+class ConcurrentQueryExecutor:
+    """
+    Runs any number of queries over a pool of aiosqlite connections
+
+    At most ``concurrency`` queries execute at the same time. Results are
+    streamed back in completion order, and each query can have a timeout.
+    Closing the stream early cancels the queries that have not finished.
+    """
+
+    def __init__(self, db_path, concurrency=5, timeout=None):
+        """
+        Initialize the ConcurrentQueryExecutor
+
+        Args:
+            db_path (str): Path to the SQLite database file
+            concurrency (int): Maximum number of queries running at once
+            timeout (float, optional): Default per-query time limit in
+                seconds, measured once the query has a connection
+        """
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.pool = AsyncConnectionPool(db_path, size=concurrency)
+
+    async def _fetch(self, db, sql, params):
+        cursor = await db.execute(sql, params)
+        try:
+            return await cursor.fetchall()
+        finally:
+            await cursor.close()
+
+    async def _execute(self, sql, params, timeout):
+        """
+        Run one query, interrupting it in SQLite on timeout or cancellation
+        """
+        async with self.pool.connection() as db:
+            task = asyncio.ensure_future(self._fetch(db, sql, params))
+            try:
+                return await asyncio.wait_for(asyncio.shield(task), timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                await self._interrupt(db, task)
+                raise
+
+    async def _interrupt(self, db, task):
+        """
+        Stop the statement of `task` before its connection goes back to the pool
+
+        Interrupt is a no-op until the statement has started, so it is
+        repeated until the task ends. Another cancellation meanwhile is
+        re-raised only once the statement has stopped.
+        """
+        cancelled = False
+        while not task.done():
+            try:
+                await db.interrupt()
+                await asyncio.wait({task}, timeout=0.05)
+            except asyncio.CancelledError:
+                cancelled = True
+        if not task.cancelled():
+            task.exception()  # retrieve the "interrupted" error
+        if cancelled:
+            raise asyncio.CancelledError()
+
+    async def _run_one(self, index, query, timeout):
+        sql, params = _normalize(query)
+        start = time.perf_counter()
+        try:
+            rows = await self._execute(sql, params, timeout)
+            error = None
+        except asyncio.TimeoutError:
+            rows, error = None, TimeoutError(f"Query {index} timed out after {timeout}s")
+        except Exception as e:
+            rows, error = None, e
+        return QueryResult(index, sql, rows, error, time.perf_counter() - start)
+
+    async def stream(self, queries, timeout=None):
+        """
+        Execute queries concurrently and yield results as they complete
+
+        Args:
+            queries (iterable): SQL strings or (sql, params) pairs
+            timeout (float, optional): Per-query time limit, overrides the default
+
+        Yields:
+            QueryResult: One per query, in completion order
+        """
+        timeout = self.timeout if timeout is None else timeout
+        tasks = [
+            asyncio.ensure_future(self._run_one(index, query, timeout))
+            for index, query in enumerate(queries)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # the consumer stopped early or was cancelled
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def run(self, queries, timeout=None):
+        """
+        Execute queries concurrently and return results in input order
+
+        Args:
+            queries (iterable): SQL strings or (sql, params) pairs
+            timeout (float, optional): Per-query time limit, overrides the default
+
+        Returns:
+            list: QueryResult for each query, in the order given
+        """
+        results = [result async for result in self.stream(queries, timeout)]
+        return sorted(results, key=lambda result: result.index)
+
+    async def stream_processed(self, queries, pipeline, batch_size=1000, timeout=None):
+        """
+        Execute queries concurrently and post-process their rows off the loop
+
+        Each result is split into batches of rows that are handed to the
+        pipeline's workers, while the event loop keeps issuing queries.
+
+        Args:
+            queries (iterable): SQL strings or (sql, params) pairs
+            pipeline (OffloadPipeline): Worker stage applied to every batch
+            batch_size (int): Rows per batch handed to a worker
+            timeout (float, optional): Per-query time limit, overrides the default
+
+        Yields:
+            tuple: (query index, transformed batch), in completion order
+
+        Raises:
+            Exception: The error of the first query that failed
+        """
+        async def batches():
+            async for result in self.stream(queries, timeout):
+                if result.error is not None:
+                    raise result.error
+                for start in range(0, len(result.rows), batch_size):
+                    yield result.index, result.rows[start:start + batch_size]
+
+        async for item in pipeline.process(batches()):
+            yield item
+
+    async def close(self):
+        """
+        Close the pooled connections
+        """
+        await self.pool.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+        return False
+
+
+class OffloadPipeline:
+    """
+    Pipeline stage that runs a CPU-bound transform in worker threads or processes
+
+    At most ``max_pending`` batches are in flight. When the workers fall
+    behind, the stage stops pulling from its source, which pushes back
+    on the producer instead of buffering every result in memory.
+    """
+
+    def __init__(self, transform, workers=None, use_processes=False,
+                 max_pending=None, executor=None):
+        """
+        Initialize the OffloadPipeline
+
+        Args:
+            transform (callable): Function applied to each batch; must be
+                picklable (module level) when use_processes is True
+            workers (int, optional): Worker count, defaults to the CPU count
+            use_processes (bool): Use a ProcessPoolExecutor instead of threads
+            max_pending (int, optional): Batches in flight, defaults to 2 per worker
+            executor (Executor, optional): Existing executor to submit to
+        """
+        self.transform = transform
+        workers = workers or os.cpu_count() or 1
+        self._owns_executor = executor is None
+        if executor is None:
+            executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+            executor = executor_class(max_workers=workers)
+        self.executor = executor
+        self.max_pending = max_pending or 2 * workers
+
+    async def process(self, items):
+        """
+        Transform (key, batch) pairs from an async iterable in the workers
+
+        Finished batches are yielded as soon as they are seen, between
+        pulls from the source, not only once max_pending is reached.
+
+        Args:
+            items: Async iterable of (key, batch) pairs
+
+        Yields:
+            tuple: (key, transform(batch)), in completion order
+
+        Raises:
+            Exception: The error of a failed transform, once the batches
+                that finished with it have been yielded
+        """
+        loop = asyncio.get_running_loop()
+        pending = {}
+
+        def collect():
+            # results of the finished batches first, then the first error
+            error = None
+            for future in [future for future in pending if future.done()]:
+                key = pending.pop(future)
+                if future.exception() is None:
+                    yield key, future.result()
+                elif error is None:
+                    error = future.exception()
+            if error is not None:
+                raise error
+
+        try:
+            async for key, batch in items:
+                if len(pending) >= self.max_pending:
+                    await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for item in collect():
+                    yield item
+                future = loop.run_in_executor(self.executor, self.transform, batch)
+                pending[future] = key
+            while pending:
+                await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for item in collect():
+                    yield item
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def close(self):
+        """
+        Shut down the executor if the pipeline created it
+        """
+        if self._owns_executor:
+            self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
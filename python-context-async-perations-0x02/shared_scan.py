@@ -0,0 +1,161 @@
+"""
+Shared-scan batching for overlapping concurrent queries
+"""
+
+import asyncio
+import re
+
+_SIMPLE_SELECT = re.compile(
+    r"^\s*SELECT\s+\*\s+FROM\s+(\w+)(?:\s+WHERE\s+(.+?))?\s*;?\s*$",
+    re.IGNORECASE | re.DOTALL,
+)
+_PREDICATE = re.compile(r"^\s*(\w+)\s*(==|=|!=|<>|<=|>=|<|>)\s*\?\s*$")
+_AND = re.compile(r"\s+AND\s+", re.IGNORECASE)
+
+
+def parse_simple_select(sql, params=()):
+    """
+    Parse 'SELECT * FROM table [WHERE col op ? [AND ...]]'
+
+    Args:
+        sql (str): SQL query
+        params (tuple): Parameters bound to the placeholders
+
+    Returns:
+        tuple: (table, where clause or None), or None if the query is not
+        of that shape and cannot share a scan
+    """
+    match = _SIMPLE_SELECT.match(sql)
+    if not match:
+        return None
+    table, where = match.groups()
+    if not where:
+        return (table.lower(), None) if not params else None
+
+    clauses = _AND.split(where)
+    if len(clauses) != len(params):
+        return None
+    if not all(_PREDICATE.match(clause) for clause in clauses):
+        return None
+    return table.lower(), where.strip()
+
+
+def combine(table, queries):
+    """
+    Build one query that answers several simple selects on `table`
+
+    Every WHERE clause is selected as a flag column after the table's own
+    columns, and the clauses are OR-ed together. SQLite evaluates each one
+    with its usual type affinity and NULL rules, and can still serve the
+    OR from indexes; without any WHERE clause the table is read in full.
+
+    Args:
+        table (str): Table all queries read
+        queries (list): (where clause or None, params) pairs
+
+    Returns:
+        tuple: (sql, params)
+    """
+    flags = [f"({where})" if where else "1" for where, _ in queries]
+    flag_params = [value for _, params in queries for value in params]
+    sql = f"SELECT *, {', '.join(flags)} FROM {table}"
+    if any(where is None for where, _ in queries):
+        return sql, tuple(flag_params)
+    sql += " WHERE " + " OR ".join(flags)
+    return sql, tuple(flag_params * 2)
+
+
+class SharedScanBatcher:
+    """
+    Serves simple queries over the same table from a single query
+
+    Queries issued within ``window`` seconds of each other that read the
+    same table with 'SELECT * ... WHERE col op ?' predicates are combined
+    by combine() into one statement whose WHERE clause is the OR of theirs,
+    so indexed lookups stay indexed. Each row carries one flag per query,
+    computed by SQLite, that says which queries it belongs to. If the
+    combined statement fails, e.g. on an unknown column, every query runs
+    on its own so that only the faulty one gets the error. Any other query
+    runs on its own.
+    """
+
+    def __init__(self, executor, window=0.005):
+        """
+        Initialize the SharedScanBatcher
+
+        Args:
+            executor (ConcurrentQueryExecutor): Executor whose pool runs the scans
+            window (float): Seconds to wait for more queries on the same table
+        """
+        self.executor = executor
+        self.window = window
+        self._groups = {}
+        # keep flush tasks referenced until they finish
+        self._flushes = set()
+        self.stats = {'queries': 0, 'scans': 0, 'shared': 0, 'direct': 0}
+
+    async def fetch(self, sql, params=()):
+        """
+        Return all rows of a query, sharing a scan where possible
+
+        Args:
+            sql (str): SQL query
+            params (tuple, optional): Parameters bound to the query
+
+        Returns:
+            list: Result rows
+        """
+        self.stats['queries'] += 1
+        parsed = parse_simple_select(sql, params)
+        if parsed is None:
+            self.stats['direct'] += 1
+            return await self._direct(sql, params)
+
+        table, where = parsed
+        future = asyncio.get_running_loop().create_future()
+        group = self._groups.get(table)
+        if group is None:
+            group = self._groups[table] = []
+            flush = asyncio.ensure_future(self._flush_later(table))
+            self._flushes.add(flush)
+            flush.add_done_callback(self._flushes.discard)
+        group.append((sql, params, where, future))
+        return await future
+
+    async def _direct(self, sql, params):
+        result = (await self.executor.run([(sql, params)]))[0]
+        if result.error is not None:
+            raise result.error
+        return result.rows
+
+    async def _flush_later(self, table):
+        await asyncio.sleep(self.window)
+        group = self._groups.pop(table)
+        if len(group) > 1:
+            try:
+                sql, params = combine(table, [(where, params) for _, params, where, _ in group])
+                rows = await self._direct(sql, params)
+            except Exception:
+                pass
+            else:
+                self.stats['scans'] += 1
+                self.stats['shared'] += len(group)
+                width = len(rows[0]) - len(group) if rows else 0
+                for index, (*_, future) in enumerate(group):
+                    if not future.done():
+                        flag = width + index
+                        future.set_result([row[:width] for row in rows if row[flag]])
+                return
+
+        await asyncio.gather(*(self._run_alone(sql, params, future) for sql, params, _, future in group))
+
+    async def _run_alone(self, sql, params, future):
+        self.stats['direct'] += 1
+        try:
+            rows = await self._direct(sql, params)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(rows)
@@ -0,0 +1,160 @@
+"""
+Tests for pooled DatabaseConnection contexts and iter_query
+"""
+
+import importlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from connection_pool import ConnectionPool
+
+DatabaseConnection = importlib.import_module('0-databaseconnection').DatabaseConnection
+
+
+def make_users_db(directory, count=2):
+    path = os.path.join(directory, 'users.db')
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, age INTEGER)")
+    db.executemany(
+        "INSERT INTO users (name, age) VALUES (?, ?)",
+        [(f'user{number}', 20 + number % 50) for number in range(count)],
+    )
+    db.commit()
+    db.close()
+    return path
+
+
+class TestPooledDatabaseConnection(unittest.TestCase):
+    """Pooled contexts hand their connection back instead of closing it"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.db_path = make_users_db(directory)
+        self.pool = ConnectionPool(self.db_path, size=1)
+        self.addCleanup(self.pool.close)
+
+    def count(self, connection):
+        return connection.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def test_connection_is_returned_open_and_committed(self):
+        with DatabaseConnection(self.db_path, pool=self.pool) as db:
+            connection = db.connection
+            connection.execute("INSERT INTO users (name, age) VALUES ('carol', 33)")
+        self.assertIsNone(db.connection)
+        self.assertEqual(self.pool.stats()['idle'], 1)
+
+        with DatabaseConnection(self.db_path, pool=self.pool) as db:
+            self.assertIs(db.connection, connection)
+            self.assertEqual(self.count(connection), 3)
+        self.assertEqual(self.pool.stats()['reuses'], 1)
+
+    def test_connection_is_returned_and_rolled_back_on_error(self):
+        with self.assertRaises(ZeroDivisionError):
+            with DatabaseConnection(self.db_path, pool=self.pool) as db:
+                connection = db.connection
+                connection.execute("INSERT INTO users (name, age) VALUES ('carol', 33)")
+                1 / 0
+        stats = self.pool.stats()
+        self.assertEqual((stats['idle'], stats['open'], stats['rollbacks']), (1, 1, 1))
+
+        with DatabaseConnection(self.db_path, pool=self.pool) as db:
+            self.assertIs(db.connection, connection)
+            self.assertFalse(connection.in_transaction)
+            self.assertEqual(self.count(connection), 2)
+
+    def test_release_resets_connection_settings(self):
+        with DatabaseConnection(self.db_path, pool=self.pool) as db:
+            db.connection.row_factory = sqlite3.Row
+            db.connection.text_factory = bytes
+        with DatabaseConnection(self.db_path, pool=self.pool) as db:
+            self.assertIsNone(db.connection.row_factory)
+            self.assertIs(db.connection.text_factory, str)
+            self.assertEqual(
+                db.connection.execute("SELECT name FROM users WHERE id = 1").fetchone(),
+                ('user0',),
+            )
+
+    def test_pooled_uses_the_shared_pool(self):
+        with DatabaseConnection(self.db_path, pooled=True) as first:
+            connection = first.connection
+        with DatabaseConnection(self.db_path, pooled=True) as second:
+            self.assertIs(second.connection, connection)
+            self.assertIs(second.pool, first.pool)
+        first.pool.close()
+
+
+class TestIterQuery(unittest.TestCase):
+    """iter_query returns what fetchall() does, in fetchmany() chunks"""
+
+    ROWS = 1003
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.db_path = make_users_db(directory, count=self.ROWS)
+        pool = ConnectionPool(self.db_path, size=1)
+        self.addCleanup(pool.close)
+        self.db = DatabaseConnection(self.db_path, pool=pool).__enter__()
+        self.addCleanup(self.db.__exit__, None, None, None)
+
+    def fetchall(self, query, params=()):
+        return self.db.connection.execute(query, params).fetchall()
+
+    def test_rows_match_fetchall(self):
+        expected = self.fetchall("SELECT * FROM users")
+        self.assertEqual(len(expected), self.ROWS)
+        for arraysize in (1, 10, 500, 1003, 5000):
+            rows = list(self.db.iter_query("SELECT * FROM users", arraysize=arraysize))
+            self.assertEqual(rows, expected, arraysize)
+        self.assertEqual(list(self.db.execute_query("SELECT * FROM users")), expected)
+
+    def test_params(self):
+        query = "SELECT name FROM users WHERE age > ? AND id <= ?"
+        self.assertEqual(
+            list(self.db.iter_query(query, (60, 200), arraysize=7)),
+            self.fetchall(query, (60, 200)),
+        )
+        query = "SELECT name FROM users WHERE age = :age"
+        self.assertEqual(
+            list(self.db.iter_query(query, {'age': 42})), self.fetchall(query, {'age': 42})
+        )
+
+    def test_chunks_follow_arraysize(self):
+        chunks = list(self.db.iter_query("SELECT id FROM users", arraysize=100, chunks=True))
+        # 1003 rows: ten full chunks and a short last one
+        self.assertEqual([len(chunk) for chunk in chunks], [100] * 10 + [3])
+        self.assertEqual(
+            [row for chunk in chunks for row in chunk], self.fetchall("SELECT id FROM users")
+        )
+
+    def test_row_factories(self):
+        query = "SELECT id, name AS user_name, age FROM users WHERE id <= 3"
+        expected = self.fetchall(query)
+
+        records = list(self.db.iter_query(query, arraysize=2, row_factory='record'))
+        self.assertEqual([tuple(record) for record in records], expected)
+        self.assertEqual(records[0].user_name, 'user0')
+
+        dicts = list(self.db.iter_query(query, arraysize=2, row_factory='dict', chunks=True))
+        self.assertEqual([len(chunk) for chunk in dicts], [2, 1])
+        self.assertEqual(dicts[0][0], {'id': 1, 'user_name': 'user0', 'age': 20})
+        self.assertEqual(
+            [tuple(row.values()) for chunk in dicts for row in chunk], expected
+        )
+
+        with self.assertRaises(ValueError):
+            next(self.db.iter_query(query, row_factory='row'))
+
+    def test_statement_without_result_columns(self):
+        self.assertEqual(
+            list(self.db.iter_query("UPDATE users SET age = 0 WHERE id = 1", row_factory='dict')),
+            [],
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
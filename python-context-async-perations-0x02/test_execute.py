@@ -0,0 +1,94 @@
+"""
+Tests for StreamingExecuteQuery and its QueryStream
+"""
+
+import importlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+execute = importlib.import_module('1-execute')
+
+ROWS = 203
+QUERY = "SELECT id, bio FROM users ORDER BY id"
+
+
+class TestStreamingExecuteQuery(unittest.TestCase):
+    """Streams stop at their limits and close with their context"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.db_path = os.path.join(directory, 'users.db')
+        db = sqlite3.connect(self.db_path)
+        db.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, bio TEXT)")
+        db.executemany(
+            "INSERT INTO users (bio) VALUES (?)", [('x' * 1000,) for _ in range(ROWS)]
+        )
+        db.commit()
+        db.close()
+        patcher = mock.patch('builtins.print')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def query(self, **kwargs):
+        return execute.StreamingExecuteQuery(self.db_path, QUERY, **kwargs)
+
+    def test_rows_match_fetchall(self):
+        with execute.ExecuteQuery(self.db_path, QUERY) as expected:
+            pass
+        with self.query(arraysize=50) as stream:
+            self.assertEqual(list(stream), expected)
+        with self.query(arraysize=50) as stream:
+            self.assertEqual([len(chunk) for chunk in stream.chunks()], [50] * 4 + [3])
+
+    def test_max_rows(self):
+        with self.query(arraysize=50, max_rows=120) as stream:
+            ids = [row[0] for row in stream]
+        self.assertEqual(ids, list(range(1, 121)))
+        self.assertEqual(stream.rows_read, 120)
+
+        with self.query(arraysize=50, max_rows=120) as stream:
+            first = next(stream)
+            chunks = list(stream.chunks())
+        # the rest of the buffered chunk, then fetches cut at the limit
+        self.assertEqual(first[0], 1)
+        self.assertEqual([len(chunk) for chunk in chunks], [49, 50, 20])
+
+    def test_byte_cap_applies_to_the_first_chunk(self):
+        row_bytes = execute._row_size((1, 'x' * 1000))
+        cap = row_bytes * 4
+        with self.query(arraysize=500, max_chunk_bytes=cap) as stream:
+            chunks = list(stream.chunks())
+        self.assertEqual(sum(map(len, chunks)), ROWS)
+        for chunk in chunks:
+            self.assertLessEqual(sum(map(execute._row_size, chunk)), cap)
+        self.assertEqual(len(chunks[0]), 4)
+
+    def test_byte_cap_with_an_empty_result(self):
+        query = execute.StreamingExecuteQuery(
+            self.db_path, "SELECT * FROM users WHERE id < 0", max_chunk_bytes=100
+        )
+        with query as stream:
+            self.assertEqual(list(stream), [])
+
+    def test_early_exit_closes_the_cursor(self):
+        context = self.query(arraysize=10)
+        with context as stream:
+            for row in stream:
+                if row[0] == 3:
+                    break
+        self.assertTrue(stream.closed)
+        with self.assertRaises(RuntimeError):
+            next(stream)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            context.cursor.fetchone()
+        with self.assertRaises(sqlite3.ProgrammingError):
+            context.connection.execute("SELECT 1")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+"""
+Tests for streaming results out of OffloadPipeline
+"""
+
+import asyncio
+import importlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from concurrent.futures import Executor, Future
+
+from query_executor import ConcurrentQueryExecutor, OffloadPipeline
+
+# counts for seconds unless interrupted
+SLOW_QUERY = (
+    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 100000000) "
+    "SELECT COUNT(*) FROM c"
+)
+
+
+def double(batch):
+    if batch == 'fail':
+        raise ValueError('bad batch')
+    return batch * 2
+
+
+class InlineExecutor(Executor):
+    """
+    Runs each batch in submit(), so it has finished before the next pull
+    """
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+class TestOffloadPipeline(unittest.TestCase):
+    """Finished batches reach the consumer early and survive failures"""
+
+    def test_results_stream_before_the_source_ends(self):
+        results = []
+        seen = []
+
+        async def source():
+            for key in range(3):
+                yield key, key
+                # one loop iteration hands the finished batch to the pipeline
+                await asyncio.sleep(0)
+            seen.append(len(results))
+
+        async def run():
+            with OffloadPipeline(double, max_pending=10, executor=InlineExecutor()) as pipeline:
+                async for item in pipeline.process(source()):
+                    results.append(item)
+
+        asyncio.run(run())
+        self.assertEqual(sorted(results), [(0, 0), (1, 2), (2, 4)])
+        # every batch but the last was yielded while the source still ran
+        self.assertEqual(seen, [2])
+
+    def test_failed_batch_keeps_finished_siblings(self):
+        results = []
+
+        async def source():
+            yield 'a', 1
+            yield 'b', 2
+            yield 'c', 'fail'
+
+        async def run():
+            with OffloadPipeline(double, max_pending=10, executor=InlineExecutor()) as pipeline:
+                async for item in pipeline.process(source()):
+                    results.append(item)
+
+        with self.assertRaises(ValueError):
+            asyncio.run(run())
+        self.assertEqual(sorted(results), [('a', 2), ('b', 4)])
+
+
+class TestConcurrentQueryExecutor(unittest.TestCase):
+    """Timed out and abandoned queries stop and free their connection"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.db_path = os.path.join(directory, 'users.db')
+        db = sqlite3.connect(self.db_path)
+        db.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)")
+        db.executemany("INSERT INTO users (name) VALUES (?)", [('alice',), ('bob',)])
+        db.commit()
+        db.close()
+
+    def run_executor(self, body, concurrency=1):
+        errors = []
+
+        async def run():
+            asyncio.get_running_loop().set_exception_handler(
+                lambda loop, context: errors.append(context)
+            )
+            async with ConcurrentQueryExecutor(self.db_path, concurrency) as executor:
+                return await body(executor)
+
+        result = asyncio.run(run())
+        # every task's exception was retrieved
+        self.assertEqual(errors, [])
+        return result
+
+    def test_timeout_result_and_connection_reuse(self):
+        async def body(executor):
+            results = await executor.run([SLOW_QUERY, "SELECT COUNT(*) FROM users"], timeout=0.05)
+            return results, executor.pool.metrics['created']
+
+        (slow, count), created = self.run_executor(body)
+        self.assertIsNone(slow.rows)
+        self.assertIsInstance(slow.error, TimeoutError)
+        # the only connection ran the slow query, then the next one
+        self.assertEqual(count.rows, [(2,)])
+        self.assertIsNone(count.error)
+        self.assertEqual(created, 1)
+
+    def test_closing_the_stream_early_stops_running_queries(self):
+        async def body(executor):
+            stream = executor.stream(["SELECT name FROM users WHERE id = 1", SLOW_QUERY])
+            first = await stream.__anext__()
+            await stream.aclose()
+            after = await executor.run(["SELECT 1", "SELECT 2"])
+            return first, after, executor.pool.metrics['created']
+
+        first, after, created = self.run_executor(body, concurrency=2)
+        self.assertEqual(first.rows, [('alice',)])
+        self.assertEqual([result.rows for result in after], [[(1,)], [(2,)]])
+        self.assertEqual(created, 2)
+
+    def test_second_cancellation_waits_for_the_interrupt(self):
+        async def body(executor):
+            fetching = asyncio.Event()
+            fetches = []
+            fetch = executor._fetch
+
+            async def signalling_fetch(db, sql, params):
+                fetches.append(asyncio.current_task())
+                fetching.set()
+                return await fetch(db, sql, params)
+
+            executor._fetch = signalling_fetch
+            task = asyncio.ensure_future(executor._execute(SLOW_QUERY, (), None))
+            await fetching.wait()
+            task.cancel()
+            # let the task enter the interrupt loop, then cancel it again
+            await asyncio.sleep(0)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            # the statement ended before the connection was released
+            self.assertTrue(fetches[0].done())
+            executor._fetch = fetch
+            return await executor.run(["SELECT COUNT(*) FROM users"])
+
+        [result] = self.run_executor(body)
+        self.assertEqual(result.rows, [(2,)])
+
+
+class TestSummarizeConcurrently(unittest.TestCase):
+    """Batch summaries add up to the summary of the whole result"""
+
+    def test_summaries_merge_across_batches(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        db_path = os.path.join(directory, 'users.db')
+        ages = [(18 + number * 7 % 60,) for number in range(250)]
+        db = sqlite3.connect(db_path)
+        db.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, age INTEGER)")
+        db.executemany("INSERT INTO users (age) VALUES (?)", ages)
+        db.commit()
+        db.close()
+
+        concurrent = importlib.import_module('3-concurrent')
+        summaries = asyncio.run(concurrent.summarize_concurrently(db_path, batch_size=40))
+        for index, rows in enumerate([ages, [age for age in ages if age[0] > 40]]):
+            self.assertEqual(summaries[index], concurrent.summarize_ages(rows))
+
+
+if __name__ == '__main__':
+    unittest.main()
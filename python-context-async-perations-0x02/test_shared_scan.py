@@ -0,0 +1,91 @@
+"""
+Parity tests for shared-scan batching against direct queries
+"""
+
+import asyncio
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from query_executor import ConcurrentQueryExecutor
+from shared_scan import SharedScanBatcher, combine, parse_simple_select
+
+QUERIES = [
+    ("SELECT * FROM users", ()),
+    ("SELECT * FROM users WHERE id = ?", (3,)),
+    # text and numbers in one column, compared with SQLite's affinity rules
+    ("SELECT * FROM users WHERE age > ?", (40,)),
+    ("SELECT * FROM users WHERE age = ?", ('41',)),
+    ("SELECT * FROM users WHERE name < ?", (5,)),
+    ("SELECT * FROM users WHERE zip = ?", (10115,)),
+    ("SELECT * FROM users WHERE zip > ? AND age < ?", (5000, '50')),
+    ("SELECT * FROM users WHERE age >= ? AND name != ?", (30, 'bob')),
+    ("SELECT * FROM users WHERE email = ?", (None,)),
+]
+
+
+class TestSharedScan(unittest.TestCase):
+    """Shared scans return the rows of the direct queries"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.db_path = os.path.join(directory, 'users.db')
+        db = sqlite3.connect(self.db_path)
+        db.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, age INTEGER, email TEXT, zip TEXT)")
+        db.executemany("INSERT INTO users VALUES (?, ?, ?, ?, ?)", [
+            (1, 'alice', 25, 'a@example.com', '10115'),
+            (2, 'bob', 41, None, 10115),
+            (3, 'carol', '41', 'c@example.com', '80331'),
+            (4, 'dave', 'old', 'd@example.com', '01067'),
+            (5, '7', 52.5, None, None),
+            (6, None, None, 'f@example.com', 'n/a'),
+        ])
+        db.commit()
+        db.close()
+        self.addCleanup(shutil.rmtree, directory)
+
+    def direct(self, sql, params):
+        db = sqlite3.connect(self.db_path)
+        try:
+            return db.execute(sql, params).fetchall()
+        finally:
+            db.close()
+
+    def fetch_shared(self, queries):
+        async def run():
+            async with ConcurrentQueryExecutor(self.db_path) as executor:
+                batcher = SharedScanBatcher(executor)
+                results = await asyncio.gather(
+                    *(batcher.fetch(sql, params) for sql, params in queries),
+                    return_exceptions=True
+                )
+                return results, batcher.stats
+        return asyncio.run(run())
+
+    def test_parity_on_mixed_types(self):
+        results, stats = self.fetch_shared(QUERIES)
+        self.assertEqual(stats['scans'], 1)
+        self.assertEqual(stats['shared'], len(QUERIES))
+        for (sql, params), rows in zip(QUERIES, results):
+            self.assertEqual(sorted(rows, key=repr), sorted(self.direct(sql, params), key=repr), sql)
+
+    def test_point_lookups_keep_using_the_index(self):
+        queries = [(sql, params) for sql, params in QUERIES if sql.endswith('id = ?')] * 2
+        sql, params = combine('users', [(parse_simple_select(*query)[1], query[1]) for query in queries])
+        plan = ' '.join(row[-1] for row in self.direct('EXPLAIN QUERY PLAN ' + sql, params))
+        self.assertNotIn('SCAN', plan)
+        results, _ = self.fetch_shared(queries)
+        self.assertEqual(results, [self.direct(*query) for query in queries])
+
+    def test_error_is_reported_to_its_query_only(self):
+        queries = QUERIES[1:3] + [("SELECT * FROM users WHERE nope = ?", (1,))]
+        results, stats = self.fetch_shared(queries)
+        self.assertEqual(results[:2], [self.direct(*query) for query in queries[:2]])
+        self.assertIsInstance(results[2], sqlite3.OperationalError)
+        self.assertEqual(stats['direct'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,8 @@
-import sqlite3
 import functools
 from datetime import datetime
 
+from db_pool import get_pool
+
 #### decorator to log SQL queries
 def log_queries(func):
     @functools.wraps(func)
@@ -13,12 +14,10 @@ def log_queries(func):
 
 @log_queries
 def fetch_all_users(query):
-    conn = sqlite3.connect('users.db')
-    cursor = conn.cursor()
-    cursor.execute(query)
-    results = cursor.fetchall()
-    conn.close()
-    return results
+    with get_pool('users.db').connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query)
+        return cursor.fetchall()
 
 #### fetch users while logging the query
 users = fetch_all_users(query="SELECT * FROM users")
\ No newline at end of file
@@ -1,16 +1,13 @@
-import sqlite3 
 import functools
 
+from db_pool import get_pool
+
 def with_db_connection(func):
     """ your code goes here""" 
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        connection = sqlite3.connect('users.db')
-        try:
-            result = func(connection, *args, **kwargs)
-            return result
-        finally:
-            connection.close()
+        with get_pool('users.db').connection() as connection:
+            return func(connection, *args, **kwargs)
     return wrapper
 
 @with_db_connection 
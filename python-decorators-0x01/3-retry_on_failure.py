@@ -1,18 +1,15 @@
 import time
-import sqlite3 
 import functools
 
+from db_pool import get_pool
+
 #### paste your with_db_decorator here
 
 def with_db_connection(func):
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        connection = sqlite3.connect('users.db')
-        try:
-            result = func(connection, *args, **kwargs)
-            return result
-        finally:
-            connection.close()
+        with get_pool('users.db').connection() as connection:
+            return func(connection, *args, **kwargs)
     return wrapper
 
 def retry_on_failure(retries=3, delay=1):
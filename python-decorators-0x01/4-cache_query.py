@@ -1,20 +1,15 @@
-import time
-import sqlite3 
 import functools
 
+from db_decorators import query_cache
+from db_pool import get_pool
 
-query_cache = {}
 
 def with_db_connection(func):
     """ your code goes here""" 
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        connection = sqlite3.connect('users.db')
-        try:
-            result = func(connection, *args, **kwargs)
-            return result
-        finally:
-            connection.close()
+        with get_pool('users.db').connection() as connection:
+            return func(connection, *args, **kwargs)
     return wrapper
 
 
@@ -0,0 +1,95 @@
+"""
+Benchmark cold-start latency of cache_query with and without the L2 cache
+
+Each scenario runs in a fresh interpreter so nothing survives in memory,
+like a process that has just been deployed.
+
+Usage:
+    python bench_l2_cache.py [rows]
+"""
+
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+
+QUERIES = [
+    "SELECT age, COUNT(*), AVG(LENGTH(email)) FROM users GROUP BY age",
+    "SELECT * FROM users WHERE age > 40 ORDER BY email LIMIT 500",
+    "SELECT name, email FROM users WHERE email LIKE '%7%' ORDER BY name",
+]
+
+CHILD = '''
+import sys, time
+sys.path.insert(0, {here!r})
+t0 = time.perf_counter()
+import db_decorators
+if {use_l2}:
+    db_decorators.enable_l2_cache({cache!r})
+
+@db_decorators.with_db_connection
+@db_decorators.cache_query
+def run(conn, query):
+    return conn.execute(query).fetchall()
+
+t1 = time.perf_counter()
+for query in {queries!r}:
+    run(query=query)
+t2 = time.perf_counter()
+print(f"{{(t1 - t0) * 1000:.2f}} {{(t2 - t1) * 1000:.2f}}")
+'''
+
+
+def create_database(path, rows):
+    """
+    Create a users table with the given number of rows
+    """
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "name TEXT NOT NULL, email TEXT NOT NULL, age REAL NOT NULL)"
+    )
+    connection.executemany(
+        "INSERT INTO users (name, email, age) VALUES (?, ?, ?)",
+        ((f"user{i}", f"user{i}@example.com", 18 + i % 60) for i in range(rows)),
+    )
+    connection.commit()
+    connection.close()
+
+
+def boot(workdir, use_l2, cache):
+    """
+    Run the queries in a fresh interpreter and return (startup_ms, queries_ms)
+    """
+    code = CHILD.format(
+        here=os.path.dirname(os.path.abspath(__file__)),
+        use_l2=use_l2, cache=cache, queries=QUERIES,
+    )
+    output = subprocess.run(
+        [sys.executable, '-c', code], cwd=workdir, capture_output=True, text=True, check=True
+    ).stdout.split()
+    return float(output[0]), float(output[1])
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        create_database(os.path.join(tmp, 'users.db'), rows)
+        cache = os.path.join(tmp, 'query_cache.db')
+
+        scenarios = [
+            ("cold start, no L2 cache", False),
+            ("first boot with L2 (fills it)", True),
+            ("restart with warm L2 cache", True),
+        ]
+        print(f"{'scenario':<32} {'startup ms':>11} {'queries ms':>11}")
+        for label, use_l2 in scenarios:
+            startup, queries = boot(tmp, use_l2, cache)
+            print(f"{label:<32} {startup:>11.2f} {queries:>11.2f}")
+        print(f"\nL2 file size: {os.path.getsize(cache):,} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark get_user_by_id-style point lookups with and without the pool
+and its prepared statement cache
+
+Usage:
+    python bench_statement_cache.py [lookups] [rows]
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from db_pool import ConnectionPool
+
+QUERY = "SELECT * FROM users WHERE id = ?"
+
+
+def create_database(path, rows):
+    """
+    Create a users table with the given number of rows
+    """
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "name TEXT NOT NULL, email TEXT NOT NULL, age REAL NOT NULL)"
+    )
+    connection.executemany(
+        "INSERT INTO users (name, email, age) VALUES (?, ?, ?)",
+        ((f"user{i}", f"user{i}@example.com", 18 + i % 60) for i in range(rows)),
+    )
+    connection.commit()
+    connection.close()
+
+
+def fresh_connection(path, ids):
+    """
+    Baseline: one brand-new connection per lookup
+    """
+    for user_id in ids:
+        connection = sqlite3.connect(path)
+        try:
+            connection.cursor().execute(QUERY, (user_id,)).fetchone()
+        finally:
+            connection.close()
+
+
+def pooled(pool, ids):
+    """
+    One pool checkout per lookup
+    """
+    for user_id in ids:
+        with pool.connection() as connection:
+            connection.cursor().execute(QUERY, (user_id,)).fetchone()
+
+
+def run(label, func, *args):
+    """
+    Time func and print lookups per second
+    """
+    ids = args[-1]
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<36} {len(ids) / elapsed:>12,.0f} lookups/s")
+    return elapsed
+
+
+def main():
+    lookups = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'users.db')
+        create_database(path, rows)
+        ids = [random.randint(1, rows) for _ in range(lookups)]
+
+        baseline = run("new connection per call", fresh_connection, path, ids)
+
+        no_cache = ConnectionPool(path, size=1, statement_cache_size=0)
+        run("pooled, statement cache disabled", pooled, no_cache, ids)
+        no_cache.close()
+
+        cached = ConnectionPool(path, size=1)
+        elapsed = run("pooled, statement cache enabled", pooled, cached, ids)
+        print(f"\nspeedup over baseline: {baseline / elapsed:.1f}x")
+        print(f"pool stats: {cached.stats()}")
+        cached.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""
+Async-aware versions of the database decorators
+
+Each decorator checks whether it wraps a coroutine function. Plain
+functions behave like the numbered task versions. Coroutine functions get
+an aiosqlite connection and never block the event loop. Both kinds share
+the connection pool from db_pool, the query cache and the metrics below.
+"""
+
+import asyncio
+import functools
+import inspect
+import time
+from collections import Counter
+from datetime import datetime
+
+from db_pool import DEFAULT_DB_PATH, get_pool, get_router
+from disk_cache import (
+    DEFAULT_CACHE_PATH, DEFAULT_MAX_BYTES, DEFAULT_TTL, MISS, DiskCache, data_version,
+)
+
+# results cached by cache_query, shared by sync and async callers
+query_cache = {}
+
+# optional persistent second level behind query_cache, see enable_l2_cache()
+l2_cache = None
+
+# bumped by invalidate_cache(), results read before a bump are not stored
+cache_generation = 0
+
+# counters shared by sync and async callers
+metrics = Counter()
+
+
+def _query_from(args, kwargs, position):
+    """
+    Return the query argument at position, or the 'query' keyword
+    """
+    return args[position] if len(args) > position else kwargs.get('query', '')
+
+
+def log_queries(func):
+    """
+    Decorator to log the SQL query before the function runs
+    """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            query = _query_from(args, kwargs, 0)
+            print(f"Executing SQL Query: {query} at {datetime.now()}")
+            metrics['queries_logged'] += 1
+            return await func(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        query = _query_from(args, kwargs, 0)
+        print(f"Executing SQL Query: {query} at {datetime.now()}")
+        metrics['queries_logged'] += 1
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def with_db_connection(func=None, *, route='write'):
+    """
+    Decorator that passes a pooled connection as the first argument
+
+    Coroutine functions receive an aiosqlite connection. Can be used bare
+    or with a route:
+
+        @with_db_connection(route='read')
+        def get_user_by_id(conn, user_id): ...
+
+    Args:
+        route (str): 'write' uses the primary, 'read' the read-only replica
+            set, and 'auto' classifies the function's query argument. Calls
+            that 'auto' classifies as writes invalidate the query cache.
+    """
+    if func is None:
+        return functools.partial(with_db_connection, route=route)
+
+    def pool_for(args, kwargs):
+        if route == 'write':
+            return get_pool(DEFAULT_DB_PATH)
+        sql = _query_from(args, kwargs, 0) if route == 'auto' else None
+        pool = get_router(DEFAULT_DB_PATH).pool_for(route, sql)
+        metrics['routed_reads' if pool.mode else 'routed_writes'] += 1
+        return pool
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            pool = pool_for(args, kwargs)
+            try:
+                async with pool.async_pool().connection() as connection:
+                    return await func(connection, *args, **kwargs)
+            finally:
+                if route == 'auto' and not pool.mode:
+                    await _invalidate_async()
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        pool = pool_for(args, kwargs)
+        try:
+            # check a long-lived connection out of the shared pool
+            with pool.connection() as connection:
+                return func(connection, *args, **kwargs)
+        finally:
+            if route == 'auto' and not pool.mode:
+                invalidate_cache()
+    return wrapper
+
+
+def transactional(func):
+    """
+    Decorator that commits on success and rolls back on error
+
+    The connection is expected as the first argument. A commit invalidates
+    the query cache.
+    """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            connection = args[0]
+            try:
+                result = await func(*args, **kwargs)
+                await connection.commit()
+                metrics['commits'] += 1
+                await _invalidate_async()
+                return result
+            except Exception as e:
+                await connection.rollback()
+                metrics['rollbacks'] += 1
+                print(f"Transaction failed: {e}")
+                raise
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        connection = args[0]
+        try:
+            result = func(*args, **kwargs)
+            connection.commit()
+            metrics['commits'] += 1
+            invalidate_cache()
+            return result
+        except Exception as e:
+            connection.rollback()
+            metrics['rollbacks'] += 1
+            print(f"Transaction failed: {e}")
+            raise
+    return wrapper
+
+
+def retry_on_failure(retries=3, delay=1):
+    """
+    Decorator to retry a function call on failure
+
+    Coroutine functions wait with asyncio.sleep between attempts.
+
+    Args:
+        retries (int): Number of times to retry the function.
+        delay (int): Delay in seconds between retries.
+    """
+    def decorator(func):
+        def failed(attempt, e):
+            print(f"Attempt {attempt + 1} failed: {e}")
+            metrics['retries'] += 1
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                for attempt in range(retries):
+                    try:
+                        return await func(*args, **kwargs)
+                    except Exception as e:
+                        failed(attempt, e)
+                        if attempt < retries - 1:
+                            await asyncio.sleep(delay)
+                raise Exception(f"Function {func.__name__} failed after {retries} attempts")
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            for attempt in range(retries):
+                try:
+                    return func(*args, **kwargs)
+                except Exception as e:
+                    failed(attempt, e)
+                    if attempt < retries - 1:
+                        time.sleep(delay)
+            raise Exception(f"Function {func.__name__} failed after {retries} attempts")
+        return wrapper
+    return decorator
+
+
+def enable_l2_cache(path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL,
+                    warm=1000):
+    """
+    Back query_cache with a persistent DiskCache
+
+    Entries are tagged with the current data version of the database, so
+    results cached before the database was last written to are discarded.
+    Writes made through transactional or auto-routed with_db_connection
+    invalidate the cache; ttl bounds how long other writes go unnoticed.
+
+    Args:
+        path (str): Path to the cache file
+        max_bytes (int): Upper bound on the size of stored results
+        ttl (float, optional): Seconds a stored result is served, None for no limit
+        warm (int): Number of recent entries to load into query_cache now
+
+    Returns:
+        DiskCache: The enabled cache
+    """
+    global l2_cache
+    if l2_cache is not None:
+        l2_cache.close()
+    l2_cache = DiskCache(
+        path, version=data_version(DEFAULT_DB_PATH), max_bytes=max_bytes, ttl=ttl
+    )
+    if warm:
+        metrics['l2_warmed'] += l2_cache.warm(query_cache, limit=warm)
+    return l2_cache
+
+
+def invalidate_cache():
+    """
+    Drop every cached query result after a write to the database
+    """
+    global cache_generation
+    cache_generation += 1
+    query_cache.clear()
+    if l2_cache is not None:
+        l2_cache.invalidate(data_version(DEFAULT_DB_PATH))
+    metrics['cache_invalidations'] += 1
+
+
+async def _invalidate_async():
+    if l2_cache is None:
+        invalidate_cache()
+    else:
+        await asyncio.to_thread(invalidate_cache)
+
+
+def _cached(query):
+    """
+    Look a query up in query_cache, then in the L2 cache if enabled
+    """
+    if query in query_cache:
+        metrics['cache_hits'] += 1
+        return query_cache[query]
+    if l2_cache is not None:
+        result = l2_cache.get(query)
+        if result is not MISS:
+            metrics['l2_hits'] += 1
+            query_cache[query] = result
+            return result
+    metrics['cache_misses'] += 1
+    return MISS
+
+
+def _store(query, result, generation):
+    # a write since the query ran may have changed its result
+    if generation != cache_generation:
+        return
+    query_cache[query] = result
+    if l2_cache is not None:
+        l2_cache.set(query, result)
+
+
+def cache_query(func):
+    """
+    Decorator that caches results by query text in query_cache
+
+    The connection is expected as the first argument and the query as
+    the second argument or the 'query' keyword. Coroutine functions do
+    their L2 cache I/O in a worker thread.
+    """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            query = _query_from(args, kwargs, 1)
+            if query in query_cache or l2_cache is None:
+                result = _cached(query)
+            else:
+                result = await asyncio.to_thread(_cached, query)
+            if result is not MISS:
+                return result
+            generation = cache_generation
+            result = await func(*args, **kwargs)
+            if l2_cache is None:
+                _store(query, result, generation)
+            else:
+                await asyncio.to_thread(_store, query, result, generation)
+            return result
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        query = _query_from(args, kwargs, 1)
+        result = _cached(query)
+        if result is not MISS:
+            return result
+        generation = cache_generation
+        result = func(*args, **kwargs)
+        _store(query, result, generation)
+        return result
+    return wrapper
+
+
+def stats():
+    """
+    Return decorator metrics together with the shared pool statistics
+
+    Returns:
+        dict: 'decorators' counters, 'pool', 'router' and 'l2_cache' statistics
+    """
+    return {
+        'decorators': dict(metrics),
+        'pool': get_pool(DEFAULT_DB_PATH).stats(),
+        'router': get_router(DEFAULT_DB_PATH).stats(),
+        'l2_cache': l2_cache.stats() if l2_cache else None,
+    }
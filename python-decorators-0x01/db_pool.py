@@ -0,0 +1,772 @@
+"""
+Shared SQLite connection pool with a per-connection prepared statement cache
+"""
+
+import asyncio
+import atexit
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+
+DEFAULT_DB_PATH = 'users.db'
+DEFAULT_POOL_SIZE = 5
+DEFAULT_STATEMENT_CACHE_SIZE = 128
+
+
+class StatementCache:
+    """
+    Bounded LRU of the SQL statements compiled on a single connection
+
+    sqlite3 keeps the compiled statements itself (the ``cached_statements``
+    argument of ``sqlite3.connect``, keyed by SQL text). This class mirrors
+    that LRU with the same bound so hits, misses and evictions can be reported.
+    """
+
+    def __init__(self, maxsize=DEFAULT_STATEMENT_CACHE_SIZE):
+        """
+        Initialize the StatementCache
+
+        Args:
+            maxsize (int): Maximum number of statements kept per connection
+        """
+        self.maxsize = maxsize
+        self._statements = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def record(self, sql):
+        """
+        Record that a statement is about to be executed
+
+        Args:
+            sql (str): SQL text of the statement
+
+        Returns:
+            bool: True if the compiled statement was already cached
+        """
+        if sql in self._statements:
+            self._statements.move_to_end(sql)
+            self.hits += 1
+            return True
+
+        self.misses += 1
+        if self.maxsize > 0:
+            self._statements[sql] = None
+            if len(self._statements) > self.maxsize:
+                self._statements.popitem(last=False)
+                self.evictions += 1
+        return False
+
+    def __len__(self):
+        return len(self._statements)
+
+    def stats(self):
+        """
+        Return the cache statistics
+
+        Returns:
+            dict: size, maxsize, hits, misses and evictions
+        """
+        return {
+            'size': len(self._statements),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+class CachingCursor(sqlite3.Cursor):
+    """
+    Cursor that records every executed statement in the connection's cache
+    """
+
+    def execute(self, sql, parameters=()):
+        self.connection.statement_cache.record(sql)
+        return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        self.connection.statement_cache.record(sql)
+        return super().executemany(sql, seq_of_parameters)
+
+
+class CachingConnection(sqlite3.Connection):
+    """
+    Connection factory that attaches a StatementCache to each connection
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.statement_cache = StatementCache(
+            kwargs.get('cached_statements', DEFAULT_STATEMENT_CACHE_SIZE)
+        )
+
+    def cursor(self, factory=CachingCursor):
+        return super().cursor(factory)
+
+    # the C implementations of these shortcuts bypass Cursor.execute
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+class ConnectionPool:
+    """
+    Pool of long-lived connections to a single SQLite database
+
+    Connections are created lazily up to ``size`` and handed out LIFO so the
+    most recently used connection (with the warmest statement cache) is
+    reused first.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, size=DEFAULT_POOL_SIZE,
+                 statement_cache_size=DEFAULT_STATEMENT_CACHE_SIZE, timeout=5.0,
+                 mode=None):
+        """
+        Initialize the ConnectionPool
+
+        Args:
+            db_path (str): Path to the SQLite database file
+            size (int): Maximum number of open connections
+            statement_cache_size (int): Compiled statements kept per connection
+            timeout (float): Seconds to wait for a free connection
+            mode (str, optional): 'ro' for read-only connections or
+                'immutable' for a file that is never modified while open
+        """
+        self.db_path = db_path
+        self.mode = mode
+        self.size = size
+        self.statement_cache_size = statement_cache_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._connections = []
+        self._lock = threading.Lock()
+        self._async_pool = None
+        self._retired = False
+        self._on_drained = None
+        self.checkouts = 0
+        self.reuses = 0
+        self.waits = 0
+
+    def connect_args(self):
+        """
+        Return the database argument and keyword arguments for connect()
+
+        Returns:
+            tuple: (database, kwargs) accepted by sqlite3 and aiosqlite
+        """
+        kwargs = {
+            'factory': CachingConnection,
+            'cached_statements': self.statement_cache_size,
+            'check_same_thread': False,
+        }
+        if self.mode is None:
+            return self.db_path, kwargs
+        query = 'mode=ro' if self.mode == 'ro' else 'immutable=1'
+        kwargs['uri'] = True
+        return f"file:{os.path.abspath(self.db_path)}?{query}", kwargs
+
+    def _connect(self):
+        """
+        Open a new connection with the statement cache attached
+        """
+        database, kwargs = self.connect_args()
+        return sqlite3.connect(database, **kwargs)
+
+    def acquire(self):
+        """
+        Check a connection out of the pool
+
+        Returns:
+            CachingConnection: An open connection
+
+        Raises:
+            TimeoutError: If no connection is released within the timeout
+        """
+        connection = None
+        reused = True
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                if len(self._connections) < self.size:
+                    connection = self._connect()
+                    self._connections.append(connection)
+                    reused = False
+
+        waited = connection is None
+        if waited:
+            try:
+                connection = self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                raise TimeoutError(
+                    f"No connection to {self.db_path} available after {self.timeout}s"
+                )
+
+        self._record_checkout(reused, waited)
+        return connection
+
+    def release(self, connection):
+        """
+        Return a connection to the pool, discarding any uncommitted work
+
+        Args:
+            connection (CachingConnection): Connection obtained from acquire()
+        """
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+        except sqlite3.ProgrammingError:
+            # the caller closed the connection; drop it from the pool
+            self._discard(connection)
+            return
+        if self._retired:
+            connection.close()
+            self._discard(connection)
+            return
+        self._idle.put_nowait(connection)
+
+    def _discard(self, connection):
+        """
+        Forget a connection and notify a retired pool once it is drained
+        """
+        with self._lock:
+            self._connections.remove(connection)
+        self._check_drained()
+
+    def _check_drained(self):
+        """
+        Call on_drained once a retired pool has no sync or async connection
+        left open, whichever kind was closed last
+        """
+        with self._lock:
+            async_open = self._async_pool.open_count() if self._async_pool else 0
+            on_drained = None
+            if self._retired and not self._connections and not async_open:
+                on_drained, self._on_drained = self._on_drained, None
+        if on_drained:
+            on_drained()
+
+    @contextmanager
+    def connection(self):
+        """
+        Context manager that checks a connection out and returns it afterwards
+        """
+        connection = self.acquire()
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def async_pool(self):
+        """
+        Return the aiosqlite pool that shares this pool's metrics
+
+        Returns:
+            AsyncConnectionPool: Async connections to the same database
+        """
+        with self._lock:
+            if self._async_pool is None:
+                self._async_pool = AsyncConnectionPool(self)
+            return self._async_pool
+
+    def _record_checkout(self, reused, waited):
+        """
+        Update the checkout counters shared by the sync and async pools
+        """
+        with self._lock:
+            self.checkouts += 1
+            if reused:
+                self.reuses += 1
+            if waited:
+                self.waits += 1
+
+    def retire(self, on_drained=None):
+        """
+        Stop handing out connections once they are returned
+
+        Idle connections, sync and async, are closed immediately and
+        checked-out ones when they are released.
+
+        Args:
+            on_drained (callable, optional): Called once every connection
+                of the pool has been closed
+        """
+        idle = []
+        with self._lock:
+            self._retired = True
+            self._on_drained = on_drained
+            while True:
+                try:
+                    idle.append(self._idle.get_nowait())
+                except queue.Empty:
+                    break
+        for connection in idle:
+            connection.close()
+            with self._lock:
+                self._connections.remove(connection)
+        if self._async_pool is not None:
+            self._async_pool.close_idle()
+        self._check_drained()
+
+    def close(self):
+        """
+        Close every synchronous connection owned by the pool
+        """
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
+            self._idle = queue.LifoQueue(maxsize=self.size)
+
+    def stats(self):
+        """
+        Return pool and aggregated statement cache statistics
+
+        Returns:
+            dict: Pool counters plus a 'statements' dict summed over connections
+        """
+        async_caches = self._async_pool.statement_caches() if self._async_pool else []
+        with self._lock:
+            statements = {'size': 0, 'hits': 0, 'misses': 0, 'evictions': 0}
+            caches = [c.statement_cache for c in self._connections] + async_caches
+            for cache in caches:
+                for key, value in cache.stats().items():
+                    if key in statements:
+                        statements[key] += value
+            return {
+                'connections': len(self._connections) + len(async_caches),
+                'idle': self._idle.qsize(),
+                'checkouts': self.checkouts,
+                'reuses': self.reuses,
+                'waits': self.waits,
+                'statements': statements,
+            }
+
+
+class AsyncConnectionPool:
+    """
+    Pool of long-lived aiosqlite connections attached to a ConnectionPool
+
+    Uses the same database, size, statement cache configuration and
+    checkout counters as its parent so sync and async callers report
+    into one set of metrics. Obtain it with ``ConnectionPool.async_pool()``.
+    """
+
+    def __init__(self, parent):
+        """
+        Initialize the AsyncConnectionPool
+
+        Args:
+            parent (ConnectionPool): The synchronous pool to share metrics with
+        """
+        self.parent = parent
+        self._idle = []
+        self._connections = []
+        # asyncio primitives are bound to a loop, so keep one semaphore per loop
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _semaphore(self):
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.parent.size)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    async def _connect(self):
+        """
+        Open a new aiosqlite connection with the statement cache attached
+        """
+        import aiosqlite
+
+        database, kwargs = self.parent.connect_args()
+        cache = StatementCache(self.parent.statement_cache_size)
+
+        def factory(*args, **options):
+            # runs on the worker thread; share the cache with the event loop
+            sqlite_connection = CachingConnection(*args, **options)
+            sqlite_connection.statement_cache = cache
+            return sqlite_connection
+
+        kwargs['factory'] = factory
+        connection = aiosqlite.connect(database, **kwargs)
+        connection.statement_cache = cache
+        # pooled connections outlive the event loop that opened them, and
+        # their worker threads would keep the interpreter from exiting
+        _close_at_exit()
+        return await connection
+
+    async def acquire(self):
+        """
+        Check an aiosqlite connection out of the pool
+
+        Returns:
+            aiosqlite.Connection: An open connection
+
+        Raises:
+            TimeoutError: If no connection is released within the timeout
+        """
+        semaphore = self._semaphore()
+        waited = semaphore.locked()
+        if waited:
+            try:
+                await asyncio.wait_for(semaphore.acquire(), self.parent.timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(
+                    f"No connection to {self.parent.db_path} available after "
+                    f"{self.parent.timeout}s"
+                )
+        else:
+            await semaphore.acquire()
+
+        try:
+            if self._idle:
+                connection, reused = self._idle.pop(), True
+            else:
+                connection, reused = await self._connect(), False
+                self._connections.append(connection)
+        except BaseException:
+            semaphore.release()
+            raise
+        self.parent._record_checkout(reused, waited)
+        return connection
+
+    async def release(self, connection):
+        """
+        Return a connection to the pool, discarding any uncommitted work
+
+        Args:
+            connection (aiosqlite.Connection): Connection obtained from acquire()
+        """
+        try:
+            if connection.in_transaction:
+                await connection.rollback()
+        except ValueError:
+            # the caller closed the connection; drop it from the pool
+            self._connections.remove(connection)
+        else:
+            if not self.parent._retired:
+                self._idle.append(connection)
+                return
+            await connection.close()
+            self._connections.remove(connection)
+        finally:
+            self._semaphore().release()
+        self.parent._check_drained()
+
+    def close_idle(self):
+        """
+        Close the idle connections of a retired pool
+
+        Called from ConnectionPool.retire(), which may not run in the event
+        loop of these connections, so each one is stopped without awaiting:
+        its worker thread closes the SQLite connection and exits.
+        """
+        idle, self._idle = self._idle, []
+        for connection in idle:
+            self._connections.remove(connection)
+            connection.stop()
+
+    def stop(self):
+        """
+        Stop every async connection, idle or checked out, without awaiting
+
+        Their worker threads close the SQLite connections and exit.
+        """
+        connections, self._connections, self._idle = self._connections, [], []
+        for connection in connections:
+            connection.stop()
+
+    def open_count(self):
+        """
+        Return the number of open async connections
+        """
+        return len(self._connections)
+
+    @asynccontextmanager
+    async def connection(self):
+        """
+        Async context manager that checks a connection out and returns it
+        """
+        connection = await self.acquire()
+        try:
+            yield connection
+        finally:
+            await self.release(connection)
+
+    def statement_caches(self):
+        """
+        Return the statement caches of the open async connections
+        """
+        return [connection.statement_cache for connection in self._connections]
+
+    async def close(self):
+        """
+        Close every async connection owned by the pool
+        """
+        connections, self._connections, self._idle = self._connections, [], []
+        for connection in connections:
+            await connection.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_exit_watcher = None
+
+
+def _close_at_exit():
+    """
+    Start the thread that calls close_all() when the main thread finishes
+
+    aiosqlite runs each connection in a non-daemon worker thread. The
+    interpreter joins those before atexit handlers run, so an atexit hook
+    alone would never get to stop them.
+    """
+    global _exit_watcher
+    with _pools_lock:
+        if _exit_watcher is None:
+            _exit_watcher = threading.Thread(
+                target=_close_after_main_thread, name='db_pool-exit', daemon=True
+            )
+            _exit_watcher.start()
+
+
+def _close_after_main_thread():
+    threading.main_thread().join()
+    close_all()
+
+
+def close_all():
+    """
+    Close the connections of every shared pool, router replica included
+
+    Async connections are stopped without awaiting, so this can run outside
+    their event loop. Registered with atexit, and called once the main
+    thread finishes when async connections were opened.
+    """
+    with _pools_lock:
+        pools = list(_pools.values()) + [
+            router._replica_pool for router in _routers.values() if router._replica_pool
+        ]
+    for pool in pools:
+        pool.close()
+        if pool._async_pool is not None:
+            pool._async_pool.stop()
+
+
+atexit.register(close_all)
+
+
+def get_pool(db_path=DEFAULT_DB_PATH, **kwargs):
+    """
+    Return the shared pool for a database, creating it on first use
+
+    Args:
+        db_path (str): Path to the SQLite database file
+        **kwargs: ConnectionPool options, only used when the pool is created
+
+    Returns:
+        ConnectionPool: The pool shared by every decorator in the process
+    """
+    with _pools_lock:
+        pool = _pools.get(db_path)
+        if pool is None:
+            pool = ConnectionPool(db_path, **kwargs)
+            _pools[db_path] = pool
+        return pool
+
+
+# leading keywords of statements that never modify the database
+READ_KEYWORDS = ('SELECT', 'EXPLAIN', 'VALUES')
+WRITE_KEYWORDS = re.compile(r'\b(INSERT|UPDATE|DELETE|REPLACE|CREATE|DROP|ALTER)\b', re.I)
+
+
+def classify_sql(sql):
+    """
+    Classify a statement as a read or a write
+
+    Anything that is not obviously read-only is treated as a write so it
+    is routed to the primary.
+
+    Args:
+        sql (str): SQL text
+
+    Returns:
+        str: 'read' or 'write'
+    """
+    statement = sql.lstrip().upper()
+    if statement.startswith(READ_KEYWORDS):
+        return 'read'
+    if statement.startswith('WITH') and not WRITE_KEYWORDS.search(statement):
+        return 'read'
+    return 'write'
+
+
+class ReadWriteRouter:
+    """
+    Routes reads to a read-only connection set and writes to the primary
+
+    Two kinds of replica are supported:
+    - 'readonly' opens the primary file with ``mode=ro``. Readers never take
+      write locks and always see committed data.
+    - 'snapshot' reads from an ``immutable=1`` copy of the primary, so
+      readers take no file locks at all. The copy is refreshed once it is
+      older than ``max_staleness`` seconds and the primary has changed.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, replica='readonly', max_staleness=5.0,
+                 snapshot_dir=None, **pool_kwargs):
+        """
+        Initialize the ReadWriteRouter
+
+        Args:
+            db_path (str): Path to the primary SQLite database file
+            replica (str): 'readonly' or 'snapshot'
+            max_staleness (float): Maximum age in seconds of snapshot data
+            snapshot_dir (str, optional): Where snapshot copies are written,
+                defaults to the directory of the primary
+            **pool_kwargs: ConnectionPool options for the replica pool
+        """
+        if replica not in ('readonly', 'snapshot'):
+            raise ValueError(f"Unknown replica type: {replica}")
+        self.db_path = db_path
+        self.replica = replica
+        self.max_staleness = max_staleness
+        self.snapshot_dir = snapshot_dir or os.path.dirname(os.path.abspath(db_path))
+        self.pool_kwargs = pool_kwargs
+        self._lock = threading.Lock()
+        self._replica_pool = None
+        self._snapshot_time = 0.0
+        self._snapshot_version = None
+        self._generation = 0
+        self.refreshes = 0
+
+    @property
+    def primary(self):
+        """
+        The shared pool of the primary database
+        """
+        return get_pool(self.db_path)
+
+    def pool_for(self, route='write', sql=None):
+        """
+        Return the pool a function should run against
+
+        Args:
+            route (str): 'read', 'write' or 'auto'
+            sql (str, optional): Statement to classify when route is 'auto'
+
+        Returns:
+            ConnectionPool: The primary pool or the replica pool
+        """
+        if route == 'auto':
+            route = classify_sql(sql) if sql else 'write'
+        if route == 'read':
+            return self.replica_pool()
+        return self.primary
+
+    def replica_pool(self):
+        """
+        Return the replica pool, refreshing a stale snapshot first
+        """
+        with self._lock:
+            if self.replica == 'readonly':
+                if self._replica_pool is None:
+                    self._replica_pool = ConnectionPool(self.db_path, mode='ro', **self.pool_kwargs)
+                return self._replica_pool
+
+            if self._replica_pool is None or self._snapshot_is_stale():
+                self._refresh_snapshot()
+            return self._replica_pool
+
+    def _snapshot_is_stale(self):
+        if time.monotonic() - self._snapshot_time < self.max_staleness:
+            return False
+        return self._primary_version() != self._snapshot_version
+
+    def _primary_version(self):
+        """
+        Return what changes when the primary is written to
+
+        Commits in WAL mode only touch the -wal file until a checkpoint
+        copies them into the main file, so both files are looked at.
+        """
+        version = []
+        for path in (self.db_path, self.db_path + '-wal'):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                version.append(None)
+            else:
+                version.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(version)
+
+    def _refresh_snapshot(self):
+        """
+        Copy the primary into a new immutable snapshot and swap pools
+        """
+        self._generation += 1
+        name = f"{os.path.basename(self.db_path)}.{os.getpid()}.{self._generation}.snapshot"
+        path = os.path.join(self.snapshot_dir, name)
+
+        version = self._primary_version()
+        source = sqlite3.connect(self.db_path)
+        target = sqlite3.connect(path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+
+        previous = self._replica_pool
+        self._replica_pool = ConnectionPool(path, mode='immutable', **self.pool_kwargs)
+        self._snapshot_time = time.monotonic()
+        self._snapshot_version = version
+        self.refreshes += 1
+        if previous is not None:
+            previous.retire(on_drained=lambda: os.remove(previous.db_path))
+
+    def stats(self):
+        """
+        Return primary and replica pool statistics
+
+        Returns:
+            dict: 'primary', 'replica' and the number of snapshot refreshes
+        """
+        return {
+            'primary': self.primary.stats(),
+            'replica': self._replica_pool.stats() if self._replica_pool else None,
+            'refreshes': self.refreshes,
+        }
+
+
+_routers = {}
+
+
+def get_router(db_path=DEFAULT_DB_PATH, **kwargs):
+    """
+    Return the shared read/write router for a database
+
+    Args:
+        db_path (str): Path to the primary SQLite database file
+        **kwargs: ReadWriteRouter options, only used when it is created
+
+    Returns:
+        ReadWriteRouter: The router shared by every decorator in the process
+    """
+    with _pools_lock:
+        router = _routers.get(db_path)
+        if router is None:
+            router = ReadWriteRouter(db_path, **kwargs)
+            _routers[db_path] = router
+        return router
@@ -0,0 +1,319 @@
+"""
+Persistent second-level cache for cache_query results
+
+Entries live in a local SQLite file, so cached results survive restarts.
+They are tagged with the data version of the source database, so a cache
+reopened after the database was written to starts empty, and they expire
+after a TTL, which bounds staleness from writes made by other processes.
+"""
+
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+
+DEFAULT_CACHE_PATH = 'query_cache.db'
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_TTL = 600
+
+# bumped when the layout of the entries table changes
+FORMAT = 2
+
+# read times are written back in batches instead of on every hit
+ACCESS_FLUSH_SIZE = 256
+
+# payloads above this size are zlib-compressed before they are stored
+COMPRESS_THRESHOLD = 1024
+_RAW = b'\x00'
+_ZLIB = b'\x01'
+
+# returned by DiskCache.get when a query is not cached
+MISS = object()
+
+
+def schema_version(db_path):
+    """
+    Return the schema version of a SQLite database
+
+    SQLite increments this counter on every schema change.
+
+    Args:
+        db_path (str): Path to the SQLite database file
+
+    Returns:
+        int: Value of PRAGMA schema_version, 0 if the file does not exist
+    """
+    if not os.path.exists(db_path):
+        return 0
+    connection = sqlite3.connect(db_path)
+    try:
+        return connection.execute("PRAGMA schema_version").fetchone()[0]
+    finally:
+        connection.close()
+
+
+def data_version(db_path):
+    """
+    Return a fingerprint that changes whenever a SQLite database is written to
+
+    Combines the schema version with the modification time and size of the
+    database file and of its -wal file, where commits land in WAL mode.
+
+    Args:
+        db_path (str): Path to the SQLite database file
+
+    Returns:
+        str: Opaque version string
+    """
+    version = [str(schema_version(db_path))]
+    for path in (db_path, db_path + '-wal'):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            version.append('-')
+        else:
+            version.append(f"{stat.st_mtime_ns}.{stat.st_size}")
+    return ':'.join(version)
+
+
+def serialize(value):
+    """
+    Pickle a value, compressing large payloads
+
+    Returns:
+        bytes: One format byte followed by the payload
+    """
+    payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    if len(payload) > COMPRESS_THRESHOLD:
+        compressed = zlib.compress(payload, 1)
+        if len(compressed) < len(payload):
+            return _ZLIB + compressed
+    return _RAW + payload
+
+
+def deserialize(blob):
+    """
+    Reverse serialize()
+    """
+    blob = bytes(blob)
+    if blob[:1] == _ZLIB:
+        return pickle.loads(zlib.decompress(blob[1:]))
+    return pickle.loads(blob[1:])
+
+
+class DiskCache:
+    """
+    Size-bounded, versioned key/value store for query results
+
+    The least recently read entries are evicted once the stored payloads
+    exceed ``max_bytes``. Entries older than ``ttl`` seconds are not served.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, version=0, max_bytes=DEFAULT_MAX_BYTES,
+                 ttl=DEFAULT_TTL):
+        """
+        Initialize the DiskCache
+
+        Args:
+            path (str): Path to the cache file
+            version: Data version the entries belong to, see data_version()
+            max_bytes (int): Upper bound on the total size of stored payloads
+            ttl (float, optional): Seconds an entry stays valid, None for no limit
+        """
+        self.path = path
+        self.version = str(version)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # key -> read time not yet written to the file
+        self._accessed = {}
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        if self._connection.execute("PRAGMA user_version").fetchone()[0] != FORMAT:
+            self._connection.execute("DROP TABLE IF EXISTS entries")
+            self._connection.execute(f"PRAGMA user_version = {FORMAT}")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, version TEXT NOT NULL, query TEXT NOT NULL, "
+            "value BLOB NOT NULL, size INTEGER NOT NULL, stored REAL NOT NULL, "
+            "accessed REAL NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries(accessed)"
+        )
+        # entries written for other data can never be read again
+        self._connection.execute("DELETE FROM entries WHERE version != ?", (self.version,))
+        if ttl is not None:
+            self._connection.execute(
+                "DELETE FROM entries WHERE stored < ?", (time.time() - ttl,)
+            )
+        self._connection.commit()
+        self._size = self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _key(self, query):
+        return hashlib.sha1(f"{self.version}\0{query}".encode()).hexdigest()
+
+    def get(self, query):
+        """
+        Return the cached result of a query
+
+        Args:
+            query (str): SQL text used as the cache key
+
+        Returns:
+            The cached result, or MISS
+        """
+        key = self._key(query)
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, stored FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or self._expired(row[1], now):
+                if row is not None:
+                    self.expirations += 1
+                self.misses += 1
+                return MISS
+            self._accessed[key] = now
+            if len(self._accessed) >= ACCESS_FLUSH_SIZE:
+                self._flush_accessed()
+                self._connection.commit()
+            self.hits += 1
+        return deserialize(row[0])
+
+    def _expired(self, stored, now):
+        return self.ttl is not None and now - stored > self.ttl
+
+    def _flush_accessed(self):
+        """
+        Write the pending read times, the caller commits
+        """
+        if self._accessed:
+            self._connection.executemany(
+                "UPDATE entries SET accessed = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._accessed.items()],
+            )
+            self._accessed.clear()
+
+    def set(self, query, value):
+        """
+        Store the result of a query, evicting old entries if needed
+
+        Args:
+            query (str): SQL text used as the cache key
+            value: Picklable query result
+        """
+        key = self._key(query)
+        blob = serialize(value)
+        now = time.time()
+        with self._lock:
+            self._flush_accessed()
+            previous = self._connection.execute(
+                "SELECT size FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            self._connection.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, self.version, query, blob, len(blob), now, now),
+            )
+            self._size += len(blob) - (previous[0] if previous else 0)
+            if self._size > self.max_bytes:
+                self._evict()
+            self._connection.commit()
+
+    def _evict(self):
+        """
+        Drop least recently read entries until the cache is 90% full
+        """
+        target = self.max_bytes * 0.9
+        cursor = self._connection.execute(
+            "SELECT key, size FROM entries ORDER BY accessed"
+        )
+        victims = []
+        for key, size in cursor:
+            if self._size <= target:
+                break
+            victims.append((key,))
+            self._size -= size
+        cursor.close()
+        self._connection.executemany("DELETE FROM entries WHERE key = ?", victims)
+        self.evictions += len(victims)
+
+    def warm(self, cache, limit=1000):
+        """
+        Load the most recently read entries into an in-memory cache
+
+        Args:
+            cache (dict): First-level cache keyed by query text
+            limit (int): Maximum number of entries to load
+
+        Returns:
+            int: Number of entries loaded
+        """
+        oldest = 0 if self.ttl is None else time.time() - self.ttl
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT query, value FROM entries WHERE version = ? AND stored >= ? "
+                "ORDER BY accessed DESC LIMIT ?",
+                (self.version, oldest, limit),
+            ).fetchall()
+        for query, blob in rows:
+            cache.setdefault(query, deserialize(blob))
+        return len(rows)
+
+    def invalidate(self, version):
+        """
+        Remove every entry and tag new ones with another data version
+
+        Args:
+            version: Data version of the source database after a write
+        """
+        with self._lock:
+            self.version = str(version)
+            self._accessed.clear()
+            self._connection.execute("DELETE FROM entries")
+            self._connection.commit()
+            self._size = 0
+
+    def clear(self):
+        """
+        Remove every entry
+        """
+        self.invalidate(self.version)
+
+    def close(self):
+        """
+        Write pending read times and close the cache file
+        """
+        with self._lock:
+            self._flush_accessed()
+            self._connection.commit()
+            self._connection.close()
+
+    def stats(self):
+        """
+        Return the cache statistics
+
+        Returns:
+            dict: entries, bytes, max_bytes, hits, misses, evictions and expirations
+        """
+        with self._lock:
+            entries = self._connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return {
+            'entries': entries,
+            'bytes': self._size,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
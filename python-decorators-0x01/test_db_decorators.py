@@ -0,0 +1,178 @@
+"""
+Tests for the coroutine branches of the database decorators
+"""
+
+import asyncio
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import db_decorators
+import db_pool
+from db_decorators import cache_query, retry_on_failure, transactional, with_db_connection
+from test_db_pool import make_users_db
+
+
+class AsyncDecoratorTestCase(unittest.TestCase):
+    """Points the decorators at a temporary users database"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.db_path = make_users_db(directory)
+        patcher = mock.patch.object(db_decorators, 'DEFAULT_DB_PATH', self.db_path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # stop the aiosqlite worker threads of every pool used by the test
+        self.addCleanup(db_pool.close_all)
+        db_decorators.query_cache.clear()
+        self.addCleanup(db_decorators.query_cache.clear)
+
+    def count_users(self):
+        with db_pool.get_pool(self.db_path).connection() as connection:
+            return connection.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+
+class TestAsyncTransactional(AsyncDecoratorTestCase):
+    """Commit, rollback and cache invalidation with aiosqlite connections"""
+
+    def test_commit_invalidates_the_cache(self):
+        @with_db_connection
+        @transactional
+        async def add_user(conn, name):
+            await conn.execute("INSERT INTO users (name, age) VALUES (?, 20)", (name,))
+
+        db_decorators.query_cache['SELECT * FROM users'] = [('stale',)]
+        generation = db_decorators.cache_generation
+        asyncio.run(add_user('carol'))
+        self.assertEqual(self.count_users(), 3)
+        self.assertEqual(db_decorators.query_cache, {})
+        self.assertEqual(db_decorators.cache_generation, generation + 1)
+
+    def test_rollback_discards_the_write(self):
+        @with_db_connection
+        @transactional
+        async def add_then_fail(conn):
+            await conn.execute("INSERT INTO users (name, age) VALUES ('carol', 20)")
+            raise ValueError('boom')
+
+        db_decorators.query_cache['SELECT * FROM users'] = [('kept',)]
+        rollbacks = db_decorators.metrics['rollbacks']
+        with mock.patch('builtins.print'), self.assertRaises(ValueError):
+            asyncio.run(add_then_fail())
+        self.assertEqual(self.count_users(), 2)
+        self.assertEqual(db_decorators.metrics['rollbacks'], rollbacks + 1)
+        # nothing was committed, so cached results stay valid
+        self.assertEqual(db_decorators.query_cache, {'SELECT * FROM users': [('kept',)]})
+
+    def test_connection_is_reused_across_event_loops(self):
+        @with_db_connection
+        async def connection_of(conn):
+            return conn
+
+        first = asyncio.run(connection_of())
+        second = asyncio.run(connection_of())
+        self.assertIs(first, second)
+        self.assertEqual(db_pool.get_pool(self.db_path).async_pool().open_count(), 1)
+
+
+class TestAutoRoute(AsyncDecoratorTestCase):
+    """route='auto' sends reads to the replica and invalidates after writes"""
+
+    def test_write_invalidates_and_read_does_not(self):
+        @with_db_connection(route='auto')
+        def run(conn, query):
+            rows = conn.execute(query).fetchall()
+            conn.commit()
+            return rows
+
+        db_decorators.query_cache['SELECT * FROM users'] = [('cached',)]
+        self.assertEqual(run("SELECT name FROM users WHERE id = 1"), [('alice',)])
+        self.assertIn('SELECT * FROM users', db_decorators.query_cache)
+
+        generation = db_decorators.cache_generation
+        run("UPDATE users SET age = 31 WHERE id = 1")
+        self.assertEqual(db_decorators.query_cache, {})
+        self.assertEqual(db_decorators.cache_generation, generation + 1)
+
+    def test_async_write_invalidates(self):
+        @with_db_connection(route='auto')
+        async def run(conn, query):
+            await conn.execute(query)
+            await conn.commit()
+
+        db_decorators.query_cache['SELECT * FROM users'] = [('cached',)]
+        asyncio.run(run("DELETE FROM users WHERE id = 2"))
+        self.assertEqual(db_decorators.query_cache, {})
+        self.assertEqual(self.count_users(), 1)
+
+
+class TestAsyncCacheQuery(AsyncDecoratorTestCase):
+    """cache_query serves repeats and drops results a write made stale"""
+
+    def test_repeat_is_served_from_the_cache(self):
+        calls = []
+
+        @with_db_connection
+        @cache_query
+        async def fetch(conn, query):
+            calls.append(query)
+            cursor = await conn.execute(query)
+            return await cursor.fetchall()
+
+        async def run():
+            return [await fetch(query="SELECT name FROM users ORDER BY id") for _ in range(2)]
+
+        first, second = asyncio.run(run())
+        self.assertEqual(first, [('alice',), ('bob',)])
+        self.assertEqual(second, first)
+        self.assertEqual(len(calls), 1)
+
+    def test_write_during_the_query_skips_the_store(self):
+        @with_db_connection
+        @cache_query
+        async def fetch(conn, query):
+            cursor = await conn.execute(query)
+            rows = await cursor.fetchall()
+            # a commit elsewhere lands while the result is in flight
+            db_decorators.invalidate_cache()
+            return rows
+
+        asyncio.run(fetch(query="SELECT name FROM users"))
+        self.assertNotIn("SELECT name FROM users", db_decorators.query_cache)
+
+
+class TestAsyncRetryOnFailure(unittest.TestCase):
+    """Coroutines are retried with asyncio.sleep between attempts"""
+
+    def test_retries_until_success(self):
+        attempts = []
+
+        @retry_on_failure(retries=3, delay=2)
+        async def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise sqlite3.OperationalError('database is locked')
+            return 'ok'
+
+        with mock.patch('builtins.print'), \
+                mock.patch('db_decorators.asyncio.sleep', new_callable=mock.AsyncMock) as sleep, \
+                mock.patch('db_decorators.time.sleep') as blocking_sleep:
+            self.assertEqual(asyncio.run(flaky()), 'ok')
+        self.assertEqual(len(attempts), 3)
+        self.assertEqual(sleep.await_args_list, [mock.call(2), mock.call(2)])
+        blocking_sleep.assert_not_called()
+
+    def test_gives_up_after_the_last_attempt(self):
+        @retry_on_failure(retries=2, delay=0)
+        async def broken():
+            raise sqlite3.OperationalError('database is locked')
+
+        with mock.patch('builtins.print'), self.assertRaisesRegex(Exception, 'after 2 attempts'):
+            asyncio.run(broken())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,207 @@
+"""
+Tests for the shared SQLite connection pool and its statement cache
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from db_pool import (
+    CachingConnection, ConnectionPool, ReadWriteRouter, StatementCache, classify_sql,
+)
+
+
+def make_users_db(directory):
+    path = os.path.join(directory, 'users.db')
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, age INTEGER)")
+    connection.executemany(
+        "INSERT INTO users (name, age) VALUES (?, ?)", [('alice', 30), ('bob', 45)]
+    )
+    connection.commit()
+    connection.close()
+    return path
+
+
+class TestStatementCache(unittest.TestCase):
+    """The cache mirrors sqlite3's LRU of compiled statements"""
+
+    def test_hits_misses_and_evictions(self):
+        cache = StatementCache(maxsize=2)
+        self.assertFalse(cache.record("SELECT 1"))
+        self.assertFalse(cache.record("SELECT 2"))
+        self.assertTrue(cache.record("SELECT 1"))
+        # SELECT 2 is now the least recently used
+        self.assertFalse(cache.record("SELECT 3"))
+        self.assertFalse(cache.record("SELECT 2"))
+        self.assertTrue(cache.record("SELECT 3"))
+        self.assertEqual(cache.stats(), {
+            'size': 2, 'maxsize': 2, 'hits': 2, 'misses': 4, 'evictions': 2,
+        })
+
+    def test_zero_size_caches_nothing(self):
+        cache = StatementCache(maxsize=0)
+        cache.record("SELECT 1")
+        self.assertFalse(cache.record("SELECT 1"))
+        self.assertEqual(len(cache), 0)
+
+    def test_connection_records_every_execute(self):
+        connection = sqlite3.connect(':memory:', factory=CachingConnection, cached_statements=4)
+        try:
+            connection.execute("CREATE TABLE t (x)")
+            connection.execute("INSERT INTO t VALUES (?)", (1,))
+            connection.cursor().execute("INSERT INTO t VALUES (?)", (2,))
+            connection.executemany("INSERT INTO t VALUES (?)", [(3,), (4,)])
+            self.assertEqual(connection.statement_cache.maxsize, 4)
+            self.assertEqual(connection.statement_cache.hits, 2)
+            self.assertEqual(connection.statement_cache.misses, 2)
+        finally:
+            connection.close()
+
+
+class TestConnectionPool(unittest.TestCase):
+    """Checkout, reuse and release of pooled connections"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.db_path = make_users_db(directory)
+        self.pool = ConnectionPool(self.db_path, size=2, statement_cache_size=2, timeout=0.1)
+        self.addCleanup(self.pool.close)
+
+    def test_connections_are_reused(self):
+        with self.pool.connection() as first:
+            pass
+        with self.pool.connection() as second:
+            pass
+        self.assertIs(first, second)
+        stats = self.pool.stats()
+        self.assertEqual((stats['connections'], stats['checkouts'], stats['reuses']), (1, 2, 1))
+
+    def test_statement_cache_hits_and_evicts(self):
+        queries = ["SELECT name FROM users WHERE id = ?", "SELECT age FROM users WHERE id = ?"]
+        with self.pool.connection() as connection:
+            for sql in queries + queries:
+                connection.execute(sql, (1,)).fetchall()
+            connection.execute("SELECT COUNT(*) FROM users").fetchall()
+        self.assertEqual(self.pool.stats()['statements'], {
+            'size': 2, 'hits': 2, 'misses': 3, 'evictions': 1,
+        })
+
+    def test_connection_is_returned_when_the_body_raises(self):
+        with self.assertRaises(ZeroDivisionError):
+            with self.pool.connection() as connection:
+                connection.execute("INSERT INTO users (name, age) VALUES ('carol', 20)")
+                1 / 0
+        self.assertEqual(self.pool.stats()['idle'], 1)
+        with self.pool.connection() as again:
+            self.assertIs(again, connection)
+            # the uncommitted insert was rolled back on release
+            self.assertFalse(again.in_transaction)
+            self.assertEqual(again.execute("SELECT COUNT(*) FROM users").fetchone(), (2,))
+
+    def test_stats_after_a_timed_out_checkout(self):
+        first, second = self.pool.acquire(), self.pool.acquire()
+        with self.assertRaises(TimeoutError):
+            self.pool.acquire()
+        self.pool.release(second)
+        third = self.pool.acquire()
+        self.assertIs(third, second)
+        self.pool.release(first)
+        self.pool.release(third)
+        stats = self.pool.stats()
+        self.assertEqual(
+            {key: stats[key] for key in ('connections', 'idle', 'checkouts', 'reuses')},
+            {'connections': 2, 'idle': 2, 'checkouts': 3, 'reuses': 1},
+        )
+        self.assertEqual(stats['waits'], 0)
+
+    def test_closed_connection_is_dropped(self):
+        with self.pool.connection() as connection:
+            connection.close()
+        self.assertEqual(self.pool.stats()['connections'], 0)
+        with self.pool.connection() as fresh:
+            self.assertIsNot(fresh, connection)
+
+
+class TestClassifySql(unittest.TestCase):
+    """Only statements that cannot write are routed to a replica"""
+
+    def test_reads(self):
+        for sql in (
+            "SELECT * FROM users",
+            "  select name FROM users",
+            "WITH adults AS (SELECT * FROM users WHERE age >= 18) SELECT * FROM adults",
+            "EXPLAIN QUERY PLAN SELECT * FROM users",
+            "VALUES (1)",
+        ):
+            self.assertEqual(classify_sql(sql), 'read', sql)
+
+    def test_writes(self):
+        for sql in (
+            "INSERT INTO users (name) VALUES ('carol')",
+            "UPDATE users SET age = 31",
+            "DELETE FROM users",
+            "REPLACE INTO users (id, name) VALUES (1, 'al')",
+            "CREATE TABLE t (x)",
+            "DROP TABLE users",
+            "ALTER TABLE users ADD COLUMN email TEXT",
+            "WITH old AS (SELECT id FROM users) DELETE FROM users WHERE id IN old",
+            # pragmas can change the database, so they go to the primary
+            "PRAGMA user_version = 3",
+            "PRAGMA table_info(users)",
+        ):
+            self.assertEqual(classify_sql(sql), 'write', sql)
+
+
+class TestReadWriteRouter(unittest.TestCase):
+    """Replica pools are read-only and snapshots follow the primary"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.db_path = make_users_db(self.directory)
+
+    def make_router(self, **kwargs):
+        router = ReadWriteRouter(self.db_path, **kwargs)
+        self.addCleanup(lambda: router._replica_pool and router._replica_pool.close())
+        return router
+
+    def test_auto_route_picks_the_pool(self):
+        router = self.make_router()
+        self.assertEqual(router.pool_for('auto', "SELECT * FROM users").mode, 'ro')
+        self.assertIsNone(router.pool_for('auto', "UPDATE users SET age = 1").mode)
+        self.assertIsNone(router.pool_for('auto').mode)
+
+    def test_readonly_replica_rejects_writes(self):
+        router = self.make_router()
+        with router.replica_pool().connection() as connection:
+            self.assertEqual(connection.execute("SELECT COUNT(*) FROM users").fetchone(), (2,))
+            with self.assertRaisesRegex(sqlite3.OperationalError, 'readonly'):
+                connection.execute("INSERT INTO users (name, age) VALUES ('carol', 20)")
+
+    def test_snapshot_refreshes_after_a_write(self):
+        router = self.make_router(replica='snapshot', max_staleness=0)
+        first = router.replica_pool()
+        with first.connection() as connection:
+            self.assertEqual(connection.execute("SELECT COUNT(*) FROM users").fetchone(), (2,))
+        # unchanged primary: the snapshot is kept
+        self.assertIs(router.replica_pool(), first)
+
+        with ConnectionPool(self.db_path).connection() as connection:
+            connection.execute("INSERT INTO users (name, age) VALUES ('carol', 20)")
+            connection.commit()
+        second = router.replica_pool()
+        self.assertIsNot(second, first)
+        self.assertEqual(router.refreshes, 2)
+        with second.connection() as connection:
+            self.assertEqual(connection.execute("SELECT COUNT(*) FROM users").fetchone(), (3,))
+        # the drained snapshot file was removed
+        self.assertFalse(os.path.exists(first.db_path))
+        self.assertTrue(os.path.exists(second.db_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
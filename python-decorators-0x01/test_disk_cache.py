@@ -0,0 +1,235 @@
+"""
+Tests for the persistent second-level query cache
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import db_decorators
+import disk_cache
+from disk_cache import MISS, DiskCache, data_version, serialize
+from test_db_pool import make_users_db
+
+VALUE = 'x' * 100
+SIZE = len(serialize(VALUE))
+
+
+class DiskCacheTestCase(unittest.TestCase):
+    """Opens caches in a temporary directory with a controllable clock"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'cache.db')
+        self.now = 1000.0
+        patcher = mock.patch.object(disk_cache.time, 'time', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def open(self, **kwargs):
+        kwargs.setdefault('version', 'v1')
+        cache = DiskCache(self.path, **kwargs)
+        self.addCleanup(cache._connection.close)
+        return cache
+
+    def stored(self, column='key'):
+        # read the file through another connection, as a restart would
+        connection = sqlite3.connect(self.path)
+        try:
+            return connection.execute(f"SELECT {column} FROM entries").fetchall()
+        finally:
+            connection.close()
+
+
+class TestExpiry(DiskCacheTestCase):
+    """Entries older than the TTL are not served"""
+
+    def test_entries_expire_after_the_ttl(self):
+        cache = self.open(ttl=60)
+        cache.set("SELECT 1", VALUE)
+        self.now += 60
+        self.assertEqual(cache.get("SELECT 1"), VALUE)
+        self.now += 1
+        self.assertIs(cache.get("SELECT 1"), MISS)
+        self.assertEqual(cache.stats()['expirations'], 1)
+
+    def test_expired_entries_are_dropped_on_open(self):
+        cache = self.open(ttl=60)
+        cache.set("SELECT 1", VALUE)
+        cache.close()
+        self.now += 61
+        cache = self.open(ttl=60)
+        self.assertEqual(cache.stats()['entries'], 0)
+
+    def test_no_ttl_keeps_entries(self):
+        cache = self.open(ttl=None)
+        cache.set("SELECT 1", VALUE)
+        self.now += 10 ** 6
+        self.assertEqual(cache.get("SELECT 1"), VALUE)
+
+
+class TestEviction(DiskCacheTestCase):
+    """The cache shrinks to 90% of max_bytes, least recently read first"""
+
+    def test_least_recently_read_entries_go_first(self):
+        cache = self.open(max_bytes=int(SIZE * 3.5))
+        for query in ("SELECT 'a'", "SELECT 'b'", "SELECT 'c'"):
+            self.now += 1
+            cache.set(query, VALUE)
+        self.now += 1
+        cache.get("SELECT 'a'")
+        self.now += 1
+        cache.set("SELECT 'd'", VALUE)
+
+        # evicting b alone brings the cache under 90% of max_bytes
+        self.assertIs(cache.get("SELECT 'b'"), MISS)
+        for query in ("SELECT 'a'", "SELECT 'c'", "SELECT 'd'"):
+            self.assertEqual(cache.get(query), VALUE)
+        stats = cache.stats()
+        self.assertEqual((stats['entries'], stats['bytes'], stats['evictions']), (3, SIZE * 3, 1))
+        self.assertLessEqual(stats['bytes'], cache.max_bytes * 0.9)
+
+    def test_replacing_an_entry_does_not_double_count(self):
+        cache = self.open()
+        cache.set("SELECT 1", VALUE)
+        cache.set("SELECT 1", VALUE)
+        self.assertEqual(cache.stats()['bytes'], SIZE)
+
+
+class TestAccessFlush(DiskCacheTestCase):
+    """Read times reach the file in batches"""
+
+    def test_read_times_are_written_in_batches(self):
+        cache = self.open()
+        cache.set("SELECT 1", VALUE)
+        cache.set("SELECT 2", VALUE)
+        self.now += 10
+        with mock.patch.object(disk_cache, 'ACCESS_FLUSH_SIZE', 2):
+            cache.get("SELECT 1")
+            self.assertEqual(self.stored('accessed'), [(1000.0,), (1000.0,)])
+            cache.get("SELECT 2")
+        self.assertEqual(self.stored('accessed'), [(1010.0,), (1010.0,)])
+
+    def test_pending_read_times_are_written_on_close(self):
+        cache = self.open()
+        cache.set("SELECT 1", VALUE)
+        self.now += 10
+        cache.get("SELECT 1")
+        cache.close()
+        self.assertEqual(self.stored('accessed'), [(1010.0,)])
+
+
+class TestVersioning(DiskCacheTestCase):
+    """Entries never outlive the data or the layout they were stored for"""
+
+    def test_invalidate_after_the_database_changes(self):
+        db_path = make_users_db(self.directory)
+        before = data_version(db_path)
+        cache = self.open(version=before)
+        cache.set("SELECT * FROM users", [('alice',)])
+
+        connection = sqlite3.connect(db_path)
+        connection.execute("ALTER TABLE users ADD COLUMN email TEXT")
+        connection.close()
+        after = data_version(db_path)
+        self.assertNotEqual(after, before)
+
+        cache.invalidate(after)
+        self.assertIs(cache.get("SELECT * FROM users"), MISS)
+        self.assertEqual(cache.version, after)
+        cache.set("SELECT * FROM users", [('alice', None)])
+        self.assertEqual(cache.get("SELECT * FROM users"), [('alice', None)])
+
+    def test_entries_of_another_version_are_dropped_on_open(self):
+        cache = self.open(version='v1')
+        cache.set("SELECT 1", VALUE)
+        cache.close()
+        self.assertEqual(self.open(version='v2').stats()['entries'], 0)
+
+    def test_format_change_drops_the_table(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute("CREATE TABLE entries (key TEXT PRIMARY KEY, value BLOB)")
+        connection.execute("INSERT INTO entries VALUES ('k', x'00')")
+        connection.execute(f"PRAGMA user_version = {disk_cache.FORMAT - 1}")
+        connection.commit()
+        connection.close()
+
+        cache = self.open()
+        self.assertEqual(cache.stats()['entries'], 0)
+        cache.set("SELECT 1", VALUE)
+        self.assertEqual(cache.get("SELECT 1"), VALUE)
+        self.assertEqual(
+            cache._connection.execute("PRAGMA user_version").fetchone(), (disk_cache.FORMAT,)
+        )
+
+
+class TestWarm(DiskCacheTestCase):
+    """warm() preloads the first-level cache"""
+
+    def test_most_recently_read_entries_are_loaded(self):
+        cache = self.open(ttl=60)
+        for number in range(3):
+            self.now += 1
+            cache.set(f"SELECT {number}", number)
+        self.now += 1
+        cache.get("SELECT 0")
+        cache.close()
+
+        cache = self.open(ttl=60)
+        loaded = {}
+        self.assertEqual(cache.warm(loaded, limit=2), 2)
+        self.assertEqual(loaded, {"SELECT 0": 0, "SELECT 2": 2})
+
+    def test_warm_skips_expired_entries_and_keeps_loaded_ones(self):
+        cache = self.open(ttl=60)
+        cache.set("SELECT 1", 1)
+        self.now += 30
+        cache.set("SELECT 2", 2)
+        self.now += 40
+        loaded = {"SELECT 2": 'newer'}
+        self.assertEqual(cache.warm(loaded), 1)
+        self.assertEqual(loaded, {"SELECT 2": 'newer'})
+
+
+class TestL2Store(DiskCacheTestCase):
+    """cache_query does not store results a concurrent write made stale"""
+
+    def setUp(self):
+        super().setUp()
+        db_path = make_users_db(self.directory)
+        for name, value in (('DEFAULT_DB_PATH', db_path), ('l2_cache', None)):
+            patcher = mock.patch.object(db_decorators, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        db_decorators.query_cache.clear()
+        self.addCleanup(db_decorators.query_cache.clear)
+        self.cache = db_decorators.enable_l2_cache(self.path, warm=0)
+        self.addCleanup(self.cache._connection.close)
+
+    def test_result_is_stored_in_both_levels(self):
+        @db_decorators.cache_query
+        def fetch(conn, query):
+            return [('alice',)]
+
+        fetch(None, "SELECT name FROM users")
+        self.assertIn("SELECT name FROM users", db_decorators.query_cache)
+        self.assertEqual(self.cache.get("SELECT name FROM users"), [('alice',)])
+
+    def test_result_is_dropped_after_a_concurrent_write(self):
+        @db_decorators.cache_query
+        def fetch(conn, query):
+            # another caller commits while this query runs
+            db_decorators.invalidate_cache()
+            return [('alice',)]
+
+        self.assertEqual(fetch(None, "SELECT name FROM users"), [('alice',)])
+        self.assertNotIn("SELECT name FROM users", db_decorators.query_cache)
+        self.assertIs(self.cache.get("SELECT name FROM users"), MISS)
+
+
+if __name__ == '__main__':
+    unittest.main()